@@ -0,0 +1,99 @@
+"""
+Storing ticket attachments: per-ticket copies vs. the content-addressed AttachmentStore.
+
+Simulates --tickets tickets that each attach --files uploads of --size-mb
+MB, held in BytesIO buffers like Streamlit's UploadedFile. A share of the
+uploads (--duplicate-share) repeats a file already attached elsewhere, as
+when the same screenshot or log goes on several tickets. The old path
+checks the size with getvalue() and writes the whole buffer into a
+per-ticket directory. The store hashes each upload and writes and fsyncs
+only content it does not already hold. Reports time, peak memory traced
+during the saves, and bytes on disk.
+
+The store is still slower than plain copies. SHA-256 over every upload and
+an fsync per new file cost time the old path never spent. Neither path
+copies the upload, so peak memory is the same. What the store saves is
+disk space, and time as the share of duplicates grows.
+
+Usage:
+    python benchmarks/attachment_upload.py --tickets 40 --files 3 --size-mb 2 --duplicate-share 0.3
+"""
+
+import argparse
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.attachments import AttachmentStore
+
+
+def _uploads(tickets, files, size, duplicate_share, seed=7):
+    rng = random.Random(seed)
+    seen = []
+    for ticket in range(tickets):
+        batch = []
+        for n in range(files):
+            if seen and rng.random() < duplicate_share:
+                data = rng.choice(seen)
+            else:
+                data = rng.randbytes(size)
+                seen.append(data)
+            upload = io.BytesIO(data)
+            upload.name, upload.type, upload.size = f"file_{ticket}_{n}.png", 'image/png', len(data)
+            batch.append(upload)
+        yield ticket, batch
+
+
+def _save_copies(batch, ticket, directory):
+    ticket_dir = os.path.join(directory, f"ticket_{ticket}")
+    os.makedirs(ticket_dir, exist_ok=True)
+    for upload in batch:
+        if len(upload.getvalue()) / 1024 / 1024 <= 5:
+            with open(os.path.join(ticket_dir, upload.name), 'wb') as f:
+                f.write(upload.getvalue())
+
+
+def _disk_bytes(directory):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(directory) for name in names)
+
+
+def _run(label, uploads, save, directory):
+    elapsed, peak = 0.0, 0
+    for ticket, batch in uploads:
+        tracemalloc.start()
+        start = time.perf_counter()
+        save(batch, ticket)
+        elapsed += time.perf_counter() - start
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    print(f"{label:16s} {elapsed * 1000:9.1f} ms   peak {peak / 1024:8.1f} KiB   "
+          f"on disk {_disk_bytes(directory) / 1024 / 1024:8.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tickets', type=int, default=40)
+    parser.add_argument('--files', type=int, default=3)
+    parser.add_argument('--size-mb', type=float, default=2)
+    parser.add_argument('--duplicate-share', type=float, default=0.3)
+    args = parser.parse_args()
+    size = int(args.size_mb * 1024 * 1024)
+
+    with tempfile.TemporaryDirectory() as directory:
+        copies_dir = os.path.join(directory, 'uploads')
+        _run('per-ticket copy', _uploads(args.tickets, args.files, size, args.duplicate_share),
+             lambda batch, ticket: _save_copies(batch, ticket, copies_dir), copies_dir)
+
+        store = AttachmentStore(os.path.join(directory, 'attachments'))
+        _run('AttachmentStore', _uploads(args.tickets, args.files, size, args.duplicate_share),
+             lambda batch, ticket: [store.save(upload, upload.name, upload.type) for upload in batch], store.directory)
+
+
+if __name__ == '__main__':
+    main()
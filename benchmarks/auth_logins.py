@@ -0,0 +1,90 @@
+"""
+Login throughput benchmark for the user directory.
+
+Builds a synthetic users file, then measures logins/sec for the original
+load-and-scan authenticate() and for UserDirectory (indexed, cached,
+hashed passwords). UserDirectory no longer accepts plaintext passwords, so
+it is only measured on the hashed file.
+
+PBKDF2 cost is deliberate and dominates hashed logins; --iterations
+controls it so the index/caching overhead can be seen separately.
+
+Usage:
+    python benchmarks/auth_logins.py --users 100000 --iterations 1000
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.auth import UserDirectory, hash_password
+
+
+def _legacy_authenticate(path, username, password):
+    with open(path, 'r') as f:
+        users = json.load(f)
+    for user in users:
+        if user['username'] == username and user['password'] == password:
+            return user
+    return None
+
+
+def _rate(fn, logins, seconds):
+    done = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        username, password = logins[done % len(logins)]
+        assert fn(username, password) is not None
+        done += 1
+    return done / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=100000)
+    parser.add_argument('--iterations', type=int, default=1000, help='PBKDF2 iterations for hashed users')
+    parser.add_argument('--seconds', type=float, default=3.0, help='time budget per measurement')
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    plain = [{"username": f"user{i}", "password": f"pw{i}", "email": f"user{i}@example.com", "id": f"EMP{i:06d}"}
+             for i in range(args.users)]
+    logins = [(f"user{i}", f"pw{i}") for i in rng.sample(range(args.users), 1000)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        plain_path = os.path.join(tmp, 'users_plain.json')
+        with open(plain_path, 'w') as f:
+            json.dump(plain, f)
+
+        # Only the users we log in as need real hashes; the rest just fill the directory
+        hashed_users = {u for u, _ in logins}
+        hashed = []
+        for user in plain:
+            user = dict(user)
+            password = user.pop('password')
+            if user['username'] in hashed_users:
+                user['password_hash'] = hash_password(password, iterations=args.iterations)
+            else:
+                user['password_hash'] = 'pbkdf2_sha256$1$x$00'
+            hashed.append(user)
+        hashed_path = os.path.join(tmp, 'users_hashed.json')
+        with open(hashed_path, 'w') as f:
+            json.dump(hashed, f)
+
+        print(f"users: {args.users:,}")
+        legacy = _rate(lambda u, p: _legacy_authenticate(plain_path, u, p), logins, args.seconds)
+        print(f"legacy load+scan (plaintext):        {legacy:>12,.1f} logins/sec")
+
+        directory = UserDirectory(hashed_path)
+        rate = _rate(directory.authenticate, logins, args.seconds)
+        print(f"UserDirectory (pbkdf2 x{args.iterations}):{'':<8}{rate:>12,.1f} logins/sec")
+
+
+if __name__ == '__main__':
+    main()
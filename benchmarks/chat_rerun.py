@@ -0,0 +1,96 @@
+"""
+Rerun latency of the Query page by conversation length, using Streamlit's AppTest.
+
+Seeds a logged-in session with --sizes messages (alternating questions and
+answers, all answers voted on except the newest, which is awaiting
+feedback; older turns spilled to disk as the page does) and times full
+script reruns such as a button click triggers.
+Also reports the number of elements the page emits and the bytes of
+markdown they carry, a proxy for the websocket payload per rerun.
+
+Usage:
+    python benchmarks/chat_rerun.py --sizes 10 100 500 --reruns 5
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+os.environ.pop('GROK_API_KEY', None)
+
+from streamlit.testing.v1 import AppTest
+
+from utils.chat_transcript import ChatTranscript
+
+PAGE = os.path.join(ROOT, 'pages', '2_Query.py')
+
+
+def _seed_history(size, directory):
+    history = [{"role": "assistant", "message": "Hello! I'm your IT Helpdesk Assistant.", "timestamp": "09:00"}]
+    feedback = {}
+    for i in range(1, size):
+        if i % 2:
+            history.append({"role": "user", "message": f"Question {i}: my VPN drops every few minutes", "timestamp": "09:01"})
+        else:
+            history.append({"role": "assistant", "timestamp": "09:01", "message": (
+                f"Answer {i}: **Step 1:** Reconnect to the office WiFi\n\n**Step 2:** Restart the VPN client\n\n"
+                "**Step 3:** Reinstall the client from the software portal if it keeps dropping")})
+            feedback[f"feedback_{i}"] = "helpful" if i % 4 else "completed"
+    if history[-1]["role"] == "assistant":
+        feedback.pop(f"feedback_{len(history) - 1}", None)
+
+    # As the page keeps it: recent window in memory, older turns spilled to disk
+    transcript = ChatTranscript(directory=directory)
+    for message in history:
+        transcript.append(message)
+    transcript.compact(feedback)
+    return transcript, feedback
+
+
+def _walk(node):
+    for child in getattr(node, 'children', {}).values():
+        yield child
+        yield from _walk(child)
+
+
+def _measure(size, reruns, directory):
+    at = AppTest.from_file(PAGE, default_timeout=120)
+    history, feedback = _seed_history(size, directory)
+    at.session_state.logged_in = True
+    at.session_state.username = 'bench'
+    at.session_state.chat_history = history
+    at.session_state.feedback_given = feedback
+    at.run()  # first render fills the caches
+
+    start = time.perf_counter()
+    for _ in range(reruns):
+        at.run()
+    per_rerun_ms = (time.perf_counter() - start) / reruns * 1000
+    if at.exception:
+        raise SystemExit(at.exception[0].message)
+
+    elements = list(_walk(at.main))
+    markdown_bytes = sum(len(element.value.encode('utf-8')) for element in at.markdown)
+    return per_rerun_ms, len(elements), markdown_bytes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 500])
+    parser.add_argument('--reruns', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.sizes:
+            per_rerun_ms, elements, markdown_bytes = _measure(size, args.reruns, directory)
+            print(f"{size:4d} messages   {per_rerun_ms:8.1f} ms/rerun   {elements:5d} elements   "
+                  f"{markdown_bytes / 1024:7.1f} KiB markdown")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""
+Per-turn latency benchmark for GrokAIService against a local stub server.
+
+Starts an HTTP/1.1 keep-alive stub of the chat completions endpoint and
+compares a bare requests.post per turn (the old behaviour) with a post
+through the service's pooled session. Both send the same payload with the
+same timeouts, so connection reuse is the only difference. The two are
+alternated so they see the same noise, and the run fails if the stub
+returns an error.
+
+On loopback the pooled session saves only the TCP connect. That shows in
+the median, typically a fraction of a millisecond. The p99 is dominated by
+scheduling noise and does not reliably improve. The TLS handshake the
+session also skips against the real API is not measured here.
+
+Usage:
+    python benchmarks/grok_http_latency.py --turns 500 --delay-ms 0
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Buffer headers and body into one write; separate small writes on a
+    # kept-alive socket hit Nagle/delayed-ACK stalls that would skew results
+    wbufsize = 64 * 1024
+    delay = 0.0
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        self.rfile.read(length)
+        if self.delay:
+            time.sleep(self.delay)
+        body = json.dumps({"choices": [{"message": {"role": "assistant", "content": "Stub answer."}}]}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _percentiles(samples):
+    samples = sorted(samples)
+    return statistics.median(samples), samples[max(0, int(len(samples) * 0.99) - 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--turns', type=int, default=500)
+    parser.add_argument('--delay-ms', type=float, default=0.0, help='simulated generation time per request')
+    args = parser.parse_args()
+
+    _StubHandler.delay = args.delay_ms / 1000
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    api_url = f"http://127.0.0.1:{server.server_port}/v1"
+
+    os.environ['GROK_API_KEY'] = 'stub'
+    os.environ['GROK_API_URL'] = api_url
+
+    import requests
+    from utils.grok_ai import GrokAIService
+
+    service = GrokAIService()
+    messages = [{"role": "user", "content": "How do I install the VPN?"}]
+    # The payload the service sends, system prompt included, for both calls
+    payload = {"model": service.model, "messages": service._build_messages(messages),
+               "temperature": 0.7, "max_tokens": 1000, "stream": False}
+    url = f"{api_url}/chat/completions"
+
+    def _check(response):
+        # A failing stub must fail the run, not time a fast error page
+        response.raise_for_status()
+        assert response.json()['choices'], 'stub returned no choices'
+
+    def bare_turn():
+        _check(requests.post(url, headers=service._get_headers(), json=payload, timeout=service.timeout))
+
+    def pooled_turn():
+        _check(service.session.post(url, json=payload, timeout=service.timeout))
+
+    turns = {'requests.post per turn': bare_turn, 'pooled session': pooled_turn}
+    samples = {name: [] for name in turns}
+    for turn in turns.values():
+        turn()  # warm up
+    for _ in range(args.turns):
+        for name, turn in turns.items():
+            start = time.perf_counter()
+            turn()
+            samples[name].append((time.perf_counter() - start) * 1000)
+
+    server.shutdown()
+    for name, times in samples.items():
+        p50, p99 = _percentiles(times)
+        print(f"{name:<24} p50 {p50:7.3f} ms   p99 {p99:7.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""
+Microbenchmark: keyword intent router vs. the old if/elif keyword cascade.
+
+The cascade below reproduces the substring checks _basic_nlp_match used to
+run, rebuilding each keyword list per call. Both are timed over the same
+query mix, and queries where they disagree are listed (mostly substring
+misfires such as "print" in "blueprint"). --extra-intents appends
+synthetic intents to both, to show how each scales as the table grows:
+the cascade runs one substring search per keyword, the router one regex
+scan whose cost grows more slowly with the number of alternatives.
+Times are the best of --repeats runs, per query.
+
+Usage:
+    python benchmarks/intent_routing.py --rounds 2000 --extra-intents 50
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.intent_router import INTENTS_PATH, IntentRouter, intent_router
+
+QUERIES = [
+    "I forgot my password and my account is locked",
+    "How do I install the VPN client for remote work?",
+    "Outlook won't send emails since this morning",
+    "The printer on floor 3 keeps jamming",
+    "My laptop is running slow after the update",
+    "WiFi keeps dropping in the meeting room",
+    "Olvidé mi contraseña, ¿cómo la restablezco?",
+    "Non riesco a installare la VPN",
+    "J'ai oublié mon mot de passe",
+    "Can you review the blueprint for the new office?",
+    "I'm sending the report to my manager",
+    "The projector in room B shows no signal",
+    "Quiero pedir un monitor nuevo",
+    "My keyboard stopped working",
+]
+
+
+def legacy_route(query):
+    """The keyword cascade formerly inlined in _basic_nlp_match."""
+    query_lower = query.lower()
+    if any(word in query_lower for word in ['password', 'login', 'forgot', 'reset', 'locked', 'contraseña', 'mot de passe', 'passwort', 'accesso', 'dimenticato', 'blocca', 'reimpostare', 'restablecer', 'olvidé', 'olvidado', 'bloqueado', 'iniciar sesión']):
+        return 'password_reset'
+    elif any(word in query_lower for word in ['vpn', 'remote', 'connection', 'work from home', 'installare', 'installa', 'connessione', 'accesso remoto', 'instalar', 'quiero', 'conexión', 'acceso remoto']):
+        return 'vpn'
+    elif any(word in query_lower for word in ['email', 'outlook', 'mail', 'send', 'receive']):
+        return 'email'
+    elif any(word in query_lower for word in ['printer', 'print', 'printing']):
+        return 'printer'
+    elif any(word in query_lower for word in ['slow', 'performance', 'running slow', 'sluggish']):
+        return 'slow_computer'
+    elif any(word in query_lower for word in ['wifi', 'wi-fi', 'wireless', 'internet', 'network']):
+        return 'network'
+    return None
+
+
+def generic_cascade(table):
+    """The same cascade shape driven by an intent -> keywords table."""
+    def route(query):
+        query_lower = query.lower()
+        for intent, keywords in table.items():
+            if any(word in query_lower for word in list(keywords)):
+                return intent
+        return None
+    return route
+
+
+def _time(route, queries, rounds, repeats=5):
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for query in queries:
+                route(query)
+        best = min(best, time.perf_counter() - start)
+    return best / (rounds * len(queries)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rounds', type=int, default=2000)
+    parser.add_argument('--extra-intents', type=int, default=50, help='synthetic intents added for the scaling run')
+    parser.add_argument('--keywords-per-intent', type=int, default=10)
+    args = parser.parse_args()
+
+    legacy_us = _time(legacy_route, QUERIES, args.rounds)
+    router_us = _time(intent_router.route, QUERIES, args.rounds)
+    # Unmatched queries are the worst case for the cascade: every list is scanned
+    misses = [q for q in QUERIES if legacy_route(q) is None]
+    legacy_miss_us = _time(legacy_route, misses, args.rounds) if misses else 0.0
+    router_miss_us = _time(intent_router.route, misses, args.rounds) if misses else 0.0
+
+    print(f"{'':<20} {'all queries':>14} {'no match':>14}")
+    print(f"{'if/elif cascade':<20} {legacy_us:11.2f} us {legacy_miss_us:11.2f} us")
+    print(f"{'intent router':<20} {router_us:11.2f} us {router_miss_us:11.2f} us")
+
+    if args.extra_intents:
+        with open(INTENTS_PATH, 'r', encoding='utf-8') as f:
+            table = json.load(f)
+        for i in range(args.extra_intents):
+            table[f'synthetic_{i}'] = [f'widget{i}x{j}' for j in range(args.keywords_per_intent)]
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False, encoding='utf-8') as f:
+            json.dump(table, f)
+        big_router = IntentRouter(f.name)
+        os.unlink(f.name)
+        keywords = sum(len(words) for words in table.values())
+        print(f"{'':<20} {keywords:>5} keywords: cascade {_time(generic_cascade(table), misses, args.rounds):8.2f} us"
+              f"   router {_time(big_router.route, misses, args.rounds):8.2f} us (no match)")
+
+    print("\nDisagreements (cascade -> router):")
+    for query in QUERIES:
+        old, new = legacy_route(query), intent_router.route(query)
+        if old != new:
+            print(f"  {query!r}: {old} -> {new}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""
+Accuracy and speed of LanguageSupport.detect_language on a labelled multilingual set.
+
+Compares the old keyword-substring detector (reproduced below) with the
+script + character n-gram detector in utils.language_detect over
+benchmarks/fixtures/language_samples.json, which is kept separate from the
+model's training sentences. Prints per-language accuracy, samples the
+new detector gets wrong, and time per call. Exits non-zero if overall
+accuracy falls below --min-accuracy. tests/test_language_detection.py
+checks every sample, short English messages included, as part of the test
+suite.
+
+Usage:
+    python benchmarks/language_detection.py --rounds 200 --min-accuracy 0.95
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.language_support import language_support
+
+FIXTURES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'language_samples.json')
+
+
+def legacy_detect(text):
+    """The keyword-substring detector LanguageSupport used before."""
+    text_lower = text.lower()
+    language_indicators = {
+        'it': ['ciao', 'grazie', 'per favore', 'aiuto', 'problema', 'password', 'italiano', 'ho', 'bisogno', 'può', 'salve', 'buongiorno'],
+        'es': ['hola', 'gracias', 'por favor', 'ayuda', 'problema', 'contraseña', 'español', 'tengo', 'necesito', 'puede', 'buenos días', 'quiero', 'instalar', 'como', 'donde', 'que', 'soy', 'estoy', 'mi', 'tu', 'su', 'este', 'esta'],
+        'fr': ['bonjour', 'merci', 's\'il vous plaît', 'aide', 'problème', 'mot de passe', 'français', 'j\'ai', 'besoin', 'pouvez', 'salut'],
+        'de': ['hallo', 'danke', 'bitte', 'hilfe', 'problem', 'passwort', 'deutsch', 'ich habe', 'brauche', 'können', 'guten tag'],
+        'pt': ['olá', 'obrigado', 'por favor', 'ajuda', 'problema', 'senha', 'português', 'tenho', 'preciso', 'pode', 'bom dia'],
+        'nl': ['hallo', 'dank je', 'alsjeblieft', 'hulp', 'probleem', 'wachtwoord', 'nederlands', 'ik heb', 'nodig', 'kunt', 'goedemorgen'],
+        'zh': ['你好', '谢谢', '请', '帮助', '问题', '密码', '中文', '我有', '需要', '可以'],
+        'ja': ['こんにちは', 'ありがとう', 'お願い', 'ヘルプ', '問題', 'パスワード', '日本語', '私は', '必要', 'できます'],
+        'ko': ['안녕하세요', '감사합니다', '제발', '도움', '문제', '비밀번호', '한국어', '저는', '필요', '할 수'],
+        'ar': ['مرحبا', 'شكرا', 'من فضلك', 'مساعدة', 'مشكلة', 'كلمة المرور', 'عربي', 'لدي', 'أحتاج', 'يمكن'],
+        'ru': ['привет', 'спасибо', 'пожалуйста', 'помощь', 'проблема', 'пароль', 'русский', 'у меня', 'нужно', 'можете'],
+        'hi': ['नमस्ते', 'धन्यवाद', 'कृपया', 'मदद', 'समस्या', 'पासवर्ड', 'हिंदी', 'मेरे पास', 'चाहिए', 'कर सकते']
+    }
+    language_scores = {}
+    for lang, keywords in language_indicators.items():
+        score = sum(1 for keyword in keywords if keyword in text_lower)
+        if score > 0:
+            language_scores[lang] = score
+    if language_scores:
+        return max(language_scores.items(), key=lambda x: x[1])[0]
+    return 'en'
+
+
+def _evaluate(detect, fixtures):
+    per_language = {}
+    errors = []
+    for language, texts in fixtures.items():
+        correct = 0
+        for text in texts:
+            detected = detect(text)
+            if detected == language:
+                correct += 1
+            else:
+                errors.append((language, detected, text))
+        per_language[language] = correct / len(texts)
+    total = sum(len(texts) for texts in fixtures.values())
+    overall = (total - len(errors)) / total
+    return overall, per_language, errors
+
+
+def _time(detect, texts, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for text in texts:
+            detect(text)
+    return (time.perf_counter() - start) / (rounds * len(texts)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rounds', type=int, default=200)
+    parser.add_argument('--min-accuracy', type=float, default=0.95)
+    args = parser.parse_args()
+
+    with open(FIXTURES_PATH, 'r', encoding='utf-8') as f:
+        fixtures = json.load(f)
+    texts = [text for samples in fixtures.values() for text in samples]
+
+    results = {}
+    for name, detect in (('keyword substrings', legacy_detect), ('script + n-gram', language_support.detect_language)):
+        overall, per_language, errors = _evaluate(detect, fixtures)
+        results[name] = overall
+        print(f"{name:<20} accuracy {overall:6.1%}   {_time(detect, texts, args.rounds):7.1f} us/message")
+        print('    ' + '  '.join(f"{lang} {acc:.0%}" for lang, acc in per_language.items()))
+        for expected, detected, text in (errors if name == 'script + n-gram' else ()):
+            print(f"    expected {expected}, got {detected}: {text}")
+
+    if results['script + n-gram'] < args.min_accuracy:
+        sys.exit(f"accuracy below {args.min_accuracy:.0%}")
+
+
+if __name__ == '__main__':
+    main()
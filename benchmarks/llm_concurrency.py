@@ -0,0 +1,129 @@
+"""
+Concurrency benchmark for the shared AI client against a local stub server.
+
+Simulates many Streamlit sessions asking at once, a share of them the same
+question, and compares streaming from GrokAIService directly in every
+thread (what the Query page did) with streaming through the shared
+AsyncLLMClient (concurrency limit plus coalescing of identical in-flight
+streams). Reports wall time, the number of upstream requests and the peak
+number of upstream requests in flight, and checks every session got the
+whole answer.
+
+Usage:
+    python benchmarks/llm_concurrency.py --users 64 --distinct 8 --delay-ms 200 --limit 8
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+ANSWER = ['Open ', 'the ', 'company ', 'login ', 'portal ', 'and ', "click 'Forgot Password'."]
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    wbufsize = 64 * 1024
+    delay = 0.0
+    lock = threading.Lock()
+    requests = 0
+    active = 0
+    peak = 0
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        json.loads(self.rfile.read(length))
+        cls = type(self)
+        with cls.lock:
+            cls.requests += 1
+            cls.active += 1
+            cls.peak = max(cls.peak, cls.active)
+        time.sleep(self.delay)
+        with cls.lock:
+            cls.active -= 1
+        body = ''.join(
+            f"data: {json.dumps({'choices': [{'delta': {'content': word}}]})}\n\n" for word in ANSWER
+        ) + "data: [DONE]\n\n"
+        body = body.encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+    @classmethod
+    def reset(cls):
+        cls.requests = cls.active = cls.peak = 0
+
+
+class _StubServer(ThreadingHTTPServer):
+    # Accept a burst of simultaneous connections without refusing any
+    request_queue_size = 1024
+
+
+def _run(users, distinct, stream):
+    """Fire one question per simulated user at once; return wall time in seconds and the answers."""
+    barrier = threading.Barrier(users)
+    answers = [None] * users
+
+    def session(i):
+        messages = [{"role": "user", "content": f"How do I reset my password? ({i % distinct})"}]
+        barrier.wait()
+        answers[i] = ''.join(stream(messages))
+
+    threads = [threading.Thread(target=session, args=(i,)) for i in range(users)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - start, answers
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=64, help='concurrent sessions')
+    parser.add_argument('--distinct', type=int, default=8, help='number of distinct questions among them')
+    parser.add_argument('--delay-ms', type=float, default=200.0, help='simulated generation time per request')
+    parser.add_argument('--limit', type=int, default=8, help='GROK_MAX_CONCURRENCY for the shared client')
+    args = parser.parse_args()
+
+    _StubHandler.delay = args.delay_ms / 1000
+    server = _StubServer(('127.0.0.1', 0), _StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    os.environ['GROK_API_KEY'] = 'stub'
+    os.environ['GROK_API_URL'] = f"http://127.0.0.1:{server.server_port}/v1"
+    os.environ['GROK_POOL_SIZE'] = str(max(args.users, args.limit))
+
+    from utils.grok_ai import get_grok_service
+    from utils.llm_client import AsyncLLMClient
+
+    service = get_grok_service()
+    client = AsyncLLMClient(max_concurrency=args.limit)
+
+    results = {}
+    for name, stream in (('direct stream per session', service.request_completion_stream),
+                         ('shared async client', client.stream)):
+        _StubHandler.reset()
+        elapsed, answers = _run(args.users, args.distinct, stream)
+        assert answers == [''.join(ANSWER)] * args.users, f"{name}: a session got an incomplete answer"
+        results[name] = (elapsed, _StubHandler.requests, _StubHandler.peak)
+
+    server.shutdown()
+    print(f"{args.users} sessions, {args.distinct} distinct questions, {args.delay_ms:.0f} ms per answer")
+    for name, (elapsed, count, peak) in results.items():
+        print(f"{name:<26} {elapsed * 1000:8.1f} ms   upstream requests {count:4d}   peak in flight {peak:3d}")
+
+
+if __name__ == '__main__':
+    main()
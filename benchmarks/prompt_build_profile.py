@@ -0,0 +1,96 @@
+"""
+Profile the per-turn request-building path: old inline assembly vs. utils.prompts.
+
+The "old" path reproduces what each chat turn used to do: rebuild the
+12-entry language prompt dict, concatenate the full system prompt, and
+estimate tokens over the whole assembled prompt. The "new" path is
+LanguageSupport.get_language_prompt plus GrokAIService._build_messages
+with memoized static segments. Reports time per turn and the peak memory
+allocated while building one turn (tracemalloc).
+
+Usage:
+    python benchmarks/prompt_build_profile.py --turns 5000 --language es
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault('GROK_API_KEY', 'profile')
+
+from utils.grok_ai import GrokAIService
+from utils.language_support import LANGUAGE_PROMPTS, DEFAULT_LANGUAGE_PROMPT, language_support
+from utils.prompt_budget import message_tokens
+from utils.prompts import HELPDESK_SYSTEM_PROMPT
+
+
+def legacy_language_prompt(user_language):
+    prompts = dict(LANGUAGE_PROMPTS)  # the literal dict used to be rebuilt on every call
+    return prompts.get(user_language, DEFAULT_LANGUAGE_PROMPT)
+
+
+def legacy_build(messages, user_context):
+    content = HELPDESK_SYSTEM_PROMPT
+    content += f"\nUser Context: Username: {user_context.get('username', 'N/A')}, ID: {user_context.get('user_id', 'N/A')}, Email: {user_context.get('email', 'N/A')}"
+    if user_context.get('language_prompt'):
+        content = user_context['language_prompt'] + "\n\n" + content
+    full = [{"role": "system", "content": content}] + messages
+    sum(message_tokens(m) for m in full)
+    return full
+
+
+def _turn_legacy(service, messages, base_context, language):
+    context = dict(base_context, language_prompt=legacy_language_prompt(language))
+    return legacy_build(messages, context)
+
+
+def _turn_new(service, messages, base_context, language):
+    context = dict(base_context, language_prompt=language_support.get_language_prompt(language))
+    return service._build_messages(messages, context)
+
+
+def _profile(turn, service, messages, context, language, turns):
+    turn(service, messages, context, language)  # warm caches
+    start = time.perf_counter()
+    for _ in range(turns):
+        turn(service, messages, context, language)
+    per_turn_us = (time.perf_counter() - start) / turns * 1e6
+
+    tracemalloc.start()
+    peaks = []
+    for _ in range(min(turns, 200)):
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        result = turn(service, messages, context, language)
+        _, peak = tracemalloc.get_traced_memory()
+        peaks.append(peak - before)
+        del result
+    tracemalloc.stop()
+    return per_turn_us, sum(peaks) / len(peaks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--turns', type=int, default=5000)
+    parser.add_argument('--language', default='es')
+    args = parser.parse_args()
+
+    service = GrokAIService()
+    messages = [
+        {"role": "user", "content": "My VPN disconnects every few minutes"},
+        {"role": "assistant", "content": "Let's check the client version and your network first."},
+        {"role": "user", "content": "It's the latest version and I'm on the office WiFi"},
+    ]
+    context = {'username': 'jdoe', 'user_id': 'EMP001', 'email': 'jdoe@company.com', 'language': args.language}
+
+    for name, turn in (('old inline assembly', _turn_legacy), ('memoized prompts', _turn_new)):
+        per_turn_us, peak_bytes = _profile(turn, service, messages, context, args.language, args.turns)
+        print(f"{name:<22} {per_turn_us:8.2f} us/turn   peak allocation {peak_bytes / 1024:7.1f} KiB/turn")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""
+Rule-based response translation: chained str.replace vs. the single-pass PhraseTranslator.
+
+The old LanguageSupport.format_response ran one str.replace per phrase over
+the whole response, so every pair copied the string and a short phrase
+could rewrite part of a longer word ("Hi" inside "High"). This prints the
+output of both for one sample response and times them over a response of
+--steps numbered steps.
+
+Usage:
+    python benchmarks/response_translation.py --language es --steps 40 --rounds 2000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.translation import get_translator, load_phrases
+
+SAMPLE = ("Hi Alex! High CPU usage is usually a stuck update. Step 1: Go to Settings and Check for updates. "
+          "If you don't receive the code within 5 minutes, check your spam folder.")
+
+
+def legacy_translate(text, phrases):
+    for english, translation in phrases.items():
+        text = text.replace(english, translation)
+    return text
+
+
+def _time(translate, text, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        translate(text)
+    return (time.perf_counter() - start) / rounds * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--language', default='es')
+    parser.add_argument('--steps', type=int, default=40)
+    parser.add_argument('--rounds', type=int, default=2000)
+    args = parser.parse_args()
+
+    phrases = load_phrases(args.language)
+    translator = get_translator(args.language)
+    print(f"chained replace: {legacy_translate(SAMPLE, phrases)}")
+    print(f"single pass:     {translator.translate(SAMPLE)}\n")
+
+    response = '\n'.join(f"Step {i}: Go to the portal, Click Next and Check the status. Enter your ID."
+                         for i in range(1, args.steps + 1))
+    for name, translate in (('chained replace', lambda text: legacy_translate(text, phrases)),
+                            ('single pass', translator.translate)):
+        print(f"{name:<16} {_time(translate, response, args.rounds):8.1f} us/response ({len(response)} chars)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+Query latency of the BM25 knowledge-base index at growing corpus sizes.
+
+Builds synthetic troubleshooting articles (the real knowledge base plus
+generated ones drawn from an IT vocabulary), then times top-k searches
+for a fixed query mix and reports build time and p50/p99 per query.
+
+Usage:
+    python benchmarks/retrieval_latency.py --sizes 100 1000 5000 --queries 2000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.knowledge_base import knowledge_base
+from utils.retrieval import BM25Index, Document
+
+VOCABULARY = """
+printer scanner toner driver queue laptop desktop monitor docking station keyboard mouse headset
+webcam microphone teams zoom outlook calendar mailbox attachment signature vpn certificate token
+password account locked expired mfa authenticator badge wifi ethernet proxy firewall dns browser
+cache cookie sharepoint onedrive backup restore license activation update patch reboot freeze crash
+battery charger bluetooth display resolution projector install uninstall permission folder drive
+""".split()
+
+QUERIES = [
+    "printer says offline but it is switched on",
+    "my vpn certificate expired",
+    "cannot open attachments in outlook",
+    "laptop battery drains too fast",
+    "need permission to the finance shared folder",
+    "teams webcam not detected after update",
+    "how do I restore a deleted onedrive file",
+    "blue screen after installing a driver",
+]
+
+
+def synthetic_documents(count, seed=7):
+    rng = random.Random(seed)
+    documents = [Document(f"kb:{k}", k, ' '.join(v)) for k, v in knowledge_base.steps().items()]
+    for i in range(max(0, count - len(documents))):
+        title = ' '.join(rng.sample(VOCABULARY, 2))
+        body = ' '.join(rng.choice(VOCABULARY) for _ in range(rng.randint(40, 120)))
+        documents.append(Document(f"synthetic:{i}", title, body))
+    return documents
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 5000])
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('-k', type=int, default=3)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        documents = synthetic_documents(size)
+        start = time.perf_counter()
+        index = BM25Index(documents)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        samples = []
+        for i in range(args.queries):
+            query = QUERIES[i % len(QUERIES)]
+            start = time.perf_counter()
+            index.search(query, args.k)
+            samples.append((time.perf_counter() - start) * 1e6)
+        samples.sort()
+        p99 = samples[max(0, int(len(samples) * 0.99) - 1)]
+        print(f"{len(documents):6d} articles   build {build_ms:8.1f} ms   "
+              f"search p50 {statistics.median(samples):7.1f} us   p99 {p99:7.1f} us")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Cost of saving chat sessions after each turn: write-through vs. batched checkpoints.
+
+Runs --sessions conversations side by side for --turns question/answer
+turns each, checkpointing every session after every turn into a fresh
+SQLite session store. Write-through commits each checkpoint on its own;
+batched queues them and writes all sessions in one transaction per round
+of turns, as the background flusher does. Reports the time the page
+spends per checkpoint, the number of transactions and the total time, and
+checks that the last session restores intact.
+
+Usage:
+    python benchmarks/session_checkpoint.py --sessions 50 --turns 100
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.chat_transcript import ChatTranscript
+from utils.language_tracker import LanguageTracker
+from utils.session_store import SessionStore, SessionSync, SqliteSessionStore
+
+
+def _run(sessions, turns, batched, directory):
+    store = SessionStore(SqliteSessionStore(os.path.join(directory, f"sessions_{batched}.db")),
+                         flush_interval=3600 if batched else 0)
+    users = [(SessionSync(f"EMP{n:05d}", store), ChatTranscript(directory=directory), {}) for n in range(sessions)]
+    tracker = LanguageTracker()
+
+    caller = 0.0
+    transactions = 0
+    start = time.perf_counter()
+    for turn in range(turns):
+        for sync, transcript, feedback in users:
+            transcript.append({"role": "user", "message": f"Question {turn}: my VPN keeps dropping", "timestamp": "09:15"})
+            transcript.append({"role": "assistant", "message": f"Answer {turn}: restart the VPN client. " * 20,
+                               "timestamp": "09:15", "language": "en"})
+            feedback[f"feedback_{len(transcript) - 1}"] = "helpful"
+            transcript.compact(feedback)
+
+            began = time.perf_counter()
+            sync.checkpoint(transcript, feedback, 'en', tracker)
+            caller += time.perf_counter() - began
+            transactions += 0 if batched else 1
+        if batched:
+            store.flush()
+            transactions += 1
+    total = time.perf_counter() - start
+
+    sync, transcript, _ = users[-1]
+    restored = SessionSync(sync.user_id, store).restore()['chat_history']
+    assert [m.message for m in restored] == [m.message for m in transcript], 'restored transcript differs'
+    return caller / (sessions * turns) * 1e6, transactions, total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sessions', type=int, default=50)
+    parser.add_argument('--turns', type=int, default=100)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        for label, batched in (('write-through', False), ('batched', True)):
+            per_checkpoint_us, transactions, total = _run(args.sessions, args.turns, batched, directory)
+            print(f"{label:14s} {per_checkpoint_us:9.1f} us/checkpoint on the page   "
+                  f"{transactions:6d} transactions   {total:6.2f} s total")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+Per-session memory of the chat transcript: list of dicts vs. ChatTranscript.
+
+Builds a conversation of --turns question/answer pairs both ways (the
+dict-per-message list plus one feedback_given key per answer that the
+Query page used to keep, and the slotted, windowed ChatTranscript that
+spills older turns to disk) and reports the memory each retains, measured
+with tracemalloc. Answers are distinct strings of about --answer-chars
+characters, like formatted AI responses.
+
+Usage:
+    python benchmarks/session_memory.py --turns 500 --answer-chars 1200
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.chat_transcript import ChatTranscript
+
+
+def _turns(count, answer_chars):
+    filler = "Restart the VPN client, then reconnect to the office network and check the status icon. "
+    for turn in range(count):
+        question = f"Question {turn}: my VPN keeps dropping after the latest update"
+        answer = f"Answer {turn}: " + (filler * (answer_chars // len(filler) + 1))[:answer_chars]
+        yield question, answer
+
+
+def _build_dicts(turns):
+    history, feedback = [], {}
+    for question, answer in turns:
+        history.append({"role": "user", "message": question, "timestamp": "09:15", "language": "en",
+                        "detected_language": "en", "language_confidence": 0.98})
+        history.append({"role": "assistant", "message": answer, "timestamp": "09:15", "language": "en"})
+        feedback[f"feedback_{len(history) - 1}"] = "completed"
+    return history, feedback
+
+
+def _build_transcript(turns, directory):
+    history, feedback = ChatTranscript(directory=directory), {}
+    for question, answer in turns:
+        history.append({"role": "user", "message": question, "timestamp": "09:15", "language": "en",
+                        "detected_language": "en", "language_confidence": 0.98})
+        history.append({"role": "assistant", "message": answer, "timestamp": "09:15", "language": "en"})
+        feedback[f"feedback_{len(history) - 1}"] = "completed"
+        history.compact(feedback)
+    return history, feedback
+
+
+def _retained(build):
+    tracemalloc.start()
+    result = build()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, retained
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--turns', type=int, default=500)
+    parser.add_argument('--answer-chars', type=int, default=1200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        (history, feedback), dict_bytes = _retained(lambda: _build_dicts(_turns(args.turns, args.answer_chars)))
+        print(f"list of dicts     {dict_bytes / 1024:9.1f} KiB   {len(history)} messages in memory, "
+              f"{len(feedback)} feedback keys")
+        del history, feedback
+
+        (history, feedback), transcript_bytes = _retained(
+            lambda: _build_transcript(_turns(args.turns, args.answer_chars), directory))
+        print(f"ChatTranscript    {transcript_bytes / 1024:9.1f} KiB   {len(history.recent())} messages in memory, "
+              f"{len(feedback)} feedback keys, {history.offset} on disk")
+
+
+if __name__ == '__main__':
+    main()
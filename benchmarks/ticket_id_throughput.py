@@ -0,0 +1,89 @@
+"""
+Throughput and uniqueness benchmark for the ticket ID generator.
+
+Generates IDs from several processes (each running several threads),
+then checks that every ID is unique and that each thread saw strictly
+increasing IDs.
+
+Each ID takes the generator lock once and encodes only its last two
+characters; the rest is reused within a millisecond. One thread manages
+roughly 0.7-0.8M IDs/sec on a single core. Threads in a process share the
+GIL, so adding them does not add throughput, and only processes on
+separate cores scale.
+
+Usage:
+    python benchmarks/ticket_id_throughput.py --processes 4 --threads 4 --ids 250000
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.ticket_ids import new_ticket_id
+
+
+def _worker(threads, ids_per_thread, queue):
+    results = [None] * threads
+    start_event = threading.Event()
+
+    def run(slot):
+        start_event.wait()
+        results[slot] = [new_ticket_id() for _ in range(ids_per_thread)]
+
+    pool = [threading.Thread(target=run, args=(t,)) for t in range(threads)]
+    for thread in pool:
+        thread.start()
+    start = time.perf_counter()
+    start_event.set()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    monotonic = all(ids == sorted(ids) and len(set(ids)) == len(ids) for ids in results)
+    queue.put((elapsed, monotonic, [i for ids in results for i in ids]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--ids', type=int, default=250000, help='IDs per thread')
+    args = parser.parse_args()
+
+    queue = multiprocessing.Queue()
+    procs = [
+        multiprocessing.Process(target=_worker, args=(args.threads, args.ids, queue))
+        for _ in range(args.processes)
+    ]
+    for proc in procs:
+        proc.start()
+    results = [queue.get() for _ in procs]
+    for proc in procs:
+        proc.join()
+
+    total = args.processes * args.threads * args.ids
+    seen = set()
+    for _, _, ids in results:
+        seen.update(ids)
+    collisions = total - len(seen)
+    monotonic = all(ok for _, ok, _ in results)
+    per_process = [args.threads * args.ids / elapsed for elapsed, _, _ in results]
+
+    print(f"generators:  {args.processes} processes x {args.threads} threads")
+    print(f"ids:         {total:,}")
+    print(f"collisions:  {collisions}")
+    print(f"monotonic:   {'yes' if monotonic else 'NO'} (per thread)")
+    print(f"throughput:  {sum(per_process):,.0f} ids/sec aggregate, "
+          f"{min(per_process):,.0f}-{max(per_process):,.0f} ids/sec per process")
+
+    if collisions or not monotonic:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""
+Lookup latency benchmark for the SQLite ticket store.
+
+Loads a synthetic history of tickets spread over many users and a year
+of timestamps, then times get-by-ID, "my tickets" pages and date-range
+queries.
+
+Usage:
+    python benchmarks/ticket_queries.py --tickets 300000 --users 5000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.ticket_ids import new_ticket_id
+from utils.tickets import SqliteTicketStore, TIMESTAMP_FORMAT
+
+
+def _time(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.99) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tickets', type=int, default=300000)
+    parser.add_argument('--users', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=1000)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    origin = datetime(2025, 1, 1)
+    tickets = []
+    for _ in range(args.tickets):
+        user = rng.randrange(args.users)
+        tickets.append({
+            "ticket_id": new_ticket_id(),
+            "username": f"user{user}",
+            "user_id": f"EMP{user:05d}",
+            "email": f"user{user}@example.com",
+            "summary": "Synthetic ticket for benchmarking",
+            "timestamp": (origin + timedelta(seconds=rng.randrange(365 * 86400))).strftime(TIMESTAMP_FORMAT)
+        })
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SqliteTicketStore(os.path.join(tmp, 'tickets.db'))
+        start = time.perf_counter()
+        store.import_tickets(tickets)
+        print(f"loaded {store.count():,} tickets in {time.perf_counter() - start:.1f}s")
+
+        ids = [t['ticket_id'] for t in rng.sample(tickets, min(args.repeat, len(tickets)))]
+        queries = {
+            'get_ticket': lambda: store.get_ticket(rng.choice(ids)),
+            'list_user_tickets (page 1)': lambda: store.list_user_tickets(
+                user_id=f"EMP{rng.randrange(args.users):05d}", limit=20),
+            'list_user_tickets (page 3)': lambda: store.list_user_tickets(
+                username=f"user{rng.randrange(args.users)}", limit=20, offset=40),
+            'list_tickets_between (1h)': lambda: store.list_tickets_between(
+                *_window(origin, rng, hours=1)),
+        }
+        for name, fn in queries.items():
+            p50, p99 = _time(fn, args.repeat)
+            print(f"{name:<28} p50 {p50:.3f} ms   p99 {p99:.3f} ms")
+
+
+def _window(origin, rng, hours):
+    start = origin + timedelta(seconds=rng.randrange(364 * 86400))
+    return start, start + timedelta(hours=hours)
+
+
+if __name__ == '__main__':
+    main()
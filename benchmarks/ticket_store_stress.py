@@ -0,0 +1,93 @@
+"""
+Concurrency stress benchmark for the ticket store.
+
+Hammers one ticket log from several processes (each running several
+threads) and verifies that no ticket was lost or duplicated.
+
+Usage:
+    python benchmarks/ticket_store_stress.py --processes 8 --threads 4 --tickets 200
+"""
+
+import argparse
+import collections
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.tickets import TicketStore
+
+
+def _worker(path, worker_id, threads, tickets_per_thread, compact_every):
+    store = TicketStore(path, compact_every=compact_every)
+
+    def run(thread_id):
+        for i in range(tickets_per_thread):
+            store.create(
+                f"user{worker_id}",
+                f"EMP{worker_id:03d}",
+                f"user{worker_id}@example.com",
+                f"stress-{worker_id}-{thread_id}-{i}"
+            )
+
+    pool = [threading.Thread(target=run, args=(t,)) for t in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--tickets', type=int, default=100, help='tickets per thread')
+    parser.add_argument('--compact-every', type=int, default=250)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'tickets.jsonl')
+        expected = args.processes * args.threads * args.tickets
+
+        start = time.perf_counter()
+        procs = [
+            multiprocessing.Process(
+                target=_worker,
+                args=(path, p, args.threads, args.tickets, args.compact_every)
+            )
+            for p in range(args.processes)
+        ]
+        for proc in procs:
+            proc.start()
+        for proc in procs:
+            proc.join()
+        elapsed = time.perf_counter() - start
+
+        tickets = TicketStore(path, compact_every=0).all_tickets()
+        counts = collections.Counter(t['summary'] for t in tickets)
+        wanted = {
+            f"stress-{p}-{t}-{i}"
+            for p in range(args.processes)
+            for t in range(args.threads)
+            for i in range(args.tickets)
+        }
+        lost = len(wanted - set(counts))
+        duplicated = sum(1 for c in counts.values() if c > 1)
+
+    print(f"writers:     {args.processes} processes x {args.threads} threads")
+    print(f"expected:    {expected}")
+    print(f"stored:      {len(tickets)}")
+    print(f"lost:        {lost}")
+    print(f"duplicated:  {duplicated}")
+    print(f"throughput:  {expected / elapsed:,.0f} tickets/sec ({elapsed:.2f}s)")
+
+    if lost or duplicated or len(tickets) != expected:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
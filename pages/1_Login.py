@@ -1,5 +1,6 @@
 import streamlit as st
 from utils.auth import authenticate
+from utils.session_store import SessionSync
 
 # Enhanced page configuration
 st.set_page_config(
@@ -133,6 +134,13 @@ if st.session_state.get('logged_in', False):
         if st.button("🎫 Create Support Ticket"):
             st.switch_page("pages/3_Ticket.py")
 
+    if st.button("🚪 Log out"):
+        # The saved session (resumed at the next login) stays; the spilled transcript goes
+        if 'chat_history' in st.session_state:
+            st.session_state.chat_history.discard()
+        st.session_state.clear()
+        st.rerun()
+
 else:
     st.markdown("### Login")
     username = st.text_input("Username")
@@ -146,6 +154,11 @@ else:
             st.session_state.username = user['username']
             st.session_state.user_id = user['id']
             st.session_state.email = user['email']
+            # Resume the user's last conversation, e.g. after a restart or a move to another replica
+            st.session_state.session_sync = SessionSync(user['id'])
+            restored = st.session_state.session_sync.restore()
+            if restored:
+                st.session_state.update(restored)
             st.success("✅ Login successful! Redirecting...")
             st.switch_page("pages/2_Query.py")
         else:
@@ -1,6 +1,10 @@
 import streamlit as st
-from utils.simple_steps import match_query
 from utils.language_support import language_support
+from utils.language_tracker import LanguageTracker
+from utils.chat_render import TranscriptView, bubble_html, fragment, polling_fragment, render_blocks
+from utils.chat_jobs import FAILED, ChatQueueFull, chat_jobs
+from utils.chat_transcript import SPILL_BATCH, ChatTranscript
+from utils.session_store import SessionSync
 try:
     from utils.grok_ai import is_grok_available
 except ImportError:
@@ -410,7 +414,10 @@ if 'username' not in st.session_state:
 
 # Initialize session state variables
 if "chat_history" not in st.session_state:
-    st.session_state.chat_history = []
+    st.session_state.chat_history = ChatTranscript()
+
+if "earlier_shown" not in st.session_state:
+    st.session_state.earlier_shown = 0
 
 if "input_key" not in st.session_state:
     st.session_state.input_key = 0
@@ -424,6 +431,90 @@ if "current_feedback_msg" not in st.session_state:
 if "user_language" not in st.session_state:
     st.session_state.user_language = 'en'
 
+if "language_tracker" not in st.session_state:
+    st.session_state.language_tracker = LanguageTracker(st.session_state.user_language)
+
+if "transcript_view" not in st.session_state:
+    st.session_state.transcript_view = TranscriptView()
+
+if "session_sync" not in st.session_state:
+    st.session_state.session_sync = SessionSync(st.session_state.get('user_id') or st.session_state.username)
+
+# Seconds between refreshes of a reply being generated in the background
+REPLY_POLL_SECONDS = 0.3
+
+def submit_reply(query, user_context, language, remember_for_ticket=False):
+    """Queue the answer to the question just added to the transcript; False if the assistant is too busy."""
+    try:
+        job = chat_jobs.submit(query, user_context, **st.session_state.chat_history.prompt_history())
+    except ChatQueueFull:
+        st.session_state.chat_history.pop()
+        st.warning("⏳ The assistant is busy right now. Please send your question again in a moment.")
+        return False
+    st.session_state.pending_reply = {"job": job, "language": language, "remember_for_ticket": remember_for_ticket}
+    return True
+
+def save_session():
+    """Checkpoint the conversation so a restart or another replica can resume it (written in batches)."""
+    st.session_state.session_sync.checkpoint(
+        st.session_state.chat_history,
+        st.session_state.feedback_given,
+        st.session_state.user_language,
+        st.session_state.language_tracker
+    )
+
+def finish_reply(pending):
+    """Move a finished (or cancelled) background reply into the transcript."""
+    job = pending["job"]
+    response = job.text
+    if job.cancelled:
+        response = (response + "\n\n" if response else "") + "⏹️ *Generation stopped.*"
+    elif job.status == FAILED and not response:
+        response = "⚠️ Sorry, something went wrong while answering. Please try again."
+    formatted_response = language_support.format_multilingual_response(response, pending["language"])
+    
+    st.session_state.chat_history.append({
+        "role": "assistant", 
+        "message": formatted_response, 
+        "timestamp": datetime.now().strftime("%H:%M"),
+        "language": pending["language"]
+    })
+    if job.cancelled:
+        # No vote on a stopped answer; the main input comes back straight away
+        st.session_state.feedback_given[f"feedback_{len(st.session_state.chat_history) - 1}"] = "cancelled"
+    if pending["remember_for_ticket"]:
+        # Update session variables for potential ticket creation
+        st.session_state.query = job.query
+        st.session_state.solution = response
+    del st.session_state.pending_reply
+    # Keep only the recent window in memory
+    st.session_state.chat_history.compact(st.session_state.feedback_given)
+    save_session()
+
+def render_pending_reply(block=False):
+    """Show the reply being generated with a stop button; once it is finished, add it and rerun the page."""
+    pending = st.session_state.get("pending_reply")
+    if not pending:
+        return
+    job = pending["job"]
+    placeholder = st.empty()
+    if not (job.done or job.cancelled):
+        st.button("⏹️ Stop generating", key=f"cancel_{job.id}", on_click=job.cancel)
+    
+    while True:
+        if job.done or job.cancelled:
+            finish_reply(pending)
+            st.rerun()
+        text = job.text
+        placeholder.markdown(bubble_html("assistant", text + " ▌" if text else "⏳ Thinking...", datetime.now().strftime("%H:%M")), unsafe_allow_html=True)
+        if not block:
+            return
+        job.wait(REPLY_POLL_SECONDS)
+
+# Refresh the pending reply on a timer where Streamlit supports it; otherwise wait for it in this run
+poll_reply = polling_fragment(REPLY_POLL_SECONDS)
+render_live_reply = poll_reply(render_pending_reply) if poll_reply else (lambda: render_pending_reply(block=True))
+
 # Header with user info and language indicator
 current_lang = st.session_state.get('user_language', 'en')
 language_options = {
@@ -456,193 +547,209 @@ if not st.session_state.chat_history:
     st.session_state.chat_history.append({
         "role": "assistant",
         "message": welcome_msg,
-        "timestamp": datetime.now().strftime("%H:%M")
+        "timestamp": datetime.now().strftime("%H:%M"),
+        "welcome": True
     })
 
 # WhatsApp-style chat interface (removed extra spacing)
 st.markdown('<div class="chat-container">', unsafe_allow_html=True)
     
-for i, chat in enumerate(st.session_state.chat_history):
-    if chat["role"] == "user":
-        # WhatsApp-style user message (right side, green)
-        st.markdown(f"""
-        <div class="message-container-user">
-            <div class="user-message">
-                <div>{chat['message']}</div>
-                <div class="message-time">{chat['timestamp']}</div>
-            </div>
-        </div>
-        """, unsafe_allow_html=True)
+def needs_widgets(i, chat):
+    """Whether a transcript message still shows feedback, follow-up or ticket controls."""
+    if i == 0 or chat["role"] == "user":
+        return False
+    feedback = st.session_state.feedback_given.get(f"feedback_{i}")
+    return feedback in (None, "not_helpful") or (feedback == "helpful" and i == len(st.session_state.chat_history) - 1)
+
+def settled_entry(i, chat):
+    """(role, message, timestamp, notice) for a message whose controls are done."""
+    feedback = st.session_state.feedback_given.get(f"feedback_{i}") or chat.get("feedback")
+    notice = "🙏 Thank you for your feedback. We appreciate your time!" if i > 0 and feedback == "completed" else None
+    return (chat["role"], chat["message"], chat["timestamp"], notice)
+
+def show_earlier():
+    """Button callback: bring another batch of spilled messages back on screen."""
+    st.session_state.earlier_shown += SPILL_BATCH
+
+# Only the recent window of the transcript is in memory; older turns are read back from disk on request
+history = st.session_state.chat_history
+earlier = []
+if history.offset:
+    shown = min(st.session_state.earlier_shown, history.offset)
+    if shown < history.offset:
+        st.button(f"⬆️ Show earlier messages ({history.offset - shown})", key="show_earlier", on_click=show_earlier)
+    earlier = list(enumerate(history.load_spilled(history.offset - shown), history.offset - shown))
+
+# Messages before the first one with live controls are settled: they render as a few cached blocks.
+# The rest is a fragment, so a feedback vote reruns only that part of the page.
+active_start = next((i for i, chat in history.recent_items() if needs_widgets(i, chat)), len(history))
+render_blocks(st.session_state.transcript_view.blocks(
+    [settled_entry(i, chat) for i, chat in earlier + [item for item in history.recent_items() if item[0] < active_start]]))
+
+def record_feedback(i, feedback):
+    """Button callback: store a vote on assistant message i."""
+    st.session_state.feedback_given[f"feedback_{i}"] = feedback
+    if feedback == "not_helpful":
+        st.session_state.current_feedback_msg = i
+    save_session()
+
+@fragment
+def render_active_turn(start):
+    """The newest turn: bubbles plus feedback, follow-up and ticket controls."""
+    for i in range(start, len(st.session_state.chat_history)):
+        chat = st.session_state.chat_history[i]
+        st.markdown(bubble_html(chat["role"], chat['message'], chat['timestamp']), unsafe_allow_html=True)
     
-    else:  # assistant message
-        # WhatsApp-style assistant message (left side, white)
-        st.markdown(f"""
-        <div class="message-container-assistant">
-            <div class="assistant-message">
-                <div>{chat['message']}</div>
-                <div class="message-time">{chat['timestamp']}</div>
-            </div>
-        </div>
-        """, unsafe_allow_html=True)
+        if chat["role"] != "user":  # assistant message
         
-        # Add feedback buttons ONLY after assistant responses (not welcome message)
-        if i > 0:  # Skip welcome message
-            feedback_key = f"feedback_{i}"
+            # Add feedback buttons ONLY after assistant responses (not welcome message)
+            if i > 0:  # Skip welcome message
+                feedback_key = f"feedback_{i}"
             
-            # Check if feedback already given for this message
-            if feedback_key not in st.session_state.feedback_given:
-                # Show feedback buttons
-                st.markdown("---")
-                st.markdown("**🔄 Was this response helpful?**")
-                
-                # Horizontal buttons using columns with corner positioning
-                col1, col2, col3 = st.columns([1, 2, 1])
+                # Check if feedback already given for this message
+                if feedback_key not in st.session_state.feedback_given:
+                    # Show feedback buttons
+                    st.markdown("---")
+                    st.markdown("**🔄 Was this response helpful?**")
                 
-                with col1:
-                    helpful_btn = st.button(
-                        "👍 Helpful", 
-                        key=f"helpful_{i}",
-                        use_container_width=True
-                    )
+                    # Horizontal buttons using columns with corner positioning
+                    col1, col2, col3 = st.columns([1, 2, 1])
                 
-                with col3:
-                    not_helpful_btn = st.button(
-                        "👎 Not Helpful", 
-                        key=f"not_helpful_{i}",
-                        use_container_width=True
-                    )
+                    # Votes are recorded in callbacks, before the rerun: inside the fragment only this
+                    # turn reruns, and the main input stays hidden either way
+                    with col1:
+                        st.button(
+                            "👍 Helpful", 
+                            key=f"helpful_{i}",
+                            use_container_width=True,
+                            on_click=record_feedback,
+                            args=(i, "helpful")
+                        )
                 
-                if helpful_btn:
-                    st.session_state.feedback_given[feedback_key] = "helpful"
-                    st.rerun()
-                
-                if not_helpful_btn:
-                    st.session_state.feedback_given[feedback_key] = "not_helpful"
-                    st.session_state.current_feedback_msg = i
-                    st.rerun()
+                    with col3:
+                        st.button(
+                            "👎 Not Helpful", 
+                            key=f"not_helpful_{i}",
+                            use_container_width=True,
+                            on_click=record_feedback,
+                            args=(i, "not_helpful")
+                        )
             
-            else:
-                # Show feedback result
-                feedback_type = st.session_state.feedback_given[feedback_key]
+                else:
+                    # Show feedback result
+                    feedback_type = st.session_state.feedback_given[feedback_key]
                 
-                if feedback_type == "helpful":
-                    # Only show follow-up input if no new conversation has started
-                    latest_messages = st.session_state.chat_history[i+1:]
-                    if not latest_messages:  # No new messages after this feedback
-                        # Show new chat input for next question
-                        st.markdown("---")
-                        st.markdown("**💬 Great! Do you have another question?**")
+                    if feedback_type == "helpful":
+                        # Only show follow-up input if no new conversation has started
+                        latest_messages = st.session_state.chat_history[i+1:]
+                        if not latest_messages:  # No new messages after this feedback
+                            # Show new chat input for next question
+                            st.markdown("---")
+                            st.markdown("**💬 Great! Do you have another question?**")
                         
-                        # Create a follow-up input that matches main chat input
-                        with st.form(key=f"follow_up_form_{i}", clear_on_submit=True):
-                            col1, col2 = st.columns([6, 1])
-                            with col1:
-                                follow_up_query = st.text_area(
-                                    " ",
-                                    placeholder="Ask your next question or type 'thank you' to end... (Enter for new line, Ctrl+Enter to send)",
-                                    key=f"follow_up_input_{i}",
-                                    label_visibility="collapsed",
-                                    height=60
-                                )
-                            with col2:
-                                submit_follow_up = st.form_submit_button("➤", type="primary", use_container_width=True)
+                            # Create a follow-up input that matches main chat input
+                            with st.form(key=f"follow_up_form_{i}", clear_on_submit=True):
+                                col1, col2 = st.columns([6, 1])
+                                with col1:
+                                    follow_up_query = st.text_area(
+                                        " ",
+                                        placeholder="Ask your next question or type 'thank you' to end... (Enter for new line, Ctrl+Enter to send)",
+                                        key=f"follow_up_input_{i}",
+                                        label_visibility="collapsed",
+                                        height=60
+                                    )
+                                with col2:
+                                    submit_follow_up = st.form_submit_button("➤", type="primary", use_container_width=True)
                             
-                            if submit_follow_up and follow_up_query.strip():
-                                # Check if user wants to end the chat
-                                if follow_up_query.lower().strip() in ['thank you', 'thanks', 'thank you!', 'thanks!', 'ty', 'thx']:
-                                    st.success("🙏 Thank you for using our IT Helpdesk! Have a great day!")
-                                    # Add farewell message to chat history
-                                    st.session_state.chat_history.append({
-                                        "role": "user",
-                                        "message": follow_up_query,
-                                        "timestamp": datetime.now().strftime("%H:%M")
-                                    })
-                                    st.session_state.chat_history.append({
-                                        "role": "assistant", 
-                                        "message": "Thank you for using our IT Helpdesk! Have a great day! 👋",
-                                        "timestamp": datetime.now().strftime("%H:%M")
-                                    })
-                                    st.rerun()
-                                else:
-                                    # Continue with new question
-                                    # Always detect language for each follow-up query
-                                    detected_lang = language_support.detect_language(follow_up_query)
-                                    
-                                    # Update session language if changed
-                                    if detected_lang != st.session_state.user_language:
-                                        st.session_state.user_language = detected_lang
-                                    
-                                    # Use detected language for this specific follow-up query
-                                    current_followup_language = detected_lang
-                                    
-                                    # Add user message to chat history
-                                    st.session_state.chat_history.append({
-                                        "role": "user", 
-                                        "message": follow_up_query, 
-                                        "timestamp": datetime.now().strftime("%H:%M"),
-                                        "language": current_followup_language
-                                    })
+                                if submit_follow_up and follow_up_query.strip():
+                                    # Check if user wants to end the chat
+                                    if follow_up_query.lower().strip() in ['thank you', 'thanks', 'thank you!', 'thanks!', 'ty', 'thx']:
+                                        st.success("🙏 Thank you for using our IT Helpdesk! Have a great day!")
+                                        # Add farewell message to chat history
+                                        st.session_state.chat_history.append({
+                                            "role": "user",
+                                            "message": follow_up_query,
+                                            "timestamp": datetime.now().strftime("%H:%M")
+                                        })
+                                        st.session_state.chat_history.append({
+                                            "role": "assistant", 
+                                            "message": "Thank you for using our IT Helpdesk! Have a great day! 👋",
+                                            "timestamp": datetime.now().strftime("%H:%M")
+                                        })
+                                        save_session()
+                                        st.rerun()
+                                    else:
+                                        # Continue with new question
+                                        # Session language only changes on a confident (or repeated) detection
+                                        tracker = st.session_state.language_tracker
+                                        current_followup_language = tracker.observe(follow_up_query)
+                                        st.session_state.user_language = current_followup_language
                                     
-                                    # Get user context for AI with detected language
-                                    user_context = {
-                                        'username': st.session_state.get('username', 'User'),
-                                        'user_id': st.session_state.get('user_id', 'unknown'),
-                                        'email': st.session_state.get('email', 'user@company.com'),
-                                        'language': current_followup_language,
-                                        'language_prompt': language_support.get_language_prompt(current_followup_language)
-                                    }
+                                        # Add user message to chat history
+                                        st.session_state.chat_history.append({
+                                            "role": "user", 
+                                            "message": follow_up_query, 
+                                            "timestamp": datetime.now().strftime("%H:%M"),
+                                            "language": current_followup_language,
+                                            "detected_language": tracker.detected,
+                                            "language_confidence": round(tracker.confidence, 2)
+                                        })
                                     
-                                    # Get assistant response
-                                    response = match_query(follow_up_query, user_context, st.session_state.chat_history)
+                                        # Get user context for AI with detected language
+                                        user_context = {
+                                            'username': st.session_state.get('username', 'User'),
+                                            'user_id': st.session_state.get('user_id', 'unknown'),
+                                            'email': st.session_state.get('email', 'user@company.com'),
+                                            'language': current_followup_language,
+                                            'language_prompt': language_support.get_language_prompt(current_followup_language)
+                                        }
                                     
-                                    # Format response for the detected language
-                                    formatted_response = language_support.format_multilingual_response(response, current_followup_language)
-                                    
-                                    st.session_state.chat_history.append({
-                                        "role": "assistant", 
-                                        "message": formatted_response, 
-                                        "timestamp": datetime.now().strftime("%H:%M"),
-                                        "language": current_followup_language
-                                    })
-                                    
-                                    st.rerun()
-                        # If there are new messages, don't show anything else - the conversation continues
+                                        # Answer in the background; the page shows it as it streams in
+                                        if submit_reply(follow_up_query, user_context, current_followup_language):
+                                            st.rerun()
+                            # If there are new messages, don't show anything else - the conversation continues
                     
-                if feedback_type == "not_helpful":
-                    # Show ticket creation question directly
-                    st.info("💡 Would you like to create a ticket for a human to assist you?")
+                    if feedback_type == "not_helpful":
+                        # Show ticket creation question directly
+                        st.info("💡 Would you like to create a ticket for a human to assist you?")
                     
-                    col_yes, col_middle, col_no = st.columns([1, 2, 1])
+                        col_yes, col_middle, col_no = st.columns([1, 2, 1])
                     
-                    with col_yes:
-                        if st.button("✅ Yes, Create Ticket", key=f"create_ticket_{i}"):
-                            # Prepare ticket summary
-                            user_message = "General inquiry"
-                            if i > 0 and i-1 < len(st.session_state.chat_history):
-                                user_message = st.session_state.chat_history[i-1]['message']
+                        with col_yes:
+                            if st.button("✅ Yes, Create Ticket", key=f"create_ticket_{i}"):
+                                # Prepare ticket summary
+                                user_message = "General inquiry"
+                                if i > 0 and i-1 < len(st.session_state.chat_history):
+                                    user_message = st.session_state.chat_history[i-1]['message']
                             
-                            st.session_state.summary = f"User needed assistance with: {user_message}"
-                            st.session_state.query = user_message
-                            st.session_state.solution = chat['message']
-                            st.session_state.show_satisfaction = True
-                            st.session_state.show_ticket_form = True
-                            st.switch_page("pages/3_Ticket.py")
+                                st.session_state.summary = f"User needed assistance with: {user_message}"
+                                st.session_state.query = user_message
+                                st.session_state.solution = chat['message']
+                                st.session_state.show_satisfaction = True
+                                st.session_state.show_ticket_form = True
+                                st.switch_page("pages/3_Ticket.py")
                     
-                    with col_no:
-                        if st.button("❌ No, Thank You", key=f"no_ticket_{i}"):
-                            st.session_state.feedback_given[feedback_key] = "completed"
-                            st.success("🙏 Thank you for your feedback. We appreciate your time!")
-                            st.rerun()
+                        with col_no:
+                            if st.button("❌ No, Thank You", key=f"no_ticket_{i}"):
+                                st.session_state.feedback_given[feedback_key] = "completed"
+                                save_session()
+                                st.success("🙏 Thank you for your feedback. We appreciate your time!")
+                                st.rerun()
                 
-                elif feedback_type == "completed":
-                        st.success("🙏 Thank you for your feedback. We appreciate your time!")
+                    elif feedback_type == "completed":
+                            st.success("🙏 Thank you for your feedback. We appreciate your time!")
+
+render_active_turn(active_start)
+
+# Reply being generated in the background, if any
+render_live_reply()
 
 # Close WhatsApp-style chat container
 st.markdown('</div>', unsafe_allow_html=True)
 
-# Check if we should show the main chat input
-show_main_chat = True
-if len(st.session_state.chat_history) > 1:
+# Check if we should show the main chat input (not while a reply is being generated)
+show_main_chat = "pending_reply" not in st.session_state
+if show_main_chat and len(st.session_state.chat_history) > 1:
     # Get the last assistant message index
     last_assistant_index = None
     for i in range(len(st.session_state.chat_history) - 1, -1, -1):
@@ -686,24 +793,23 @@ if show_main_chat:
     
     # Handle message sending with Send button
     if send_btn and user_input and user_input.strip():
-        # Always detect language for each new query
-        detected_lang = language_support.detect_language(user_input)
-        
-        # Update session language and show notification if changed
-        if detected_lang != st.session_state.user_language:
-            st.session_state.user_language = detected_lang
-            # Show language change notification
-            st.info(f"🌐 Language detected: {language_options.get(detected_lang, detected_lang)}")
+        # Session language only changes on a confident (or repeated) detection
+        tracker = st.session_state.language_tracker
+        current_query_language = tracker.observe(user_input)
         
-        # Always use the detected language for this specific query
-        current_query_language = detected_lang
+        # Show notification if the session language changed
+        if current_query_language != st.session_state.user_language:
+            st.session_state.user_language = current_query_language
+            st.info(f"🌐 Language detected: {language_options.get(current_query_language, current_query_language)} ({tracker.confidence:.0%} confidence)")
         
         # Add user message to chat history with language info
         st.session_state.chat_history.append({
             "role": "user", 
             "message": user_input, 
             "timestamp": datetime.now().strftime("%H:%M"),
-            "language": current_query_language
+            "language": current_query_language,
+            "detected_language": tracker.detected,
+            "language_confidence": round(tracker.confidence, 2)
         })
         
         # Get user context for AI with the detected language for this query
@@ -715,24 +821,9 @@ if show_main_chat:
             'language_prompt': language_support.get_language_prompt(current_query_language)
         }
         
-        # Get assistant response
-        response = match_query(user_input, user_context, st.session_state.chat_history)
-        
-        # Format response for the detected language (not session language)
-        formatted_response = language_support.format_multilingual_response(response, current_query_language)
-        
-        st.session_state.chat_history.append({
-            "role": "assistant", 
-            "message": formatted_response, 
-            "timestamp": datetime.now().strftime("%H:%M"),
-            "language": current_query_language
-        })
-        
-        # Update session variables for potential ticket creation
-        st.session_state.query = user_input
-        st.session_state.solution = response
-        
-        # Clear input field by incrementing the key
-        st.session_state.input_key += 1
-        
-        st.rerun()
\ No newline at end of file
+        # Answer in the background, formatted for the detected language (not session language)
+        if submit_reply(user_input, user_context, current_query_language, remember_for_ticket=True):
+            # Clear input field by incrementing the key
+            st.session_state.input_key += 1
+            
+            st.rerun()
\ No newline at end of file
@@ -1,8 +1,8 @@
 import streamlit as st
-import os
 from datetime import datetime
 from utils.grok_ai import get_grok_service, is_grok_available
 from utils.simple_steps import match_query
+from utils.attachments import MAX_ATTACHMENT_MB, AttachmentTooLarge, attachment_store
 
 # Configure page for wide layout
 st.set_page_config(
@@ -17,16 +17,15 @@ if not st.session_state.get('logged_in', False) or 'username' not in st.session_
     st.switch_page("pages/1_Login.py")
 
 # Safe import for ticket creation
-def safe_create_ticket(username, user_id, email, summary):
+def safe_create_ticket(username, user_id, email, summary, attachments=None):
     """Safely create a ticket with fallback"""
     try:
         from utils.tickets import create_ticket
-        return create_ticket(username, user_id, email, summary)
+        return create_ticket(username, user_id, email, summary, attachments)
     except Exception as e:
-        # Fallback: generate a simple ticket ID
-        import random
-        ticket_id = f"TKT-{datetime.now().strftime('%Y%m%d')}-{random.randint(1000, 9999)}"
-        return ticket_id
+        # Fallback: still hand out an ID in the same format as stored tickets
+        from utils.ticket_ids import new_ticket_id
+        return new_ticket_id()
 
 # Simple CSS for clean interface
 st.markdown("""
@@ -250,19 +249,17 @@ if 'show_ticket_form' not in st.session_state:
 if 'feedback_given' not in st.session_state:
     st.session_state.feedback_given = {}
 
-# Check if there's chat history from Query page
-has_chat_history = (
-    'chat_history' in st.session_state and 
-    st.session_state.chat_history and 
-    len([msg for msg in st.session_state.chat_history if msg['role'] == 'user']) > 0
-)
+# Check if there's chat history from Query page. Form defaults use the in-memory window only;
+# turns spilled to disk are read back just once, when the ticket is created
+recent_messages = st.session_state.chat_history.recent() if 'chat_history' in st.session_state else []
+has_chat_history = 'chat_history' in st.session_state and st.session_state.chat_history.user_turns > 0
 
 # Check if coming from Query page with unresolved issue
 coming_from_query = has_chat_history and st.session_state.get('show_satisfaction', False)
 
 # Auto-generate title and description from chat history (removed chat summary display)
 if has_chat_history and not st.session_state.suggested_title:
-    user_messages = [msg['message'] for msg in st.session_state.chat_history if msg['role'] == 'user']
+    user_messages = [msg['message'] for msg in recent_messages if msg['role'] == 'user']
     if user_messages:
         first_query = user_messages[0].lower()
         if 'password' in first_query or 'login' in first_query:
@@ -325,8 +322,8 @@ if st.session_state.show_ticket_form or st.session_state.feedback_given.get('not
     default_description = ""
     if has_chat_history:
         # Generate comprehensive description from chat history
-        user_queries = [msg['message'] for msg in st.session_state.chat_history if msg['role'] == 'user']
-        assistant_responses = [msg['message'] for msg in st.session_state.chat_history if msg['role'] == 'assistant' and msg != st.session_state.chat_history[0]]
+        user_queries = [msg['message'] for msg in recent_messages if msg['role'] == 'user']
+        assistant_responses = [msg['message'] for msg in recent_messages if msg['role'] == 'assistant' and not msg.get('welcome')]
         
         default_description = "ORIGINAL USER QUERY:\n"
         if user_queries:
@@ -367,14 +364,14 @@ if st.session_state.show_ticket_form or st.session_state.feedback_given.get('not
                 "Select files to attach:",
                 type=['pdf', 'png', 'jpg', 'jpeg', 'docx', 'txt'],
                 accept_multiple_files=True,
-                help="Max 5MB per file. Supported: PDF, images, Word docs, text files.",
+                help=f"Max {MAX_ATTACHMENT_MB:g}MB per file. Supported: PDF, images, Word docs, text files.",
                 key="optional_attachments"
             )
             
             if uploaded_files:
                 st.success(f"✅ {len(uploaded_files)} file(s) selected")
                 for file in uploaded_files:
-                    file_size = len(file.getvalue()) / 1024 / 1024
+                    file_size = file.size / 1024 / 1024
                     st.markdown(f"📄 **{file.name}** ({file_size:.2f} MB)")
                 st.info("💡 Files will be attached to your ticket when you create it.")
     
@@ -390,25 +387,16 @@ if st.session_state.show_ticket_form or st.session_state.feedback_given.get('not
     
     with col1:
         if st.button("✅ Confirm and Create Ticket", use_container_width=True, key="confirm_ticket_direct"):
-            # Handle optional file uploads
-            uploaded_file_paths = []
+            # Handle optional file uploads: streamed to the attachment store, identical files kept once
+            attachments = []
             if uploaded_files:
-                try:
-                    ticket_timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                    upload_dir = os.path.join("uploads", f"ticket_{ticket_timestamp}_{st.session_state.get('user_id', 'unknown')}")
-                    os.makedirs(upload_dir, exist_ok=True)
-                    
-                    for file in uploaded_files:
-                        file_size = len(file.getvalue()) / 1024 / 1024
-                        if file_size <= 5:  # 5MB limit
-                            file_path = os.path.join(upload_dir, file.name)
-                            with open(file_path, "wb") as f:
-                                f.write(file.getvalue())
-                            uploaded_file_paths.append(file_path)
-                        else:
-                            st.warning(f"File {file.name} is too large ({file_size:.1f}MB). Skipped.")
-                except Exception as e:
-                    st.error(f"File upload error: {str(e)}")
+                for file in uploaded_files:
+                    try:
+                        attachments.append(attachment_store.save(file, file.name, file.type))
+                    except AttachmentTooLarge:
+                        st.warning(f"File {file.name} is too large ({file.size / 1024 / 1024:.1f}MB). Skipped.")
+                    except Exception as e:
+                        st.error(f"File upload error: {str(e)}")
             
             # Create comprehensive ticket summary
             detailed_summary = f"""TITLE: {ticket_title}
@@ -429,16 +417,17 @@ CONTACT PREFERENCES:
 - Preferred Method: {contact_method}
 - Best Time: {contact_time_formatted}"""
 
-            if uploaded_file_paths:
-                detailed_summary += f"\n\nATTACHED FILES ({len(uploaded_file_paths)}):\n"
-                detailed_summary += "\n".join([f"- {os.path.basename(path)}" for path in uploaded_file_paths])
+            if attachments:
+                detailed_summary += f"\n\nATTACHED FILES ({len(attachments)}):\n"
+                detailed_summary += "\n".join([f"- {attachment['name']} ({attachment['size'] / 1024:.0f} KB)" for attachment in attachments])
 
             if has_chat_history:
                 detailed_summary += "\n\nCHAT HISTORY:\n"
+                # The whole conversation, spilled turns read back from disk
                 for chat in st.session_state.chat_history:
                     if chat["role"] == "user":
                         detailed_summary += f"User ({chat.get('timestamp', 'N/A')}): {chat['message']}\n"
-                    elif chat["role"] == "assistant" and chat != st.session_state.chat_history[0]:
+                    elif chat["role"] == "assistant" and not chat.get('welcome'):
                         detailed_summary += f"Assistant ({chat.get('timestamp', 'N/A')}): {chat['message']}\n"
                 detailed_summary += "\nNOTE: This ticket was created from an unresolved chat session."
             
@@ -447,14 +436,15 @@ CONTACT PREFERENCES:
                 st.session_state.get('username', 'User'),
                 st.session_state.get('user_id', 'N/A'),
                 st.session_state.get('email', 'N/A'),
-                detailed_summary
+                detailed_summary,
+                attachments
             )
             
             # Save ticket details for full-width display after rerun
             st.session_state.ticket_just_created = True
             st.session_state.last_ticket_id = ticket_id
             st.session_state.last_ticket_description = ticket_description
-            st.session_state.last_uploaded_files = uploaded_file_paths if uploaded_file_paths else []
+            st.session_state.last_uploaded_files = attachments
             st.session_state.last_had_chat_history = has_chat_history
             
             # Clear session states first
@@ -463,7 +453,11 @@ CONTACT PREFERENCES:
             st.session_state.feedback_given = {}
             st.session_state.suggested_title = ""
             if 'chat_history' in st.session_state:
+                st.session_state.chat_history.discard()
                 del st.session_state.chat_history
+            # The chat is closed: don't offer it again at the next login
+            if 'session_sync' in st.session_state:
+                st.session_state.session_sync.clear()
             if 'show_satisfaction' in st.session_state:
                 del st.session_state.show_satisfaction
             
@@ -0,0 +1,52 @@
+"""Content-addressed storage of ticket attachments."""
+
+import hashlib
+import io
+import os
+
+import pytest
+
+from utils.attachments import AttachmentStore, AttachmentTooLarge
+
+
+class _Stream(io.RawIOBase):
+    """A readable file object without getvalue(), like an open file."""
+
+    def __init__(self, data):
+        self._data = io.BytesIO(data)
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        return self._data.readinto(buffer)
+
+
+def _files(directory):
+    return sorted(os.path.relpath(os.path.join(root, name), directory)
+                  for root, _, names in os.walk(directory) for name in names)
+
+
+def test_identical_uploads_are_stored_once(tmp_path):
+    store = AttachmentStore(str(tmp_path), chunk_size=1000)
+    data = os.urandom(5000)
+    sha256 = hashlib.sha256(data).hexdigest()
+
+    first = store.save(io.BytesIO(data), '../../etc/screenshot.png', 'image/png')
+    again = store.save(io.BytesIO(data), 'copy.png', 'image/png')
+    streamed = store.save(_Stream(data), 'streamed.png')
+
+    assert first['sha256'] == again['sha256'] == streamed['sha256'] == sha256
+    assert first['size'] == streamed['size'] == 5000
+    assert first['name'] == 'screenshot.png'
+    assert _files(str(tmp_path)) == [os.path.join(sha256[:2], sha256)]
+    with open(store.path_for(sha256), 'rb') as f:
+        assert f.read() == data
+
+
+@pytest.mark.parametrize('upload', [io.BytesIO, _Stream])
+def test_oversized_upload_leaves_nothing_behind(tmp_path, upload):
+    store = AttachmentStore(str(tmp_path), max_bytes=4096, chunk_size=1000)
+    with pytest.raises(AttachmentTooLarge):
+        store.save(upload(os.urandom(5000)), 'big.log')
+    assert _files(str(tmp_path)) == []
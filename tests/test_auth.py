@@ -0,0 +1,43 @@
+"""Logins against the users file."""
+
+import json
+
+import pytest
+
+from utils import auth
+from utils.auth import UserDirectory
+
+
+@pytest.fixture
+def users_file(tmp_path):
+    path = tmp_path / 'users.json'
+    path.write_text(json.dumps([
+        {"username": "john_doe", "password": "password123", "email": "john@example.com", "id": "EMP001"},
+        {"username": "jane_smith", "password": "securepass", "email": "jane@example.com", "id": "EMP002"},
+    ]))
+    return path
+
+
+def test_plaintext_passwords_are_hashed_on_load(users_file):
+    directory = UserDirectory(str(users_file))
+
+    user = directory.authenticate('john_doe', 'password123')
+    assert user == {"username": "john_doe", "email": "john@example.com", "id": "EMP001"}
+    assert directory.authenticate('jane_smith', 'password123') is None
+
+    stored = json.loads(users_file.read_text())
+    assert all('password' not in u and u['password_hash'].startswith('pbkdf2_sha256$') for u in stored)
+
+
+def test_hits_and_misses_do_the_same_pbkdf2_work(users_file, monkeypatch):
+    directory = UserDirectory(str(users_file))
+    directory.authenticate('john_doe', 'warm-up')
+    verified = []
+    verify_password = auth.verify_password
+    monkeypatch.setattr(auth, 'verify_password', lambda password, encoded: verified.append(encoded) or verify_password(password, encoded))
+
+    directory.authenticate('john_doe', 'wrong')
+    directory.authenticate('no_such_user', 'wrong')
+
+    assert len(verified) == 2
+    assert [encoded.split('$')[1] for encoded in verified] == [str(auth.PASSWORD_HASH_ITERATIONS)] * 2
@@ -0,0 +1,35 @@
+"""Summaries of older turns in AI prompts."""
+
+import gc
+import weakref
+
+from utils.chat_context import HistoryManager, SummaryLines, summarize_turn
+
+
+class _Text(str):
+    """A str that can be weakly referenced, to see whether anything keeps it alive."""
+
+
+def test_summary_cache_does_not_keep_messages_alive():
+    summaries = SummaryLines(maxsize=8)
+    answer = _Text("Restart the VPN client. " + "Then check the status icon. " * 100)
+    ref = weakref.ref(answer)
+
+    line = summaries.get('assistant', answer)
+    assert line == summarize_turn('assistant', answer)
+    del answer
+    gc.collect()
+    assert ref() is None
+    assert summaries.get('assistant', "Restart the VPN client. " + "Then check the status icon. " * 100) is line
+
+
+def test_older_turns_are_summarized_within_budget():
+    history = []
+    for n in range(30):
+        history.append({"role": "user", "message": f"Question {n}: the printer on floor {n} is offline"})
+        history.append({"role": "assistant", "message": f"Answer {n}: power-cycle it. " + "Check the queue. " * 40})
+    messages = HistoryManager(budget_tokens=400, summary_tokens=200).build("Is it fixed now?", history)
+
+    assert messages[0]['role'] == 'system'
+    assert "- User: Question 0: the printer on floor 0 is offline" in messages[0]['content']
+    assert messages[-1] == {"role": "user", "content": "Is it fixed now?"}
@@ -0,0 +1,119 @@
+"""Prompts built from a chat transcript that has spilled older turns to disk."""
+
+import gc
+import os
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from utils import simple_steps
+from utils.chat_context import summarize_turn
+from utils.chat_transcript import ChatTranscript, sweep_transcripts
+
+WELCOME = "Hello! I'm your IT Helpdesk Assistant."
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    """Messages each AI request would send, captured instead of calling the API."""
+    requests = []
+
+    def stream(messages, user_context=None):
+        requests.append(messages)
+        yield "Try restarting it."
+
+    monkeypatch.setattr(simple_steps, 'is_grok_available', lambda: True)
+    monkeypatch.setattr(simple_steps, 'get_grok_service', lambda: SimpleNamespace(model='test-model'))
+    monkeypatch.setattr(simple_steps, 'llm_client', SimpleNamespace(stream=stream))
+    return requests
+
+
+def _conversation(tmp_path, turns):
+    transcript = ChatTranscript(window=6, spill_batch=4, directory=str(tmp_path))
+    transcript.append({"role": "assistant", "message": WELCOME, "timestamp": "09:00", "welcome": True})
+    feedback = {}
+    for turn in range(turns):
+        transcript.append({"role": "user", "message": f"Question {turn}: my laptop fan is loud", "timestamp": "09:01"})
+        transcript.append({"role": "assistant", "message": f"Answer {turn}: clean the vents.", "timestamp": "09:01"})
+        feedback[f"feedback_{len(transcript) - 1}"] = "helpful"
+        transcript.compact(feedback)
+    return transcript
+
+
+def _ask(transcript, query):
+    transcript.append({"role": "user", "message": query, "timestamp": "09:30"})
+    return ''.join(simple_steps.stream_query(query, {'language': 'en'}, **transcript.prompt_history()))
+
+
+def test_spilled_turns_reach_the_prompt(tmp_path, sent):
+    transcript = _conversation(tmp_path, turns=10)
+    assert transcript.offset > 0
+    window = transcript.recent()
+    assert window[0].role == 'assistant' and not window[0].get('welcome')
+
+    _ask(transcript, "It is still loud")
+    messages = sent[-1]
+    contents = [m['content'] for m in messages]
+    summary = messages[0]['content'] if messages[0]['role'] == 'system' else ''
+
+    assert not any(WELCOME in content for content in contents)
+    assert contents[-1] == "It is still loud"
+    # The answer opening the window is a real turn, not the welcome message
+    first = window[0]
+    assert first.message in contents or summarize_turn(first.role, first.message) in summary
+    # Spilled turns are summarized, starting from the opening question
+    assert summarize_turn('user', "Question 0: my laptop fan is loud") in summary
+    assert transcript.spilled_summary()[-1] in summary
+
+
+def test_spilled_summary_stays_within_budget(tmp_path):
+    transcript = _conversation(tmp_path, turns=300)
+    lines = transcript.spilled_summary()
+    assert lines[0] == summarize_turn('user', "Question 0: my laptop fan is loud")
+    assert len(lines) < 100
+    assert lines[-1] == summarize_turn(transcript[transcript.offset - 1].role, transcript[transcript.offset - 1].message)
+
+
+def test_follow_up_after_spill_is_not_cached(tmp_path, sent, monkeypatch):
+    cache = {}
+    monkeypatch.setattr(simple_steps, 'response_cache', SimpleNamespace(
+        make_key=lambda *parts: parts, get=cache.get, set=cache.__setitem__))
+    transcript = ChatTranscript(window=2, spill_batch=2, directory=str(tmp_path))
+    transcript.append({"role": "assistant", "message": WELCOME, "timestamp": "09:00", "welcome": True})
+    transcript.append({"role": "user", "message": "My laptop fan is loud", "timestamp": "09:01"})
+    transcript.append({"role": "assistant", "message": "Clean the vents.", "timestamp": "09:01"})
+    transcript.compact()
+    # The window holds no earlier question, but the conversation does
+    assert not any(message.role == 'user' for message in transcript.recent())
+
+    _ask(transcript, "How do I reset my password?")
+    assert transcript.user_turns == 2
+    assert cache == {}
+
+
+def test_spill_file_is_removed_with_its_session(tmp_path):
+    transcript = _conversation(tmp_path, turns=10)
+    path = transcript.path
+    assert os.path.exists(path)
+    del transcript
+    gc.collect()
+    assert not os.path.exists(path)
+
+    transcript = _conversation(tmp_path, turns=10)
+    transcript.discard()
+    assert not os.path.exists(transcript.path)
+
+
+def test_sweep_removes_only_stale_spill_files(tmp_path):
+    stale = _conversation(tmp_path, turns=10)
+    fresh = _conversation(tmp_path, turns=10)
+    day_ago = time.time() - 2 * 86400
+    os.utime(stale.path, (day_ago, day_ago))
+
+    assert sweep_transcripts(str(tmp_path), max_age=86400) == 1
+    assert not os.path.exists(stale.path)
+    assert os.path.exists(fresh.path)
+    # A swept session keeps working with what is still in memory
+    assert stale.load_spilled() == []
+    assert len(stale.recent()) == len(stale) - stale.offset
@@ -0,0 +1,90 @@
+"""Circuit breaker outcomes of Grok API calls."""
+
+import datetime
+import json
+
+import pytest
+import requests
+
+from utils.grok_ai import CircuitBreaker, GrokAIService, GrokAPIError
+
+
+class _Response:
+    """A 200 streaming response whose body fails after the given lines."""
+
+    status_code = 200
+    headers = {}
+    encoding = 'utf-8'
+    elapsed = datetime.timedelta(milliseconds=50)
+
+    def __init__(self, lines, error=None):
+        self.lines = lines
+        self.error = error
+
+    def iter_lines(self, decode_unicode=False):
+        yield from self.lines
+        if self.error:
+            raise self.error
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _delta(text):
+    return 'data: ' + json.dumps({"choices": [{"delta": {"content": text}}]})
+
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setenv('GROK_API_KEY', 'test')
+    service = GrokAIService()
+    service.max_retries = 0
+    service.breaker = CircuitBreaker(min_calls=1, failure_rate=0.5, open_seconds=0)
+    return service
+
+
+def _half_open(breaker):
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+
+def test_unexpected_error_ends_a_half_open_probe(service, monkeypatch):
+    _half_open(service.breaker)
+    monkeypatch.setattr(service.session, 'post', lambda *a, **kw: (_ for _ in ()).throw(TypeError('not JSON serializable')))
+
+    with pytest.raises(TypeError):
+        service.request_completion([{"role": "user", "content": "VPN?"}])
+
+    # The probe failed and re-opened the breaker; it can probe again instead of staying stuck
+    assert service.breaker.state == CircuitBreaker.HALF_OPEN
+    assert service.breaker.allow_request()
+
+
+def test_mid_stream_error_counts_as_a_failure(service, monkeypatch):
+    _half_open(service.breaker)
+    response = _Response([_delta('Restart '), _delta('the')], requests.exceptions.ChunkedEncodingError('reset'))
+    monkeypatch.setattr(service.session, 'post', lambda *a, **kw: response)
+
+    chunks = []
+    with pytest.raises(GrokAPIError):
+        for chunk in service.request_completion_stream([{"role": "user", "content": "VPN?"}]):
+            chunks.append(chunk)
+            # Headers alone must not close the breaker
+            assert service.breaker._state == CircuitBreaker.HALF_OPEN
+
+    assert chunks == ['Restart ', 'the']
+    assert service.breaker._state == CircuitBreaker.OPEN
+
+
+def test_finished_stream_closes_a_half_open_breaker(service, monkeypatch):
+    _half_open(service.breaker)
+    monkeypatch.setattr(service.session, 'post', lambda *a, **kw: _Response([_delta('Done.'), 'data: [DONE]']))
+
+    assert list(service.request_completion_stream([{"role": "user", "content": "VPN?"}])) == ['Done.']
+    assert service.breaker._state == CircuitBreaker.CLOSED
@@ -0,0 +1,26 @@
+"""Accuracy of language detection on the labelled samples in benchmarks/fixtures."""
+
+import json
+import os
+
+import pytest
+
+from utils.language_support import language_support
+
+FIXTURES_PATH = os.path.join(os.path.dirname(__file__), '..', 'benchmarks', 'fixtures', 'language_samples.json')
+
+with open(FIXTURES_PATH, 'r', encoding='utf-8') as f:
+    SAMPLES = [(language, text) for language, texts in json.load(f).items() for text in texts]
+
+# Short English messages that borrow words from other languages ("problem",
+# "password") or contain their function words ("mi" in admin, "que" in queue)
+SHORT_ENGLISH = [text for language, text in SAMPLES if language == 'en' and len(text.split()) <= 3]
+
+
+@pytest.mark.parametrize('language, text', SAMPLES)
+def test_detects_the_labelled_language(language, text):
+    assert language_support.detect_language(text) == language
+
+
+def test_fixtures_cover_short_english_false_positives():
+    assert {"Password problem", "Email problem", "Printer queue stuck", "Admin rights please"} <= set(SHORT_ENGLISH)
@@ -0,0 +1,104 @@
+"""Coalescing of identical streams in the shared AI client."""
+
+import threading
+import time
+
+import pytest
+
+from utils import llm_client as llm_client_module
+from utils.grok_ai import GrokAPIError
+from utils.llm_client import AsyncLLMClient
+
+
+class _FakeService:
+    model = 'grok-test'
+
+    def __init__(self, chunks, fail=False):
+        self.chunks = chunks
+        self.fail = fail
+        self.calls = 0
+        self.closed = threading.Event()
+        self.release = threading.Event()
+
+    def request_completion_stream(self, messages, user_context=None):
+        self.calls += 1
+        try:
+            for n, chunk in enumerate(self.chunks):
+                if n == 1:
+                    # Hold the stream open until every caller has joined
+                    assert self.release.wait(5)
+                yield chunk
+            if self.fail:
+                raise GrokAPIError("upstream dropped the stream")
+        finally:
+            self.closed.set()
+
+
+@pytest.fixture
+def service(monkeypatch):
+    def install(**kwargs):
+        fake = _FakeService(**kwargs)
+        monkeypatch.setattr(llm_client_module, 'get_grok_service', lambda: fake)
+        return fake
+    return install
+
+
+def _read_concurrently(client, callers, messages):
+    results = [None] * callers
+
+    def read(slot):
+        try:
+            results[slot] = ''.join(client.stream(messages))
+        except GrokAPIError as e:
+            results[slot] = e
+
+    threads = [threading.Thread(target=read, args=(n,)) for n in range(callers)]
+    for thread in threads:
+        thread.start()
+    return threads, results
+
+
+def test_identical_streams_share_one_upstream_call(service):
+    fake = service(chunks=['Restart ', 'the VPN ', 'client.'])
+    client = AsyncLLMClient(max_concurrency=2)
+    messages = [{"role": "user", "content": "VPN keeps dropping"}]
+
+    threads, results = _read_concurrently(client, 6, messages)
+    while True:
+        with client._streams_lock:
+            shared = next(iter(client._streams.values()), None)
+            if shared is not None and shared.readers == 6:
+                break
+        time.sleep(0.001)
+    fake.release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert fake.calls == 1
+    assert results == ['Restart the VPN client.'] * 6
+    assert not client._streams
+
+
+def test_upstream_error_reaches_every_caller(service):
+    fake = service(chunks=['Partial ', 'answer'], fail=True)
+    fake.release.set()
+    client = AsyncLLMClient(max_concurrency=2)
+
+    threads, results = _read_concurrently(client, 3, [{"role": "user", "content": "Printer offline"}])
+    for thread in threads:
+        thread.join(5)
+
+    assert all(isinstance(result, GrokAPIError) for result in results)
+
+
+def test_upstream_stops_when_the_only_caller_stops_reading(service):
+    fake = service(chunks=['First ', 'second ', 'third'])
+    client = AsyncLLMClient(max_concurrency=2)
+
+    stream = client.stream([{"role": "user", "content": "Outlook crashes"}])
+    assert next(stream) == 'First '
+    stream.close()
+    fake.release.set()
+
+    assert fake.closed.wait(5)
+    assert not client._streams
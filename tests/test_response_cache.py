@@ -0,0 +1,74 @@
+"""Persistence of the response cache shared between replicas."""
+
+import json
+import os
+import threading
+
+from utils.response_cache import ResponseCache
+
+
+def _stored(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return {key: (expires_at, response) for key, expires_at, response in json.load(f)}
+
+
+def test_concurrent_saves_merge_every_replica(tmp_path, capsys):
+    path = str(tmp_path / 'response_cache.json')
+    # Several replicas sharing one cache file, each with different (large) answers
+    replicas = []
+    for replica in range(8):
+        cache = ResponseCache(persist_path=path, persist_every=10 ** 9)
+        for n in range(100):
+            cache.set(f"key-{replica}-{n}", f"answer {replica}/{n} " * 50)
+        replicas.append(cache)
+
+    start = threading.Barrier(len(replicas))
+
+    def save_repeatedly(cache):
+        start.wait()
+        for _ in range(10):
+            cache.save()
+
+    threads = [threading.Thread(target=save_repeatedly, args=(cache,)) for cache in replicas]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert 'save error' not in capsys.readouterr().out
+    assert set(_stored(path)) == {f"key-{replica}-{n}" for replica in range(8) for n in range(100)}
+    assert sorted(os.listdir(tmp_path)) == ['response_cache.json', 'response_cache.json.lock']
+    assert ResponseCache(persist_path=path).stats()['entries'] == 800
+
+
+def test_save_keeps_the_newest_answer_and_the_most_recent_entries(tmp_path):
+    path = str(tmp_path / 'response_cache.json')
+    older = ResponseCache(max_entries=3, ttl_seconds=100, persist_path=path, persist_every=10 ** 9)
+    newer = ResponseCache(max_entries=3, ttl_seconds=200, persist_path=path, persist_every=10 ** 9)
+    newer.set('vpn', 'Reconnect the VPN client.')
+    older.set('vpn', 'Restart the laptop.')
+    older.set('printer', 'Power-cycle the printer.')
+    older.set('email', 'Restart Outlook.')
+
+    newer.save()
+    older.save()
+
+    stored = _stored(path)
+    assert stored['vpn'][1] == 'Reconnect the VPN client.'
+    assert set(stored) == {'vpn', 'printer', 'email'}
+
+    older.set('wifi', 'Forget the network and rejoin.')
+    older.save()
+    # Only max_entries are kept; 'vpn' expires last, so it is the most recent
+    assert set(_stored(path)) == {'vpn', 'email', 'wifi'}
+
+
+def test_flush_saves_only_unsaved_entries(tmp_path):
+    path = tmp_path / 'response_cache.json'
+    cache = ResponseCache(persist_path=str(path), persist_every=10 ** 9)
+    cache.flush()
+    assert not path.exists()
+
+    cache.set('vpn', 'Reconnect the VPN client.')
+    cache.flush()
+    assert set(_stored(str(path))) == {'vpn'}
@@ -0,0 +1,57 @@
+"""Appends and compaction of the JSON Lines ticket log."""
+
+import threading
+
+from utils.tickets import TicketStore
+
+
+def test_concurrent_appends_compact_once_per_threshold(tmp_path, monkeypatch):
+    path = str(tmp_path / 'tickets.jsonl')
+    store = TicketStore(path, compact_every=7)
+    compactions = []
+    running = threading.Lock()
+    compact_locked = TicketStore._compact_locked
+
+    def counting_compact(self):
+        # Overlapping compactions would find the lock already taken
+        assert running.acquire(blocking=False), 'compactions overlapped'
+        try:
+            compactions.append(self._appends_since_compaction)
+            return compact_locked(self)
+        finally:
+            running.release()
+
+    monkeypatch.setattr(TicketStore, '_compact_locked', counting_compact)
+
+    threads, per_thread = 8, 35
+    start = threading.Barrier(threads)
+
+    def append_tickets(worker):
+        start.wait()
+        for n in range(per_thread):
+            store.append({"ticket_id": f"TKT-{worker}-{n}", "summary": "VPN drops"})
+
+    workers = [threading.Thread(target=append_tickets, args=(w,)) for w in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    assert compactions == [7] * (threads * per_thread // 7)
+    assert store._appends_since_compaction == threads * per_thread % 7
+    assert len(store.all_tickets()) == threads * per_thread
+
+
+def test_compact_only_drops_torn_lines(tmp_path):
+    path = tmp_path / 'tickets.jsonl'
+    store = TicketStore(str(path), compact_every=0)
+    store.append({"ticket_id": "TKT-1", "summary": "first"})
+    assert store.compact() is False
+
+    with open(path, 'ab') as f:
+        f.write(b'{"ticket_id": "TKT-2", "summ')
+    store.append({"ticket_id": "TKT-3", "summary": "third"})
+
+    assert store.compact() is True
+    assert [t['ticket_id'] for t in store.all_tickets()] == ['TKT-1', 'TKT-3']
+    assert path.read_text().count('\n') == 2
@@ -0,0 +1,149 @@
+"""
+Ticket attachment storage for the IT Helpdesk
+Stores uploads as content-addressed files under data/attachments, writing each distinct file once
+"""
+
+import hashlib
+import os
+import tempfile
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, Optional, Tuple
+
+from .metrics import metrics
+
+ATTACHMENTS_DIR = os.getenv('ATTACHMENT_DIR') or os.path.join(os.path.dirname(__file__), '../data/attachments')
+
+# Largest accepted upload, and bytes hashed and written per step when reading a stream
+MAX_ATTACHMENT_MB = float(os.getenv('MAX_ATTACHMENT_MB', '5'))
+CHUNK_SIZE = 1024 * 1024
+
+
+class AttachmentTooLarge(Exception):
+    """Raised when an upload is over the size limit; nothing is kept."""
+    pass
+
+
+def _in_memory(fileobj: BinaryIO) -> Optional[memoryview]:
+    """A view of the upload's bytes if they are already in memory, else None."""
+    getvalue = getattr(fileobj, 'getvalue', None)
+    if getvalue is None:
+        return None
+    # BytesIO (Streamlit's UploadedFile) hands back the uploaded bytes themselves; a view of
+    # them copies nothing. getbuffer() would copy the whole upload first.
+    return memoryview(getvalue())
+
+
+def _chunks(fileobj: BinaryIO, chunk_size: int) -> Iterator[memoryview]:
+    """Successive chunks of a file object, read into one reused buffer."""
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    while True:
+        read = fileobj.readinto(buffer)
+        if not read:
+            return
+        yield view[:read]
+
+
+class AttachmentStore:
+    """
+    Attachments stored by content: data/attachments/<sha[:2]>/<sha256>.
+
+    save() hashes an in-memory upload (Streamlit's UploadedFile) in one call
+    and writes it only if that content is not stored yet. Other file objects
+    are read in chunks, hashed while they are written to a temp file. New
+    files are synced and then renamed into place. Identical files (the same
+    screenshot attached to several tickets) are stored once. The original
+    name and type live only in the metadata recorded with the ticket, so
+    user-supplied file names never become paths.
+    """
+
+    def __init__(self, directory: str = ATTACHMENTS_DIR, max_bytes: int = None, chunk_size: int = CHUNK_SIZE):
+        self.directory = directory
+        self.max_bytes = max_bytes or int(MAX_ATTACHMENT_MB * 1024 * 1024)
+        self.chunk_size = chunk_size
+
+    def path_for(self, sha256: str) -> str:
+        """Where the attachment with this content hash is stored."""
+        return os.path.join(self.directory, sha256[:2], sha256)
+
+    def save(self, fileobj: BinaryIO, name: str, content_type: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Store an upload and return its metadata.
+
+        Returns:
+            Dict with name, size (bytes), sha256, content_type and path (relative to the store)
+
+        Raises:
+            AttachmentTooLarge: If the upload is bigger than max_bytes
+        """
+        size = getattr(fileobj, 'size', None)
+        if size is not None and size > self.max_bytes:
+            metrics.increment('attachments.rejected')
+            raise AttachmentTooLarge(f"{name} is {size / 1024 / 1024:.1f} MB")
+
+        os.makedirs(self.directory, exist_ok=True)
+        view = _in_memory(fileobj)
+        tmp_path = None
+        try:
+            if view is not None:
+                # Hash first: a file that is already stored needs no write or fsync at all
+                size = len(view)
+                self._check_size(size, name)
+                sha256 = hashlib.sha256(view).hexdigest()
+                if not os.path.exists(self.path_for(sha256)):
+                    tmp_path, _ = self._write_temp([view], name)
+            else:
+                digest = hashlib.sha256()
+                tmp_path, size = self._write_temp(_chunks(fileobj, self.chunk_size), name, digest)
+                sha256 = digest.hexdigest()
+
+            path = self.path_for(sha256)
+            if tmp_path is None or os.path.exists(path):
+                metrics.increment('attachments.deduplicated')
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(tmp_path, path)
+                metrics.increment('attachments.bytes_written', size)
+        finally:
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        metrics.increment('attachments.saved')
+        return {
+            "name": os.path.basename(name),
+            "size": size,
+            "sha256": sha256,
+            "content_type": content_type,
+            "path": os.path.relpath(path, self.directory)
+        }
+
+    def _check_size(self, size: int, name: str) -> None:
+        """Reject an upload once it is known to be over max_bytes."""
+        if size > self.max_bytes:
+            metrics.increment('attachments.rejected')
+            raise AttachmentTooLarge(f"{name} is over {self.max_bytes / 1024 / 1024:.0f} MB")
+
+    def _write_temp(self, chunks: Iterable[memoryview], name: str, digest=None) -> Tuple[str, int]:
+        """Write chunks to a synced temp file in the store, hashing them into digest if given.
+
+        Returns the temp file's path and the number of bytes written.
+        """
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in chunks:
+                    size += len(chunk)
+                    self._check_size(size, name)
+                    if digest is not None:
+                        digest.update(chunk)
+                    f.write(chunk)
+                f.flush()
+                os.fsync(f.fileno())
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        return tmp_path, size
+
+
+# Global instance
+attachment_store = AttachmentStore()
@@ -1,14 +1,157 @@
+import hashlib
+import hmac
 import json
 import os
+import secrets
+import threading
+from typing import Any, Dict, Optional
+
+USERS_PATH = os.path.join(os.path.dirname(__file__), '../data/users.json')
+
+PASSWORD_HASH_ALGORITHM = 'pbkdf2_sha256'
+PASSWORD_HASH_ITERATIONS = int(os.getenv('PASSWORD_HASH_ITERATIONS', '200000'))
+
+# Never hand these back to callers of authenticate()
+_SECRET_FIELDS = ('password', 'password_hash')
+
+
+def hash_password(password: str, iterations: int = PASSWORD_HASH_ITERATIONS, salt: str = None) -> str:
+    """Return a salted PBKDF2 hash as ``pbkdf2_sha256$<iterations>$<salt>$<hex digest>``."""
+    salt = salt or secrets.token_hex(16)
+    digest = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt.encode('utf-8'), iterations)
+    return f"{PASSWORD_HASH_ALGORITHM}${iterations}${salt}${digest.hex()}"
+
+
+def verify_password(password: str, encoded: str) -> bool:
+    """Check a password against a hash from hash_password() in constant time."""
+    try:
+        algorithm, iterations, salt, expected = encoded.split('$', 3)
+    except ValueError:
+        return False
+    if algorithm != PASSWORD_HASH_ALGORITHM:
+        return False
+    digest = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt.encode('utf-8'), int(iterations))
+    return hmac.compare_digest(digest.hex(), expected)
+
+
+# Verified against when the username is unknown, so misses cost the same PBKDF2 work as hits
+_dummy_hash = None
+
+def _verify_dummy(password: str) -> None:
+    global _dummy_hash
+    if _dummy_hash is None:
+        _dummy_hash = hash_password(secrets.token_hex(8))
+    verify_password(password, _dummy_hash)
+
+
+class UserDirectory:
+    """In-memory user directory indexed by username, employee ID and email.
+
+    The users file is parsed once and re-parsed only when its mtime
+    changes. Passwords are only ever verified against PBKDF2 hashes: a file
+    that still has plaintext ``password`` entries is migrated with
+    hash_user_passwords() when it is loaded. A user without a hash cannot
+    log in, and unknown usernames cost the same PBKDF2 work as known ones.
+    """
+
+    def __init__(self, path: str = USERS_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._by_username: Dict[str, Dict[str, Any]] = {}
+        self._by_id: Dict[str, Dict[str, Any]] = {}
+        self._by_email: Dict[str, Dict[str, Any]] = {}
+
+    def _refresh(self) -> None:
+        """Reload the users file if it changed since the last load."""
+        mtime = os.stat(self.path).st_mtime_ns
+        if mtime == self._mtime:
+            return
+        with self._lock:
+            if mtime == self._mtime:
+                return
+            with open(self.path, 'r', encoding='utf-8') as f:
+                users = json.load(f)
+            if any('password' in u for u in users):
+                hash_user_passwords(self.path)
+                mtime = os.stat(self.path).st_mtime_ns
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    users = json.load(f)
+            self._by_username = {u['username']: u for u in users}
+            self._by_id = {u['id']: u for u in users if u.get('id')}
+            self._by_email = {u['email'].lower(): u for u in users if u.get('email')}
+            self._mtime = mtime
+
+    def get_by_username(self, username: str) -> Optional[Dict[str, Any]]:
+        """Look up a user by username."""
+        self._refresh()
+        return _public(self._by_username.get(username))
+
+    def get_by_id(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Look up a user by employee ID."""
+        self._refresh()
+        return _public(self._by_id.get(user_id))
+
+    def get_by_email(self, email: str) -> Optional[Dict[str, Any]]:
+        """Look up a user by email address (case-insensitive)."""
+        self._refresh()
+        return _public(self._by_email.get(email.lower()))
+
+    def authenticate(self, username: str, password: str) -> Optional[Dict[str, Any]]:
+        """Return the user (without secrets) if the credentials match, else None."""
+        self._refresh()
+        user = self._by_username.get(username)
+        if user is None or 'password_hash' not in user:
+            _verify_dummy(password)
+            return None
+        return _public(user) if verify_password(password, user['password_hash']) else None
+
+
+def _public(user: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Copy of a user record without password fields."""
+    if user is None:
+        return None
+    return {k: v for k, v in user.items() if k not in _SECRET_FIELDS}
+
+
+def hash_user_passwords(path: str = USERS_PATH) -> int:
+    """Replace plaintext passwords in the users file with salted hashes, dropping any left beside a hash.
+
+    Returns the number of users migrated.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        users = json.load(f)
+
+    migrated = 0
+    changed = False
+    for user in users:
+        if 'password' not in user:
+            continue
+        password = user.pop('password')
+        changed = True
+        if 'password_hash' not in user:
+            user['password_hash'] = hash_password(password)
+            migrated += 1
+
+    if changed:
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(users, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    return migrated
+
+
+# Global instance
+user_directory = UserDirectory()
 
 def load_users():
-    path = os.path.join(os.path.dirname(__file__), '../data/users.json')
-    with open(path, 'r') as f:
+    with open(USERS_PATH, 'r') as f:
         return json.load(f)
 
 def authenticate(username, password):
-    users = load_users()
-    for user in users:
-        if user['username'] == username and user['password'] == password:
-            return user
-    return None
+    return user_directory.authenticate(username, password)
+
+
+if __name__ == '__main__':
+    count = hash_user_passwords()
+    print(f"Hashed passwords for {count} user(s) in {os.path.normpath(USERS_PATH)}")
@@ -0,0 +1,160 @@
+"""
+Conversation history for AI prompts
+Fits the chat transcript into a token budget: recent turns verbatim, older turns as a rolling summary
+"""
+
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from .metrics import metrics
+from .prompt_budget import estimate_tokens, message_tokens
+
+# Words kept from each older turn in the summary
+SUMMARY_WORDS_PER_TURN = 24
+
+# Summary lines memoized per process, keyed by a digest of the message
+SUMMARY_CACHE_SIZE = 4096
+
+# Token budget of the summary of older turns
+SUMMARY_TOKENS = int(os.getenv('PROMPT_SUMMARY_TOKENS', '300'))
+
+_MARKDOWN = re.compile(r'[*_#`>|]+')
+_SENTENCE_END = re.compile(r'(?<=[.!?。！？])\s')
+
+
+def summarize_turn(role: str, text: str) -> str:
+    """One summary line for a past message: its first sentence, shortened."""
+    text = _MARKDOWN.sub('', text).strip()
+    first = _SENTENCE_END.split(text, 1)[0].split('\n', 1)[0]
+    words = first.split()
+    if len(words) > SUMMARY_WORDS_PER_TURN:
+        first = ' '.join(words[:SUMMARY_WORDS_PER_TURN]) + '…'
+    else:
+        first = ' '.join(words)
+    speaker = 'User' if role == 'user' else 'Assistant'
+    return f"- {speaker}: {first}"
+
+
+class SummaryLines:
+    """
+    summarize_turn() memoized by a digest of the message.
+
+    Only the digest and the short summary line are kept, never the message
+    itself, so cached entries do not keep answers alive after ChatTranscript
+    has spilled them to disk.
+    """
+
+    def __init__(self, maxsize: int = SUMMARY_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._lines = OrderedDict()  # (role, digest) -> summary line
+        self._lock = threading.Lock()
+
+    def get(self, role: str, text: str) -> str:
+        key = (role, hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest())
+        with self._lock:
+            line = self._lines.get(key)
+            if line is not None:
+                self._lines.move_to_end(key)
+                return line
+        line = summarize_turn(role, text)
+        with self._lock:
+            self._lines[key] = line
+            if len(self._lines) > self.maxsize:
+                self._lines.popitem(last=False)
+        return line
+
+
+def summarize_lines(lines: List[str], budget_tokens: int) -> Optional[str]:
+    """
+    Summary message from summary lines, oldest first, within budget_tokens.
+
+    The opening line (usually the problem the conversation started with)
+    is always kept, then as many of the newest lines as fit.
+    """
+    if not lines:
+        return None
+    header = "Summary of earlier conversation:"
+    used = estimate_tokens(header) + estimate_tokens(lines[0])
+    if used > budget_tokens:
+        return None
+    newest = []
+    for line in reversed(lines[1:]):
+        cost = estimate_tokens(line)
+        if used + cost > budget_tokens:
+            break
+        used += cost
+        newest.append(line)
+    newest.reverse()
+    return header + '\n' + '\n'.join([lines[0]] + newest)
+
+
+class HistoryManager:
+    """
+    Builds the message list for an AI request from the chat transcript.
+
+    Newest turns are sent verbatim until ``budget_tokens`` is used up; the
+    turns before that are folded into a summary message of at most
+    ``summary_tokens``, keeping its opening line and then the newest ones.
+    Turns no longer in ``chat_history`` (spilled to disk by ChatTranscript)
+    arrive as ready-made ``earlier_summary`` lines. Summary lines are
+    memoized by message digest, so each turn is summarized once however long
+    the conversation grows. Messages flagged ``welcome`` are never sent.
+    """
+
+    def __init__(self, budget_tokens: int = None, summary_tokens: int = None):
+        self.budget_tokens = budget_tokens or int(os.getenv('PROMPT_HISTORY_TOKENS', '1500'))
+        self.summary_tokens = summary_tokens or SUMMARY_TOKENS
+        self._summaries = SummaryLines()
+
+    @staticmethod
+    def _past_turns(query: str, chat_history: Optional[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """Transcript entries before the current question, without the welcome message."""
+        turns = [turn for turn in (chat_history or []) if not turn.get('welcome')]
+        if turns and turns[-1]['role'] == 'user' and turns[-1]['message'] == query:
+            turns = turns[:-1]  # the page appends the current query before asking
+        return turns
+
+    def build(self, query: str, chat_history: Optional[List[Dict[str, Any]]] = None,
+              earlier_summary: Optional[List[str]] = None) -> List[Dict[str, str]]:
+        """Messages to send: optional summary, recent turns, then the current question."""
+        current = {"role": "user", "content": query}
+        used = message_tokens(current)
+
+        recent = []
+        turns = self._past_turns(query, chat_history)
+        index = len(turns)
+        while index > 0:
+            message = {"role": turns[index - 1]['role'], "content": turns[index - 1]['message']}
+            cost = message_tokens(message)
+            if used + cost > self.budget_tokens:
+                break
+            used += cost
+            recent.append(message)
+            index -= 1
+        recent.reverse()
+        # Don't open the verbatim part with an answer whose question was summarized
+        while recent and recent[0]['role'] == 'assistant':
+            recent.pop(0)
+            index += 1
+
+        messages = []
+        if index or earlier_summary:
+            lines = list(earlier_summary or [])
+            lines.extend(self._summaries.get(turn['role'], turn['message']) for turn in turns[:index])
+            summary = summarize_lines(lines, self.summary_tokens)
+            if summary:
+                messages.append({"role": "system", "content": summary})
+                metrics.increment('chat_context.summarized_turns', index)
+        messages.extend(recent)
+        messages.append(current)
+
+        metrics.observe('chat_context.history_tokens', sum(message_tokens(m) for m in messages))
+        return messages
+
+
+# Global instance
+history_manager = HistoryManager()
@@ -0,0 +1,177 @@
+"""
+Background generation of chat replies
+A process-wide worker pool that answers chat turns off the Streamlit script thread, with job handles the page can poll or cancel
+"""
+
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Generator, List, Optional
+
+from .metrics import metrics
+from .simple_steps import stream_query
+
+# Job states
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+CANCELLED = 'cancelled'
+FAILED = 'failed'
+
+
+class ChatQueueFull(Exception):
+    """Raised when the pool already has its maximum number of queued turns."""
+    pass
+
+
+class ChatJob:
+    """
+    Handle for one chat turn being answered in the background.
+
+    The worker appends chunks as the answer streams in, so ``text`` is
+    the answer so far. ``cancel()`` takes effect for the page at once;
+    the worker stops (and releases its AI slot) at the next chunk.
+    """
+
+    def __init__(self, query: str, user_context: Optional[Dict[str, Any]] = None,
+                 chat_history: Optional[List[Dict[str, Any]]] = None, earlier_summary: Optional[List[str]] = None,
+                 user_turns: Optional[int] = None):
+        self.id = uuid.uuid4().hex
+        self.query = query
+        self.user_context = dict(user_context or {})
+        # Snapshot: the session keeps appending to its own transcript
+        self.chat_history = list(chat_history or [])
+        self.earlier_summary = list(earlier_summary or [])
+        self.user_turns = user_turns
+        self.status = QUEUED
+        self.error: Optional[str] = None
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._chunks: List[str] = []
+        self._cancel = threading.Event()
+        self._done = threading.Event()
+
+    @property
+    def text(self) -> str:
+        """Answer generated so far."""
+        return ''.join(self._chunks)
+
+    @property
+    def done(self) -> bool:
+        """True once the worker has finished with this job."""
+        return self._done.is_set()
+
+    @property
+    def cancelled(self) -> bool:
+        """True once cancel() has been called."""
+        return self._cancel.is_set()
+
+    def cancel(self) -> None:
+        """Ask the worker to stop generating this answer."""
+        if not self.done:
+            self._cancel.set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the job finishes or timeout seconds pass; True if finished."""
+        return self._done.wait(timeout)
+
+
+class ChatJobPool:
+    """
+    Worker pool shared by all sessions in the process.
+
+    ``max_workers`` turns are generated at once (CHAT_WORKERS, default the
+    AI concurrency limit) and at most ``max_queue`` more wait for a worker
+    (CHAT_QUEUE_DEPTH); beyond that submit() raises ChatQueueFull instead of
+    letting waits grow without bound. Queue depth, busy workers, waits and
+    durations are published to utils.metrics under ``chat_jobs.*``.
+    """
+
+    def __init__(self, max_workers: int = None, max_queue: int = None,
+                 generate: Callable[..., Generator[str, None, None]] = stream_query):
+        self.max_workers = max_workers or int(os.getenv('CHAT_WORKERS', os.getenv('GROK_MAX_CONCURRENCY', '8')))
+        self.max_queue = max_queue or int(os.getenv('CHAT_QUEUE_DEPTH', '32'))
+        self._generate = generate
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._queued = 0
+        self._running = 0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='chat-worker')
+            return self._executor
+
+    def submit(self, query: str, user_context: Optional[Dict[str, Any]] = None,
+               chat_history: Optional[List[Dict[str, Any]]] = None, earlier_summary: Optional[List[str]] = None,
+               user_turns: Optional[int] = None) -> ChatJob:
+        """
+        Queue a chat turn and return its handle.
+
+        chat_history, earlier_summary and user_turns are as ChatTranscript.prompt_history() gives them.
+
+        Raises:
+            ChatQueueFull: If max_queue turns are already waiting for a worker
+        """
+        executor = self._get_executor()
+        with self._lock:
+            if self._queued >= self.max_queue:
+                metrics.increment('chat_jobs.rejected')
+                raise ChatQueueFull(f"{self._queued} chat turns already queued")
+            self._queued += 1
+            metrics.set_gauge('chat_jobs.queued', self._queued)
+        metrics.increment('chat_jobs.submitted')
+
+        job = ChatJob(query, user_context, chat_history, earlier_summary, user_turns)
+        executor.submit(self._run, job)
+        return job
+
+    def _run(self, job: ChatJob) -> None:
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+            metrics.set_gauge('chat_jobs.queued', self._queued)
+            metrics.set_gauge('chat_jobs.running', self._running)
+        job.started_at = time.time()
+        metrics.observe('chat_jobs.queue_wait', job.started_at - job.submitted_at)
+
+        stream = None
+        try:
+            job.status = RUNNING
+            if not job.cancelled:
+                stream = self._generate(job.query, job.user_context, job.chat_history,
+                                        earlier_summary=job.earlier_summary, user_turns=job.user_turns)
+                for chunk in stream:
+                    if job.cancelled:
+                        break
+                    job._chunks.append(chunk)
+            job.status = CANCELLED if job.cancelled else DONE
+        except Exception as e:
+            job.status = FAILED
+            job.error = str(e)
+            metrics.increment('chat_jobs.failed')
+        finally:
+            if stream is not None:
+                stream.close()  # stops the upstream stream and frees its AI slot
+            job.finished_at = time.time()
+            metrics.observe('chat_jobs.duration', job.finished_at - job.started_at)
+            if job.status == CANCELLED:
+                metrics.increment('chat_jobs.cancelled')
+            with self._lock:
+                self._running -= 1
+                metrics.set_gauge('chat_jobs.running', self._running)
+            job._done.set()
+
+    def stats(self) -> Dict[str, int]:
+        """Current pool size, busy workers and queue depth."""
+        with self._lock:
+            return {'workers': self.max_workers, 'running': self._running,
+                    'queued': self._queued, 'max_queue': self.max_queue}
+
+
+# Global instance
+chat_jobs = ChatJobPool()
@@ -0,0 +1,98 @@
+"""
+Chat transcript rendering for the Query page
+Batches settled messages into a few immutable blocks per session, so reruns don't rebuild or re-emit one element per message
+"""
+
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+import streamlit as st
+
+# Settled messages per rendered block; a full block never changes again
+BLOCK_SIZE = 25
+
+# st.fragment (1.37+) / st.experimental_fragment (1.33+); on older Streamlit a fragment is just a function
+fragment = getattr(st, 'fragment', None) or getattr(st, 'experimental_fragment', None) or (lambda func: func)
+
+
+def polling_fragment(interval: float):
+    """Decorator for a fragment that reruns itself every interval seconds, or None if Streamlit can't."""
+    decorator = getattr(st, 'fragment', None) or getattr(st, 'experimental_fragment', None)
+    if decorator is None:
+        return None
+    try:
+        return decorator(run_every=interval)
+    except TypeError:
+        return None
+
+
+def bubble_html(role: str, message: str, timestamp: str) -> str:
+    """WhatsApp-style chat bubble: user on the right (green), assistant on the left (white)."""
+    side = "user" if role == "user" else "assistant"
+    return f"""
+        <div class="message-container-{side}">
+            <div class="{side}-message">
+                <div>{message}</div>
+                <div class="message-time">{timestamp}</div>
+            </div>
+        </div>
+        """
+
+
+class Block(NamedTuple):
+    """Consecutive bubbles rendered as one markdown element, optionally followed by a notice."""
+    html: str
+    notice: Optional[str] = None
+
+
+# (role, message, timestamp, notice shown after the message or None)
+Entry = Tuple[str, str, str, Optional[str]]
+
+
+class TranscriptView:
+    """
+    Rendered blocks for the settled part of one session's transcript.
+
+    Entries are appended incrementally: only messages added since the last
+    call are turned into HTML, and a block is sealed once it holds
+    ``block_size`` messages or ends with a notice. If the transcript was
+    cleared or rewritten, the view starts over.
+
+    The view lives in one session's state and is the only cache of its
+    HTML; nothing is kept process-wide, so the memory goes with the session.
+    """
+
+    def __init__(self, block_size: int = BLOCK_SIZE):
+        self.block_size = block_size
+        self._reset()
+
+    def _reset(self) -> None:
+        self._sealed: List[Block] = []
+        self._open: List[str] = []
+        self._last: Optional[Entry] = None
+        self._count = 0
+
+    def blocks(self, entries: Sequence[Entry]) -> List[Block]:
+        """Blocks covering all entries, in order."""
+        if len(entries) < self._count or (self._count and entries[self._count - 1] != self._last):
+            self._reset()
+
+        for role, message, timestamp, notice in entries[self._count:]:
+            self._open.append(bubble_html(role, message, timestamp))
+            if notice is not None or len(self._open) >= self.block_size:
+                self._sealed.append(Block('\n\n'.join(self._open), notice))
+                self._open = []
+        if len(entries) > self._count:
+            self._count = len(entries)
+            self._last = entries[-1]
+
+        if self._open:
+            return self._sealed + [Block('\n\n'.join(self._open))]
+        return self._sealed
+
+
+def render_blocks(blocks: Sequence[Block]) -> None:
+    """Emit rendered blocks: one markdown element per block, plus its notice."""
+    for block in blocks:
+        st.markdown(block.html, unsafe_allow_html=True)
+        if block.notice:
+            st.success(block.notice)
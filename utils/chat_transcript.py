@@ -0,0 +1,294 @@
+"""
+Compact chat transcripts for Streamlit sessions
+Slotted message records with a bounded in-memory window; older turns spill to a per-session file on disk
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+import weakref
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+from .chat_context import SUMMARY_TOKENS, summarize_turn
+from .metrics import metrics
+from .prompt_budget import estimate_tokens
+
+TRANSCRIPTS_DIR = os.getenv('CHAT_TRANSCRIPT_DIR') or os.path.join(os.path.dirname(__file__), '../data/transcripts')
+
+# Messages kept in memory per session, and how many spill to disk at a time once the window is full
+RECENT_WINDOW = int(os.getenv('CHAT_RECENT_WINDOW', '40'))
+SPILL_BATCH = int(os.getenv('CHAT_SPILL_BATCH', '20'))
+
+# Spill files untouched this many seconds belong to sessions that ended without cleaning up; swept hourly
+TRANSCRIPT_TTL = int(os.getenv('CHAT_TRANSCRIPT_TTL', '86400'))
+SWEEP_INTERVAL = 3600
+
+_sweep_lock = threading.Lock()
+_last_sweep: Dict[str, float] = {}
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def sweep_transcripts(directory: str = TRANSCRIPTS_DIR, max_age: float = TRANSCRIPT_TTL) -> int:
+    """Delete spill files not written for max_age seconds; returns how many were removed."""
+    cutoff = time.time() - max_age
+    removed = 0
+    try:
+        entries = os.scandir(directory)
+    except FileNotFoundError:
+        return 0
+    with entries:
+        for entry in entries:
+            if not entry.name.endswith('.jsonl'):
+                continue
+            try:
+                if entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+                    removed += 1
+            except FileNotFoundError:
+                continue  # removed by another session or replica
+    if removed:
+        metrics.increment('chat_transcript.swept', removed)
+    return removed
+
+
+def _maybe_sweep(directory: str) -> None:
+    """Run sweep_transcripts on a directory at most once per SWEEP_INTERVAL in this process."""
+    now = time.time()
+    with _sweep_lock:
+        if now - _last_sweep.get(directory, 0) < SWEEP_INTERVAL:
+            return
+        _last_sweep[directory] = now
+    sweep_transcripts(directory)
+
+
+class ChatMessage:
+    """
+    One transcript entry.
+
+    Slotted instead of a dict, with role, language and timestamp strings
+    interned (they repeat across every message of every session). Reads
+    like the dicts the pages used before: ``msg['message']``,
+    ``msg.get('language')``; unset optional fields behave as missing keys.
+    ``welcome`` marks the greeting the page opens with, which is never
+    sent to the AI.
+    """
+
+    __slots__ = ('role', 'message', 'timestamp', 'language', 'detected_language', 'language_confidence', 'feedback',
+                 'welcome')
+
+    def __init__(self, role: str, message: str, timestamp: str = '', language: Optional[str] = None,
+                 detected_language: Optional[str] = None, language_confidence: Optional[float] = None,
+                 feedback: Optional[str] = None, welcome: Optional[bool] = None):
+        self.role = _intern(role)
+        self.message = message
+        self.timestamp = _intern(timestamp)
+        self.language = _intern(language)
+        self.detected_language = _intern(detected_language)
+        self.language_confidence = language_confidence
+        self.feedback = _intern(feedback)
+        self.welcome = welcome or None
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'ChatMessage':
+        return cls(**{field: data[field] for field in cls.__slots__ if field in data})
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {field: getattr(self, field) for field in self.__slots__ if getattr(self, field) is not None}
+
+    def __getitem__(self, key: str) -> Any:
+        value = getattr(self, key, None) if key in self.__slots__ else None
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, ChatMessage):
+            return all(getattr(self, f) == getattr(other, f) for f in self.__slots__)
+        if isinstance(other, dict):
+            return self.to_dict() == {k: v for k, v in other.items() if v is not None}
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"ChatMessage({self.role!r}, {self.message[:40]!r}...)"
+
+
+class ChatTranscript:
+    """
+    A session's chat transcript: a window of recent messages in memory,
+    older ones in data/transcripts/<session_id>.jsonl.
+
+    Indexing uses absolute positions, so ``transcript[i]`` and ``len()``
+    behave like the list it replaces; reading a spilled position (or
+    iterating the whole transcript, as ticket creation does) loads it back
+    from disk. recent() gives the in-memory window without touching disk.
+
+    Spilled turns stay in the AI's view as summary lines (the opening one
+    plus the newest that fit ``summary_tokens``), which prompt_history()
+    passes on with the window. A transcript belongs to one session, so it
+    is only used from that session's script thread.
+
+    The spill file is deleted by discard() (ticket created, logout) or
+    when the transcript is garbage collected with its session; files left
+    by a process that died are swept once untouched for CHAT_TRANSCRIPT_TTL.
+    """
+
+    def __init__(self, session_id: Optional[str] = None, window: int = RECENT_WINDOW,
+                 spill_batch: int = SPILL_BATCH, directory: str = TRANSCRIPTS_DIR,
+                 summary_tokens: int = SUMMARY_TOKENS):
+        self.session_id = session_id or uuid.uuid4().hex
+        self.window = window
+        self.spill_batch = spill_batch
+        self.directory = directory
+        self.summary_tokens = summary_tokens
+        self.offset = 0  # messages spilled to disk
+        self._recent: List[ChatMessage] = []
+        self._spilled_summary: List[str] = []
+        self._spilled_summary_tokens = 0
+        self._user_turns = 0
+        self._cleanup = weakref.finalize(self, _remove, self.path)
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.directory, f"{self.session_id}.jsonl")
+
+    def __len__(self) -> int:
+        return self.offset + len(self._recent)
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
+
+    def append(self, message: Union[ChatMessage, Dict[str, Any]]) -> None:
+        """Add a message (a ChatMessage or a dict with the same fields)."""
+        if not isinstance(message, ChatMessage):
+            message = ChatMessage.from_dict(message)
+        self._recent.append(message)
+        if message.role == 'user':
+            self._user_turns += 1
+
+    def pop(self) -> ChatMessage:
+        """Remove and return the newest message."""
+        message = self._recent.pop()
+        if message.role == 'user':
+            self._user_turns -= 1
+        return message
+
+    @property
+    def user_turns(self) -> int:
+        """User messages in the whole transcript, spilled ones included."""
+        return self._user_turns
+
+    def recent(self) -> List[ChatMessage]:
+        """The in-memory window, oldest first."""
+        return list(self._recent)
+
+    def recent_items(self) -> Iterator[Tuple[int, ChatMessage]]:
+        """(absolute index, message) for the in-memory window."""
+        return enumerate(self._recent, self.offset)
+
+    def spilled_summary(self) -> List[str]:
+        """Summary lines for the turns spilled to disk, oldest first."""
+        return list(self._spilled_summary)
+
+    def prompt_history(self) -> Dict[str, Any]:
+        """Keyword arguments for match_query / stream_query: the window, a summary of what was spilled, user turns."""
+        return {'chat_history': self.recent(), 'earlier_summary': self.spilled_summary(), 'user_turns': self.user_turns}
+
+    def _summarize_spilled(self, messages: List[ChatMessage]) -> None:
+        for message in messages:
+            if message.welcome:
+                continue
+            line = summarize_turn(message.role, message.message)
+            self._spilled_summary.append(line)
+            self._spilled_summary_tokens += estimate_tokens(line)
+        # Keep the opening line and as many of the newest as the AI prompt can use
+        while self._spilled_summary_tokens > self.summary_tokens and len(self._spilled_summary) > 2:
+            self._spilled_summary_tokens -= estimate_tokens(self._spilled_summary.pop(1))
+
+    def _absolute(self, index: int) -> int:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('transcript index out of range')
+        return index
+
+    def __getitem__(self, index: Union[int, slice]):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if start >= self.offset and step == 1:
+                return self._recent[start - self.offset:max(stop - self.offset, 0)]
+            return list(self)[index]
+        index = self._absolute(index)
+        if index >= self.offset:
+            return self._recent[index - self.offset]
+        return self.load_spilled(index, index + 1)[0]
+
+    def __iter__(self) -> Iterator[ChatMessage]:
+        if self.offset:
+            yield from self.load_spilled(0, self.offset)
+        yield from list(self._recent)
+
+    def load_spilled(self, start: int = 0, stop: Optional[int] = None) -> List[ChatMessage]:
+        """Read spilled messages [start, stop) back from disk."""
+        stop = self.offset if stop is None else min(stop, self.offset)
+        if start >= stop:
+            return []
+        metrics.increment('chat_transcript.rehydrated', stop - start)
+        messages = []
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for position, line in enumerate(f):
+                    if position >= stop:
+                        break
+                    if position >= start:
+                        messages.append(ChatMessage.from_dict(json.loads(line)))
+        except FileNotFoundError:
+            # Swept after the session sat idle past CHAT_TRANSCRIPT_TTL
+            metrics.increment('chat_transcript.missing_spill')
+        return messages
+
+    def compact(self, feedback_given: Optional[Dict[str, str]] = None) -> int:
+        """
+        Spill the oldest messages to disk once the window is full; returns how many.
+
+        Feedback state for spilled messages moves out of ``feedback_given``
+        (keys ``feedback_<index>``) into the spilled records.
+        """
+        if len(self._recent) <= self.window:
+            return 0
+        count = max(len(self._recent) - self.window, min(self.spill_batch, len(self._recent)))
+        spilled = self._recent[:count]
+        os.makedirs(self.directory, exist_ok=True)
+        _maybe_sweep(self.directory)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            for index, message in enumerate(spilled, self.offset):
+                if feedback_given is not None:
+                    message.feedback = _intern(feedback_given.pop(f"feedback_{index}", message.feedback))
+                f.write(json.dumps(message.to_dict(), ensure_ascii=False) + '\n')
+        del self._recent[:count]
+        self.offset += count
+        self._summarize_spilled(spilled)
+        metrics.increment('chat_transcript.spilled', count)
+        return count
+
+    def discard(self) -> None:
+        """Delete the spilled part of this transcript from disk."""
+        self._cleanup()
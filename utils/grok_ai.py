@@ -1,7 +1,17 @@
 import os
 import json
+import random
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
 import requests
-from typing import List, Dict, Any
+from requests.adapters import HTTPAdapter
+from typing import List, Dict, Any, Iterator, Optional
+
+from .metrics import metrics
+from .prompt_budget import MESSAGE_OVERHEAD_TOKENS, message_tokens
+from .prompts import HELPDESK_SYSTEM_PROMPT, build_system_prompt
 
 # Try to import streamlit for secrets support
 try:
@@ -39,6 +49,128 @@ def get_config_value(key: str, default: str = None):
 # Load environment variables
 load_env_vars()
 
+class GrokAPIError(Exception):
+    """Raised when the Grok API request fails or returns an unusable response."""
+
+class CircuitOpenError(GrokAPIError):
+    """Raised without contacting the API while the circuit breaker is open."""
+
+# Upstream statuses worth retrying
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+class CircuitBreaker:
+    """
+    Circuit breaker for the Grok API.
+    
+    Closed: calls go through and their outcomes are recorded. When, within the
+    last ``window_seconds``, at least ``min_calls`` calls were made and the share
+    of failed or slow ones reaches ``failure_rate``, the breaker opens.
+    Open: calls are rejected immediately for ``open_seconds``.
+    Half-open: up to ``half_open_probes`` probe calls are let through; if they
+    all succeed the breaker closes, a single failure re-opens it.
+    """
+    
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+    
+    def __init__(self, failure_rate: float = 0.5, min_calls: int = 5, window_seconds: float = 60,
+                 open_seconds: float = 30, slow_call_seconds: float = 15, half_open_probes: int = 1):
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.window_seconds = window_seconds
+        self.open_seconds = open_seconds
+        self.slow_call_seconds = slow_call_seconds
+        self.half_open_probes = half_open_probes
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._outcomes = deque()  # (monotonic time, ok)
+        self._opened_at = 0.0
+        self._probes_started = 0
+        self._probes_succeeded = 0
+    
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._maybe_half_open()
+            return self._state
+    
+    def _maybe_half_open(self):
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+            self._set_state(self.HALF_OPEN)
+    
+    def _set_state(self, state: str):
+        self._state = state
+        self._probes_started = 0
+        self._probes_succeeded = 0
+        if state == self.OPEN:
+            self._opened_at = time.monotonic()
+        if state == self.CLOSED:
+            self._outcomes.clear()
+        metrics.set_gauge('grok.circuit_open', 0 if state == self.CLOSED else 1)
+        metrics.increment(f'grok.circuit.{state}')
+    
+    def allow_request(self) -> bool:
+        """Return True if a call may go to the API now."""
+        with self._lock:
+            self._maybe_half_open()
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.HALF_OPEN and self._probes_started < self.half_open_probes:
+                self._probes_started += 1
+                return True
+            return False
+    
+    def record_success(self, latency: float):
+        """Record a completed call; slow calls count against the upstream's health."""
+        if latency >= self.slow_call_seconds:
+            self.record_failure(latency)
+            return
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._probes_succeeded += 1
+                if self._probes_succeeded >= self.half_open_probes:
+                    self._set_state(self.CLOSED)
+                return
+            self._record(True)
+    
+    def record_failure(self, latency: float = 0.0):
+        """Record a failed (or too slow) call."""
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._set_state(self.OPEN)
+                return
+            self._record(False)
+            if self._state == self.CLOSED and self._should_open():
+                self._set_state(self.OPEN)
+    
+    def _record(self, ok: bool):
+        now = time.monotonic()
+        self._outcomes.append((now, ok))
+        while self._outcomes and now - self._outcomes[0][0] > self.window_seconds:
+            self._outcomes.popleft()
+    
+    def _should_open(self) -> bool:
+        calls = len(self._outcomes)
+        if calls < self.min_calls:
+            return False
+        failures = sum(1 for _, ok in self._outcomes if not ok)
+        return failures / calls >= self.failure_rate
+
+def _retry_after_seconds(response) -> Optional[float]:
+    """Parse a Retry-After header given in seconds or as an HTTP date."""
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
 class GrokAIService:
     def __init__(self):
         self.api_key = get_config_value('GROK_API_KEY')
@@ -48,6 +180,35 @@ class GrokAIService:
         
         if not self.api_key:
             raise ValueError("GROK_API_KEY not found in environment variables or Streamlit secrets")
+        
+        # Keep-alive connection pool shared by every session in this process
+        self.pool_size = int(get_config_value('GROK_POOL_SIZE', '10'))
+        self.timeout = (
+            float(get_config_value('GROK_CONNECT_TIMEOUT', '5')),
+            float(get_config_value('GROK_READ_TIMEOUT', '30'))
+        )
+        self.session = self._create_session()
+        
+        # Retries for transient upstream errors, and a breaker that fails fast while it is unhealthy
+        self.max_retries = int(get_config_value('GROK_MAX_RETRIES', '2'))
+        self.retry_backoff = float(get_config_value('GROK_RETRY_BACKOFF', '0.5'))
+        self.retry_max_delay = float(get_config_value('GROK_RETRY_MAX_DELAY', '8'))
+        self.breaker = CircuitBreaker(
+            failure_rate=float(get_config_value('GROK_BREAKER_FAILURE_RATE', '0.5')),
+            min_calls=int(get_config_value('GROK_BREAKER_MIN_CALLS', '5')),
+            window_seconds=float(get_config_value('GROK_BREAKER_WINDOW', '60')),
+            open_seconds=float(get_config_value('GROK_BREAKER_OPEN_SECONDS', '30')),
+            slow_call_seconds=float(get_config_value('GROK_BREAKER_SLOW_CALL_SECONDS', '15'))
+        )
+    
+    def _create_session(self) -> requests.Session:
+        """Create a pooled, keep-alive HTTP session for the Grok API."""
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.headers.update(self._get_headers())
+        return session
     
     def _get_headers(self) -> Dict[str, str]:
         """Get headers for API requests."""
@@ -61,44 +222,85 @@ class GrokAIService:
     
     def _get_helpdesk_system_prompt(self) -> str:
         """Get the system prompt for helpdesk-specific responses."""
-        return """You are an expert IT Helpdesk Assistant for a global corporation. Your role is to:
-
-1. **Provide immediate technical support** for common IT issues including:
-   - Network connectivity problems
-   - Software installation and troubleshooting
-   - Hardware issues (printers, monitors, keyboards, etc.)
-   - Password resets and account access
-   - Email and communication tools
-   - VPN and security-related queries
-   - Operating system issues (Windows, macOS, Linux)
-   - Microsoft Office and productivity software
-   - Mobile device support
-
-2. **Respond professionally** with:
-   - Clear, step-by-step instructions
-   - Technical accuracy appropriate for business users
-   - Friendly but professional tone
-   - Empathy for user frustration
-   - Confidence in your solutions
-
-3. **Structure your responses** with:
-   - Brief acknowledgment of the issue
-   - Numbered step-by-step solutions
-   - Additional tips or warnings if relevant
-   - Offer to escalate if the solution doesn't work
-
-4. **For complex issues**:
-   - Provide initial troubleshooting steps
-   - Suggest when to escalate to human support
-   - Recommend creating a support ticket for tracking
-
-5. **Security awareness**:
-   - Never ask for passwords or sensitive information
-   - Provide secure best practices
-   - Warn about potential security risks
-
-Always maintain a helpful, solution-oriented approach while ensuring users feel supported and confident in implementing your suggestions."""
+        return HELPDESK_SYSTEM_PROMPT
 
+    def _build_messages(self, messages: List[Dict[str, str]], user_context: Dict[str, Any] = None) -> List[Dict[str, str]]:
+        """Prepend the helpdesk system message (with user and language context) to the conversation."""
+        # Static segments come memoized from utils.prompts; only the user context is formatted per turn
+        content, system_tokens = build_system_prompt(user_context, self.model)
+        metrics.observe('grok.prompt_tokens', system_tokens + MESSAGE_OVERHEAD_TOKENS + sum(message_tokens(m) for m in messages))
+        return [{"role": "system", "content": content}] + messages
+
+    def _post(self, payload: Dict[str, Any], stream: bool = False) -> requests.Response:
+        """
+        POST a chat completion request through the circuit breaker.
+        
+        Connection errors and 429/5xx responses are retried with jittered
+        exponential backoff, honoring Retry-After. Read timeouts are not
+        retried: they already cost the full timeout. Returns a 200 response.
+        
+        Every call let through the breaker records an outcome, whatever it
+        raises. For streams the outcome is recorded once the body is read.
+        """
+        for attempt in range(self.max_retries + 1):
+            if not self.breaker.allow_request():
+                metrics.increment('grok.short_circuited')
+                raise CircuitOpenError("Grok API circuit breaker is open")
+            
+            backoff = random.uniform(0, min(self.retry_max_delay, self.retry_backoff * (2 ** attempt)))
+            start = time.monotonic()
+            # Every allowed call must settle with the breaker, or a half-open probe never ends
+            settled = False
+            try:
+                try:
+                    response = self.session.post(
+                        f"{self.api_url}/chat/completions",
+                        json=payload,
+                        timeout=self.timeout,
+                        stream=stream
+                    )
+                except requests.RequestException as e:
+                    settled = True
+                    self.breaker.record_failure(time.monotonic() - start)
+                    metrics.increment('grok.errors')
+                    if isinstance(e, requests.ConnectionError) and attempt < self.max_retries:
+                        metrics.increment('grok.retries')
+                        time.sleep(backoff)
+                        continue
+                    raise GrokAPIError(str(e)) from e
+                
+                latency = time.monotonic() - start
+                if response.status_code == 200:
+                    metrics.observe('grok.latency_seconds', latency)
+                    settled = True
+                    if not stream:
+                        self.breaker.record_success(latency)
+                    # A stream settles once its body has been read (see request_completion_stream)
+                    return response
+                
+                response.close()
+                metrics.increment('grok.errors')
+                settled = True
+                if response.status_code not in RETRYABLE_STATUS_CODES:
+                    # A client error still means the upstream itself is answering
+                    self.breaker.record_success(latency)
+                    raise GrokAPIError(f"Grok API returned HTTP {response.status_code}")
+                
+                self.breaker.record_failure(latency)
+                retry_after = _retry_after_seconds(response)
+                delay = max(backoff, retry_after or 0.0)
+                if attempt >= self.max_retries or delay > self.retry_max_delay:
+                    raise GrokAPIError(f"Grok API returned HTTP {response.status_code}")
+                metrics.increment('grok.retries')
+                time.sleep(delay)
+            finally:
+                if not settled:
+                    # Anything else, e.g. a payload that cannot be serialized
+                    self.breaker.record_failure(time.monotonic() - start)
+                    metrics.increment('grok.errors')
+        
+        raise GrokAPIError("Grok API retries exhausted")
+    
     def chat_completion(self, messages: List[Dict[str, str]], user_context: Dict[str, Any] = None) -> str:
         """
         Get a chat completion from Grok AI with helpdesk-specific context.
@@ -111,52 +313,126 @@ Always maintain a helpful, solution-oriented approach while ensuring users feel
             AI response as string
         """
         try:
-            # Prepare the system message with helpdesk context
-            system_message = {
-                "role": "system",
-                "content": self._get_helpdesk_system_prompt()
-            }
-            
-            # Add user context if provided
-            if user_context:
-                context_info = f"\nUser Context: Username: {user_context.get('username', 'N/A')}, ID: {user_context.get('user_id', 'N/A')}, Email: {user_context.get('email', 'N/A')}"
-                system_message["content"] += context_info
-                
-                # Add language-specific instructions if available
-                if 'language_prompt' in user_context and user_context['language_prompt']:
-                    system_message["content"] = user_context['language_prompt'] + "\n\n" + system_message["content"]
-            
-            # Prepare the full message list
-            full_messages = [system_message] + messages
-            
-            # Prepare the request payload
-            payload = {
-                "model": self.model,
-                "messages": full_messages,
-                "temperature": 0.7,
-                "max_tokens": 1000,
-                "stream": False
-            }
-            
-            # Make the API request
-            response = requests.post(
-                f"{self.api_url}/chat/completions",
-                headers=self._get_headers(),
-                json=payload,
-                timeout=30
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                return data['choices'][0]['message']['content'].strip()
-            else:
-                # Fallback to dummy response if API fails
-                return self._get_fallback_response(messages[-1]['content'] if messages else "")
-                
+            return self.request_completion(messages, user_context)
         except Exception as e:
             # Fallback to dummy response on any error
             return self._get_fallback_response(messages[-1]['content'] if messages else "")
     
+    def request_completion(self, messages: List[Dict[str, str]], user_context: Dict[str, Any] = None) -> str:
+        """Like chat_completion, but raises GrokAPIError instead of returning the fallback response."""
+        # Prepare the request payload
+        payload = {
+            "model": self.model,
+            "messages": self._build_messages(messages, user_context),
+            "temperature": 0.7,
+            "max_tokens": 1000,
+            "stream": False
+        }
+        
+        response = self._post(payload)
+        try:
+            data = response.json()
+            return data['choices'][0]['message']['content'].strip()
+        except GrokAPIError:
+            raise
+        except Exception as e:
+            raise GrokAPIError(str(e)) from e
+    
+    def stream_chat_completion(self, messages: List[Dict[str, str]], user_context: Dict[str, Any] = None) -> Iterator[str]:
+        """
+        Stream a chat completion from Grok AI as incremental text deltas.
+        
+        If the request fails before any text was produced, yields the
+        fallback response instead.
+        
+        Args:
+            messages: List of message dictionaries with 'role' and 'content'
+            user_context: Additional context about the user (username, department, etc.)
+        
+        Yields:
+            Chunks of the AI response
+        """
+        produced = False
+        try:
+            for delta in self.request_completion_stream(messages, user_context):
+                produced = True
+                yield delta
+        except GrokAPIError:
+            pass
+        
+        if not produced:
+            # Fallback to dummy response if API fails
+            yield self._get_fallback_response(messages[-1]['content'] if messages else "")
+    
+    def request_completion_stream(self, messages: List[Dict[str, str]], user_context: Dict[str, Any] = None) -> Iterator[str]:
+        """
+        Stream a completion, raising GrokAPIError on failure.
+        
+        Parses the server-sent events of a ``"stream": True`` request and
+        yields each content delta as it arrives.
+        """
+        payload = {
+            "model": self.model,
+            "messages": self._build_messages(messages, user_context),
+            "temperature": 0.7,
+            "max_tokens": 1000,
+            "stream": True
+        }
+        
+        produced = False
+        healthy = False
+        response = self._post(payload, stream=True)
+        try:
+            with response:
+                for delta in self._iter_sse_deltas(response):
+                    if not produced:
+                        delta = delta.lstrip()
+                        if not delta:
+                            continue
+                    produced = True
+                    yield delta
+            healthy = produced
+        except GeneratorExit:
+            # The caller stopped reading; the upstream was answering fine
+            healthy = True
+            raise
+        except GrokAPIError:
+            raise
+        except Exception as e:
+            raise GrokAPIError(str(e)) from e
+        finally:
+            # Mid-stream errors, stalls and empty streams count against the upstream
+            latency = response.elapsed.total_seconds()
+            if healthy:
+                self.breaker.record_success(latency)
+            else:
+                self.breaker.record_failure(latency)
+                metrics.increment('grok.errors')
+        
+        if not produced:
+            raise GrokAPIError("Grok API returned an empty stream")
+    
+    @staticmethod
+    def _iter_sse_deltas(response) -> Iterator[str]:
+        """Yield content deltas from an OpenAI-compatible server-sent event stream."""
+        # Event streams often omit a charset; requests would then yield bytes
+        response.encoding = response.encoding or 'utf-8'
+        for line in response.iter_lines(decode_unicode=True):
+            if not line or not line.startswith('data:'):
+                continue
+            data = line[len('data:'):].strip()
+            if data == '[DONE]':
+                break
+            try:
+                chunk = json.loads(data)
+            except json.JSONDecodeError:
+                continue
+            choices = chunk.get('choices') or []
+            if choices:
+                content = (choices[0].get('delta') or {}).get('content')
+                if content:
+                    yield content
+    
     def _get_fallback_response(self, user_query: str) -> str:
         """Provide a fallback response when AI service is unavailable."""
         fallback_responses = {
@@ -207,16 +483,19 @@ Format as a professional support ticket summary."""
 
 # Global instance
 grok_service = None
+_grok_service_lock = threading.Lock()
 
 def get_grok_service():
     """Get or create the Grok AI service instance."""
     global grok_service
     if grok_service is None:
-        try:
-            grok_service = GrokAIService()
-        except ValueError:
-            # Return None if API key is not configured
-            grok_service = None
+        with _grok_service_lock:
+            if grok_service is None:
+                try:
+                    grok_service = GrokAIService()
+                except ValueError:
+                    # Return None if API key is not configured
+                    grok_service = None
     return grok_service
 
 def is_grok_available() -> bool:
@@ -0,0 +1,106 @@
+"""
+Keyword intent router for the rule-based assistant
+Matches a query against the intents in data/intents.json with one compiled regex
+"""
+
+import json
+import os
+import re
+from typing import Dict, List, Optional, Tuple
+
+INTENTS_PATH = os.path.join(os.path.dirname(__file__), '../data/intents.json')
+
+
+# Words are runs of letters/digits; "wi-fi" and "wi fi" both read as ("wi", "fi")
+_WORD = re.compile(r'\w+')
+
+
+class IntentRouter:
+    """
+    Routes a query to the best-matching intent.
+
+    ``data/intents.json`` maps each intent to its keywords, in priority
+    order. Keywords are whole words or phrases matched case-insensitively
+    (so "print" no longer fires on "blueprint"); a trailing ``*`` on a
+    single word matches any word starting with the stem. All keywords are
+    compiled into one alternation (phrases with more words first, stems
+    last), so the regex engine finds the matches in a single C-level scan
+    and only the few matches are looked up in Python. Each match scores
+    its intent by the number of words in the keyword, and the highest
+    score wins, earlier intents winning ties.
+    """
+
+    def __init__(self, path: str = INTENTS_PATH):
+        self.path = path
+        with open(path, 'r', encoding='utf-8') as f:
+            intents = json.load(f)
+        self.intents: List[str] = list(intents)
+        self._compile(intents)
+
+    def _compile(self, intents: Dict[str, List[str]]) -> None:
+        """Build the keyword alternation and the tables that map its matches back to intents."""
+        owners: Dict[str, List[int]] = {}
+        for rank, keywords in enumerate(intents.values()):
+            for keyword in keywords:
+                ranks = owners.setdefault(keyword.casefold().strip(), [])
+                if rank not in ranks:
+                    ranks.append(rank)
+
+        # Keyed by the keyword's words joined with single spaces: (intent ranks, score)
+        self._keywords: Dict[str, Tuple[List[int], int]] = {}
+        self._prefixes: Dict[str, List[int]] = {}
+        for keyword, ranks in owners.items():
+            if keyword.endswith('*'):
+                self._prefixes[keyword[:-1]] = ranks
+                continue
+            words = _WORD.findall(keyword)
+            if words:
+                self._keywords.setdefault(' '.join(words), (ranks, len(keyword.split())))
+
+        phrases = sorted(self._keywords, key=lambda key: (key.count(' '), len(key)), reverse=True)
+        alternatives = [r'\W+'.join(map(re.escape, key.split(' '))) for key in phrases]
+        alternatives += [re.escape(stem) + r'\w*' for stem in sorted(self._prefixes, key=len, reverse=True)]
+        self._pattern = re.compile(r'(?<!\w)(?:' + '|'.join(alternatives) + r')(?!\w)') if alternatives else None
+
+    def _lookup(self, text: str) -> Tuple[List[int], int]:
+        """(intent ranks, score) for a match that isn't a keyword as written: other separators, or a stem."""
+        entry = self._keywords.get(' '.join(_WORD.findall(text)))  # "wi-fi" for "wi fi"
+        if entry is not None:
+            return entry
+        for stem, ranks in self._prefixes.items():
+            if text.startswith(stem):
+                return ranks, 1
+
+    def _totals(self, query: str) -> Dict[int, int]:
+        """Score per intent rank for the keywords found in the query."""
+        totals: Dict[int, int] = {}
+        if self._pattern is None:
+            return totals
+        keywords = self._keywords
+        for text in self._pattern.findall(query.casefold()):
+            ranks, weight = keywords.get(text) or self._lookup(text)
+            for rank in ranks:
+                totals[rank] = totals.get(rank, 0) + weight
+        return totals
+
+    def scores(self, query: str) -> Dict[str, int]:
+        """Score every intent that has at least one keyword in the query."""
+        totals = self._totals(query)
+        return {self.intents[rank]: totals[rank] for rank in sorted(totals)}
+
+    def route(self, query: str) -> Optional[str]:
+        """Return the best intent for the query, or None if no keyword matches."""
+        best, best_score = None, 0
+        for rank, score in self._totals(query).items():
+            # Highest score wins; of equal scores, the earlier intent
+            if score > best_score or (score == best_score and rank < best):
+                best, best_score = rank, score
+        return self.intents[best] if best is not None else None
+
+
+# Global instance
+intent_router = IntentRouter()
+
+def route_intent(query: str) -> Optional[str]:
+    """Return the best intent for the query, or None."""
+    return intent_router.route(query)
@@ -0,0 +1,124 @@
+"""
+Troubleshooting knowledge base for the IT Helpdesk
+Loads data/dummy_steps.json once, hot-reloads it when the file changes and serves pre-rendered step lists
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+KB_PATH = os.path.join(os.path.dirname(__file__), '../data/dummy_steps.json')
+
+
+class _Snapshot(NamedTuple):
+    """One immutable, fully prepared version of the knowledge base."""
+    mtime: Optional[int]
+    steps: Dict[str, List[str]]
+    rendered: Dict[str, str]
+    pattern: Optional[re.Pattern]
+    ranks: Dict[str, Tuple[int, str]]
+
+
+def render_steps(steps: List[str]) -> str:
+    """Render a list of steps as ``**Step N:**`` markdown lines."""
+    return '\n'.join(f"**Step {i+1}:** {step}" for i, step in enumerate(steps))
+
+
+def _build_snapshot(steps: Dict[str, List[str]], mtime: Optional[int]) -> _Snapshot:
+    """Pre-render every entry and compile one pattern over all keywords."""
+    keywords = list(steps)
+    pattern = None
+    if keywords:
+        alternatives = '|'.join(re.escape(k.casefold()) for k in sorted(keywords, key=len, reverse=True))
+        pattern = re.compile(r'(?<!\w)(?:' + alternatives + r')(?!\w)')
+    return _Snapshot(
+        mtime=mtime,
+        steps=steps,
+        rendered={keyword: render_steps(entry) for keyword, entry in steps.items()},
+        pattern=pattern,
+        ranks={keyword.casefold(): (rank, keyword) for rank, keyword in enumerate(keywords)},
+    )
+
+
+class KnowledgeBase:
+    """
+    Keyword -> troubleshooting steps, loaded once per process.
+
+    The file's mtime is checked at most every ``check_interval`` seconds;
+    when it changes the file is parsed and prepared off to the side and
+    swapped in as a single snapshot, so readers never see a half-loaded
+    knowledge base and no restart is needed. A file that fails to parse
+    leaves the previous snapshot in place.
+    """
+
+    def __init__(self, path: str = KB_PATH, check_interval: float = 2.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._next_check = 0.0
+        self._failed_mtime = None
+        self._snapshot = _build_snapshot({}, None)
+
+    def _current(self) -> _Snapshot:
+        """Return the current snapshot, reloading first if the file changed."""
+        now = time.monotonic()
+        if now < self._next_check:
+            return self._snapshot
+        with self._lock:
+            if now >= self._next_check:
+                self._next_check = now + self.check_interval
+                self._reload_if_changed()
+        return self._snapshot
+
+    def _reload_if_changed(self) -> None:
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return
+        if mtime in (self._snapshot.mtime, self._failed_mtime):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                steps = json.load(f)
+        except (OSError, ValueError) as e:
+            self._failed_mtime = mtime
+            print(f"Knowledge base reload failed, keeping previous version: {e}")
+            return
+        self._snapshot = _build_snapshot(steps, mtime)
+
+    @property
+    def version(self) -> Optional[int]:
+        """mtime of the loaded file; changes whenever a new version is swapped in."""
+        return self._current().mtime
+
+    def steps(self) -> Dict[str, List[str]]:
+        """All entries, keyword -> list of steps."""
+        return dict(self._current().steps)
+
+    def rendered(self, keyword: str) -> Optional[str]:
+        """Pre-rendered markdown steps for a keyword."""
+        return self._current().rendered.get(keyword)
+
+    def match(self, query: str) -> Optional[Tuple[str, str]]:
+        """
+        Find the entry whose keyword appears in the query.
+
+        Returns:
+            (keyword, rendered steps), or None. When several keywords
+            appear, the one listed first in the file wins.
+        """
+        snapshot = self._current()
+        if snapshot.pattern is None:
+            return None
+        found = {snapshot.ranks[m.group(0)] for m in snapshot.pattern.finditer(query.casefold())}
+        if not found:
+            return None
+        _, keyword = min(found)
+        return keyword, snapshot.rendered[keyword]
+
+
+# Global instance
+knowledge_base = KnowledgeBase()
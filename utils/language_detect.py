@@ -0,0 +1,145 @@
+"""
+Language detection for the IT Helpdesk
+Classifies by Unicode script first, then scores Latin-script text with a character n-gram model
+"""
+
+import json
+import math
+import os
+import re
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+SAMPLES_PATH = os.path.join(os.path.dirname(__file__), '../data/language_samples.json')
+
+# One pass over the text: each run of letters is tagged with its script
+_SCRIPTS = re.compile(
+    r'(?P<kana>[\u3040-\u30ff\u31f0-\u31ff]+)'
+    r'|(?P<hangul>[\u1100-\u11ff\u3130-\u318f\uac00-\ud7af]+)'
+    r'|(?P<han>[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+)'
+    r'|(?P<arabic>[\u0600-\u06ff\u0750-\u077f\ufb50-\ufdff\ufe70-\ufefc]+)'
+    r'|(?P<devanagari>[\u0900-\u097f]+)'
+    r'|(?P<cyrillic>[\u0400-\u04ff]+)'
+    r'|(?P<latin>[A-Za-z\u00c0-\u024f]+)'
+)
+
+# Words of ASCII-only text, which is all Latin script
+_ASCII_WORDS = re.compile(r'[a-z]+')
+
+# Scripts that identify a single supported language
+SCRIPT_LANGUAGES = {
+    'kana': 'ja',
+    'hangul': 'ko',
+    'han': 'zh',
+    'arabic': 'ar',
+    'devanagari': 'hi',
+    'cyrillic': 'ru',
+}
+
+NGRAM_SIZES = (1, 2, 3)
+
+# n-grams kept per language; enough to separate the Latin-script languages we support
+PROFILE_SIZE = 600
+
+WORD_CACHE_SIZE = 50000
+
+
+def _ngrams(word: str) -> List[str]:
+    """Character n-grams of one word, padded with a space at each end."""
+    padded = f" {word} "
+    return [padded[i:i + n] for n in NGRAM_SIZES for i in range(len(padded) - n + 1)]
+
+
+class LanguageDetector:
+    """
+    Detects the language of a message, returning (language, confidence).
+
+    Non-Latin scripts (CJK, Hangul, Arabic, Devanagari, Cyrillic) decide the
+    language directly; Han characters alongside any kana count as Japanese. Latin-script
+    text is scored against per-language character n-gram profiles built
+    once from data/language_samples.json and kept as one log-probability
+    matrix; each word's score vector is computed once and memoized, so a
+    message costs one regex pass plus a few additions per word.
+    """
+
+    def __init__(self, samples_path: str = SAMPLES_PATH, profile_size: int = PROFILE_SIZE, default: str = 'en'):
+        self.default = default
+        with open(samples_path, 'r', encoding='utf-8') as f:
+            samples = json.load(f)
+        self._build(samples, profile_size)
+
+    def _build(self, samples: Dict[str, List[str]], profile_size: int) -> None:
+        self.languages: List[str] = list(samples)
+        profiles = []
+        for language in self.languages:
+            profiles.append(Counter(gram for text in samples[language]
+                                    for m in _SCRIPTS.finditer(text.casefold()) for gram in _ngrams(m.group(0))))
+
+        vocabulary = sorted({gram for profile in profiles for gram, _ in profile.most_common(profile_size)})
+        self._index = {gram: i for i, gram in enumerate(vocabulary)}
+        self._log_probs = np.empty((len(vocabulary), len(self.languages)))
+        for column, profile in enumerate(profiles):
+            kept = dict(profile.most_common(profile_size))
+            total = sum(kept.values()) + len(vocabulary)
+            # Add-one smoothing over the shared vocabulary
+            self._log_probs[:, column] = [math.log((kept.get(gram, 0) + 1) / total) for gram in vocabulary]
+
+        # Words repeat a lot in helpdesk chat, so their score vectors are memoized
+        self._word_scores = lru_cache(maxsize=WORD_CACHE_SIZE)(self._score_word)
+
+    def _score_word(self, word: str) -> Tuple[float, ...]:
+        """Per-language log-likelihood of one word's n-grams."""
+        lookup = self._index.get
+        rows = [row for row in map(lookup, _ngrams(word)) if row is not None]
+        if not rows:
+            return (0.0,) * len(self.languages)
+        return tuple(self._log_probs[rows].sum(axis=0).tolist())
+
+    def _latin(self, words: List[str]) -> Tuple[str, float]:
+        """Score Latin-script words against the n-gram profiles."""
+        scores = list(map(sum, zip(*map(self._word_scores, words))))
+        top = max(scores)
+        # 1-, 2- and 3-grams overlap, so treat the evidence as a third as strong;
+        # the best language's own weight is exp(0) = 1
+        scale = len(NGRAM_SIZES)
+        return self.languages[scores.index(top)], 1 / sum(math.exp((score - top) / scale) for score in scores)
+
+    def detect(self, text: str) -> Tuple[str, float]:
+        """Return (language code, confidence between 0 and 1)."""
+        text = text.casefold()
+        if text.isascii():
+            # Most helpdesk messages: skip the per-script tally
+            words = _ASCII_WORDS.findall(text)
+            return self._latin(words) if words else (self.default, 0.0)
+
+        counts = Counter()
+        latin_words = []
+        for match in _SCRIPTS.finditer(text):
+            script = match.lastgroup
+            counts[script] += len(match.group(0))
+            if script == 'latin':
+                latin_words.append(match.group(0))
+
+        letters = sum(counts.values())
+        if not letters:
+            return self.default, 0.0
+
+        if counts['kana']:
+            # Japanese mixes kana with Han characters
+            counts['kana'] += counts.pop('han', 0)
+        script, count = counts.most_common(1)[0]
+        if script == 'latin':
+            language, confidence = self._latin(latin_words)
+            return language, confidence * count / letters
+        return SCRIPT_LANGUAGES[script], count / letters
+
+
+# Global instance
+language_detector = LanguageDetector()
+
+def detect_language(text: str) -> Tuple[str, float]:
+    """Return (language code, confidence) for a message."""
+    return language_detector.detect(text)
@@ -0,0 +1,84 @@
+"""
+Per-session language tracking for the IT Helpdesk
+Decides when a conversation has really changed language, so one short or ambiguous message doesn't flip the reply language
+"""
+
+import os
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+
+from .language_detect import language_detector
+from .language_support import DETECTION_MIN_CONFIDENCE
+from .metrics import metrics
+
+
+@lru_cache(maxsize=4096)
+def detect(text: str) -> Tuple[str, float]:
+    """(language, confidence) for a message, memoized across sessions."""
+    return language_detector.detect(text.strip())
+
+
+class LanguageTracker:
+    """
+    The reply language of one chat session.
+
+    Each message is detected (memoized per text) and the session language
+    only moves with hysteresis: a detection at ``switch_confidence`` or
+    above switches at once, while a weaker one (but at least
+    ``min_confidence``) must be seen in ``confirmations`` consecutive
+    messages. Anything below ``min_confidence`` keeps the current
+    language. Until the first confident detection the session has no
+    settled language, so the opening message is taken at ``min_confidence``.
+    """
+
+    def __init__(self, language: str = 'en', switch_confidence: float = None,
+                 min_confidence: float = None, confirmations: int = None):
+        self.language = language
+        self.switch_confidence = switch_confidence or float(os.getenv('LANGUAGE_SWITCH_CONFIDENCE', '0.9'))
+        self.min_confidence = min_confidence or float(os.getenv('LANGUAGE_MIN_CONFIDENCE', str(DETECTION_MIN_CONFIDENCE)))
+        self.confirmations = confirmations or int(os.getenv('LANGUAGE_SWITCH_CONFIRMATIONS', '2'))
+        self.settled = False
+        self.detected: Optional[str] = None
+        self.confidence = 0.0
+        self._candidate: Optional[str] = None
+        self._candidate_count = 0
+
+    def observe(self, text: str) -> str:
+        """Detect a message's language, update the session language and return it."""
+        self.detected, self.confidence = detect(text)
+        if self.confidence < self.min_confidence:
+            return self.language
+
+        if self.detected == self.language:
+            self.settled = True
+            self._candidate, self._candidate_count = None, 0
+            return self.language
+
+        if self.detected == self._candidate:
+            self._candidate_count += 1
+        else:
+            self._candidate, self._candidate_count = self.detected, 1
+
+        if (not self.settled or self.confidence >= self.switch_confidence
+                or self._candidate_count >= self.confirmations):
+            self._switch(self.detected)
+        return self.language
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The tracking state, for saving a session; thresholds come from the environment."""
+        return {'language': self.language, 'settled': self.settled,
+                'candidate': self._candidate, 'candidate_count': self._candidate_count}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'LanguageTracker':
+        tracker = cls(data.get('language', 'en'))
+        tracker.settled = bool(data.get('settled'))
+        tracker._candidate = data.get('candidate')
+        tracker._candidate_count = int(data.get('candidate_count', 0))
+        return tracker
+
+    def _switch(self, language: str) -> None:
+        metrics.increment('language.switches')
+        self.language = language
+        self.settled = True
+        self._candidate, self._candidate_count = None, 0
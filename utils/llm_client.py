@@ -0,0 +1,231 @@
+"""
+Async client for the Grok API
+Schedules AI requests on one shared background event loop, with a global concurrency limit and coalescing of identical in-flight requests
+"""
+
+import asyncio
+import contextlib
+import hashlib
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional
+
+from .grok_ai import GrokAPIError, get_config_value, get_grok_service
+from .metrics import metrics
+
+
+class _SharedStream:
+    """One upstream stream whose chunks are replayed to every caller that joined it."""
+
+    def __init__(self):
+        self.chunks: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.readers = 0
+        self.cancelled = False
+        self._changed = threading.Condition()
+
+    def publish(self, chunk: str) -> None:
+        with self._changed:
+            self.chunks.append(chunk)
+            self._changed.notify_all()
+
+    def finish(self, error: BaseException = None) -> None:
+        with self._changed:
+            self.done = True
+            self.error = error
+            self._changed.notify_all()
+
+    def read(self) -> Iterator[str]:
+        """Every chunk from the first one, waiting for the rest as they arrive."""
+        index = 0
+        while True:
+            with self._changed:
+                while index == len(self.chunks) and not self.done:
+                    self._changed.wait()
+                new = self.chunks[index:]
+                done, error = self.done, self.error
+            index += len(new)
+            yield from new
+            if done and index == len(self.chunks):
+                if error is not None:
+                    raise error
+                return
+
+
+class AsyncLLMClient:
+    """
+    Shared front door to the Grok API for every Streamlit session.
+
+    Requests run as tasks on a background event loop. A semaphore caps the
+    number of upstream calls in flight across the process (to stay under the
+    provider's rate limit), and identical requests that arrive while one is
+    already running wait for that call instead of issuing their own. For
+    streams, every caller gets all chunks of the one upstream stream.
+
+    GrokAIService is built on requests, so each upstream call still blocks
+    one thread of a dedicated executor sized to the concurrency limit;
+    callers waiting on a queued or coalesced call hold none of them.
+    Synchronous callers use complete_sync() and stream().
+    """
+
+    def __init__(self, max_concurrency: int = None):
+        self.max_concurrency = max_concurrency or int(get_config_value('GROK_MAX_CONCURRENCY', '8'))
+        self._start_lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._streams: Dict[str, _SharedStream] = {}
+        self._streams_lock = threading.Lock()
+        self._active = 0
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        """Start the background event loop on first use."""
+        if self._loop is not None:
+            return self._loop
+        with self._start_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                loop.set_default_executor(ThreadPoolExecutor(
+                    max_workers=self.max_concurrency, thread_name_prefix='llm-worker'))
+                self._semaphore = asyncio.Semaphore(self.max_concurrency)
+                threading.Thread(target=loop.run_forever, name='llm-event-loop', daemon=True).start()
+                self._loop = loop
+        return self._loop
+
+    @staticmethod
+    def request_key(messages: List[Dict[str, str]], user_context: Dict[str, Any] = None, model: str = None) -> str:
+        """Key identifying requests that would produce the same completion."""
+        raw = json.dumps([model, messages, user_context], sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    async def complete(self, messages: List[Dict[str, str]], user_context: Dict[str, Any] = None) -> str:
+        """
+        Get a completion, joining an identical request already in flight.
+
+        Raises:
+            GrokAPIError: If the service is not configured or the request fails
+        """
+        service = get_grok_service()
+        if service is None:
+            raise GrokAPIError("Grok AI service is not configured")
+
+        key = self.request_key(messages, user_context, service.model)
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._call(service, messages, user_context))
+            self._inflight[key] = future
+            future.add_done_callback(lambda done, key=key: self._forget(key, done))
+        else:
+            metrics.increment('llm.coalesced')
+        # shield: a waiter giving up must not cancel the call for the others
+        return await asyncio.shield(future)
+
+    def _forget(self, key: str, future: asyncio.Future) -> None:
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+
+    async def _call(self, service, messages: List[Dict[str, str]], user_context: Dict[str, Any]) -> str:
+        """Run one upstream request under the concurrency limit."""
+        async with self._slot():
+            metrics.increment('llm.requests')
+            return await asyncio.to_thread(service.request_completion, messages, user_context)
+
+    @contextlib.asynccontextmanager
+    async def _slot(self):
+        """Hold one of the shared upstream slots, recording queue wait and calls in flight."""
+        queued_at = time.perf_counter()
+        async with self._semaphore:
+            metrics.observe('llm.queue_wait', time.perf_counter() - queued_at)
+            self._active += 1
+            metrics.set_gauge('llm.in_flight', self._active)
+            try:
+                yield
+            finally:
+                self._active -= 1
+                metrics.set_gauge('llm.in_flight', self._active)
+
+    def complete_sync(self, messages: List[Dict[str, str]], user_context: Dict[str, Any] = None) -> str:
+        """Blocking wrapper around complete() for Streamlit script threads."""
+        loop = self._ensure_loop()
+        return asyncio.run_coroutine_threadsafe(self.complete(messages, user_context), loop).result()
+
+    def stream(self, messages: List[Dict[str, str]], user_context: Dict[str, Any] = None) -> Iterator[str]:
+        """
+        Stream a completion, joining an identical stream already in flight.
+
+        A caller that joins late still gets the answer from its first chunk.
+        The upstream stream stops early only when every caller has stopped
+        reading.
+
+        Raises:
+            GrokAPIError: If the service is not configured or the request fails
+        """
+        service = get_grok_service()
+        if service is None:
+            raise GrokAPIError("Grok AI service is not configured")
+
+        key = self.request_key(messages, user_context, service.model)
+        with self._streams_lock:
+            shared = self._streams.get(key)
+            if shared is None:
+                shared = self._streams[key] = _SharedStream()
+                loop = self._ensure_loop()
+                asyncio.run_coroutine_threadsafe(self._pump(service, messages, user_context, key, shared), loop)
+            else:
+                metrics.increment('llm.coalesced')
+            shared.readers += 1
+        try:
+            yield from shared.read()
+        finally:
+            with self._streams_lock:
+                shared.readers -= 1
+                if not shared.readers and not shared.done:
+                    # Nobody is reading any more: stop the upstream call, and let the next caller start afresh
+                    shared.cancelled = True
+                    self._forget_stream(key, shared)
+
+    def _forget_stream(self, key: str, shared: _SharedStream) -> None:
+        if self._streams.get(key) is shared:
+            del self._streams[key]
+
+    async def _pump(self, service, messages: List[Dict[str, str]], user_context: Dict[str, Any],
+                    key: str, shared: _SharedStream) -> None:
+        """Run one upstream stream under the concurrency limit, publishing its chunks."""
+        try:
+            async with self._slot():
+                # Every caller may have given up while the stream was queued
+                if not shared.cancelled:
+                    metrics.increment('llm.streams')
+                    await asyncio.to_thread(self._drain, service, messages, user_context, key, shared)
+        finally:
+            with self._streams_lock:
+                self._forget_stream(key, shared)
+            if not shared.done:
+                shared.finish(GrokAPIError("Grok API stream was cancelled"))
+
+    def _drain(self, service, messages: List[Dict[str, str]], user_context: Dict[str, Any],
+               key: str, shared: _SharedStream) -> None:
+        """Read the upstream stream into shared, on an executor thread."""
+        chunks = service.request_completion_stream(messages, user_context)
+        error = None
+        try:
+            for chunk in chunks:
+                if shared.cancelled:
+                    break
+                shared.publish(chunk)
+        except BaseException as e:
+            error = e
+        finally:
+            # Closes the HTTP response when the loop stopped early
+            chunks.close()
+        # Forget the stream before it ends, so later callers start a new one rather than replay this one
+        with self._streams_lock:
+            self._forget_stream(key, shared)
+        shared.finish(error)
+
+
+# Global instance
+llm_client = AsyncLLMClient()
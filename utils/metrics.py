@@ -0,0 +1,58 @@
+"""
+Lightweight in-process metrics for the IT Helpdesk
+Counters, gauges and sampled observations, readable with metrics.snapshot()
+"""
+
+import threading
+from collections import defaultdict, deque
+from typing import Any, Dict
+
+
+class Metrics:
+    """Thread-safe registry of counters, gauges and recent observations."""
+
+    def __init__(self, max_samples: int = 1000):
+        self.max_samples = max_samples
+        self._lock = threading.Lock()
+        self._counters = defaultdict(int)
+        self._gauges = {}
+        self._samples = defaultdict(lambda: deque(maxlen=self.max_samples))
+
+    def increment(self, name: str, value: int = 1) -> None:
+        """Add to a counter."""
+        with self._lock:
+            self._counters[name] += value
+
+    def set_gauge(self, name: str, value: float) -> None:
+        """Record the current value of a gauge."""
+        with self._lock:
+            self._gauges[name] = value
+
+    def observe(self, name: str, value: float) -> None:
+        """Record one observation (latency, size, ...); the most recent samples are kept."""
+        with self._lock:
+            self._samples[name].append(value)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return counters, gauges and summaries (count, mean, p50, p95, max) of observations."""
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            samples = {name: sorted(values) for name, values in self._samples.items()}
+
+        summaries = {}
+        for name, values in samples.items():
+            if not values:
+                continue
+            summaries[name] = {
+                'count': len(values),
+                'mean': sum(values) / len(values),
+                'p50': values[len(values) // 2],
+                'p95': values[min(len(values) - 1, int(len(values) * 0.95))],
+                'max': values[-1]
+            }
+        return {'counters': counters, 'gauges': gauges, 'observations': summaries}
+
+
+# Global metrics instance
+metrics = Metrics()
@@ -0,0 +1,27 @@
+"""
+Token budgeting for AI prompts
+Approximate token counts for prompt sizing, without a network tokenizer
+"""
+
+import re
+from typing import Dict
+
+# Roughly how BPE tokenizers split text: short runs of Latin letters or digits,
+# one token per other letter (accented, CJK, ...) and per punctuation mark
+_TOKEN = re.compile(r'[A-Za-z]{1,4}|\d{1,3}|[^\sA-Za-z\d]')
+
+# Per-message overhead of the chat format (role markers, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate number of tokens in a string (errs slightly high)."""
+    if not text:
+        return 0
+    return len(_TOKEN.findall(text))
+
+
+def message_tokens(message: Dict[str, str]) -> int:
+    """Approximate tokens for one chat message including format overhead."""
+    return estimate_tokens(message.get('content', '')) + MESSAGE_OVERHEAD_TOKENS
+
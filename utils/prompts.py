@@ -0,0 +1,90 @@
+"""
+Prompt templates for the Grok AI service
+Static system prompt segments are assembled once per (language, model) and memoized
+"""
+
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+
+from .prompt_budget import estimate_tokens
+
+HELPDESK_SYSTEM_PROMPT = """You are an expert IT Helpdesk Assistant for a global corporation. Your role is to:
+
+1. **Provide immediate technical support** for common IT issues including:
+   - Network connectivity problems
+   - Software installation and troubleshooting
+   - Hardware issues (printers, monitors, keyboards, etc.)
+   - Password resets and account access
+   - Email and communication tools
+   - VPN and security-related queries
+   - Operating system issues (Windows, macOS, Linux)
+   - Microsoft Office and productivity software
+   - Mobile device support
+
+2. **Respond professionally** with:
+   - Clear, step-by-step instructions
+   - Technical accuracy appropriate for business users
+   - Friendly but professional tone
+   - Empathy for user frustration
+   - Confidence in your solutions
+
+3. **Structure your responses** with:
+   - Brief acknowledgment of the issue
+   - Numbered step-by-step solutions
+   - Additional tips or warnings if relevant
+   - Offer to escalate if the solution doesn't work
+
+4. **For complex issues**:
+   - Provide initial troubleshooting steps
+   - Suggest when to escalate to human support
+   - Recommend creating a support ticket for tracking
+
+5. **Security awareness**:
+   - Never ask for passwords or sensitive information
+   - Provide secure best practices
+   - Warn about potential security risks
+
+Always maintain a helpful, solution-oriented approach while ensuring users feel supported and confident in implementing your suggestions."""
+
+KNOWLEDGE_HEADER = "\n\nCompany procedures that may apply to this question (prefer these steps where relevant):\n"
+
+
+@lru_cache(maxsize=64)
+def static_system_prompt(language_prompt: Optional[str], model: str) -> str:
+    """The per-(language, model) part of the system prompt, built once."""
+    # model is part of the key so model-specific instructions can be added here
+    if language_prompt:
+        return language_prompt + "\n\n" + HELPDESK_SYSTEM_PROMPT
+    return HELPDESK_SYSTEM_PROMPT
+
+
+@lru_cache(maxsize=64)
+def static_prompt_tokens(language_prompt: Optional[str], model: str) -> int:
+    """Approximate token count of static_system_prompt(), computed once."""
+    return estimate_tokens(static_system_prompt(language_prompt, model))
+
+
+@lru_cache(maxsize=1024)
+def user_context_line(username: str, user_id: str, email: str) -> str:
+    """The "User Context" line appended to the system prompt."""
+    return f"\nUser Context: Username: {username}, ID: {user_id}, Email: {email}"
+
+
+def build_system_prompt(user_context: Optional[Dict[str, Any]], model: str) -> Tuple[str, int]:
+    """
+    Assemble the system prompt for a request from the memoized static part
+    and the per-request user context and knowledge snippets.
+
+    Returns:
+        (prompt text, approximate token count)
+    """
+    if not user_context:
+        return HELPDESK_SYSTEM_PROMPT, static_prompt_tokens(None, model)
+
+    language_prompt = user_context.get('language_prompt') or None
+    dynamic = user_context_line(str(user_context.get('username', 'N/A')), str(user_context.get('user_id', 'N/A')),
+                                str(user_context.get('email', 'N/A')))
+    if user_context.get('knowledge'):
+        dynamic += KNOWLEDGE_HEADER + user_context['knowledge']
+    return (static_system_prompt(language_prompt, model) + dynamic,
+            static_prompt_tokens(language_prompt, model) + estimate_tokens(dynamic))
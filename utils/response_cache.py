@@ -0,0 +1,157 @@
+"""
+Response cache for AI answers
+Keyed by normalized query, language, language prompt and model, with TTL,
+LRU size bounds and optional on-disk persistence so replicas warm-start
+"""
+
+import atexit
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from .metrics import metrics
+from .tickets import _WriterLock
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(__file__), '../data/response_cache.json')
+
+
+def normalize_query(query: str) -> str:
+    """Normalize a query for cache lookups: Unicode form, case, punctuation and whitespace."""
+    text = unicodedata.normalize('NFKC', query).casefold()
+    text = ''.join(' ' if unicodedata.category(ch)[0] in 'PSZC' else ch for ch in text)
+    return ' '.join(text.split())
+
+
+class ResponseCache:
+    """Thread-safe LRU cache of AI answers with per-entry expiry."""
+
+    def __init__(self, max_entries: int = 1000, ttl_seconds: float = 86400,
+                 persist_path: Optional[str] = None, persist_every: int = 20):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.persist_path = persist_path
+        self.persist_every = persist_every
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (expires_at, response)
+        self._hits = 0
+        self._misses = 0
+        self._unsaved = 0
+        if persist_path:
+            self._load()
+            # Don't lose up to persist_every answers on shutdown
+            atexit.register(self.flush)
+
+    @staticmethod
+    def make_key(query: str, language: str, language_prompt: str, model: str) -> str:
+        """Build the cache key for a query in a given language, prompt and model."""
+        raw = json.dumps([normalize_query(query), language or 'en', language_prompt or '', model or ''],
+                         ensure_ascii=False)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return a cached response, or None on a miss or expired entry."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.time():
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self._misses += 1
+            else:
+                self._entries.move_to_end(key)
+                self._hits += 1
+        metrics.increment('response_cache.hits' if entry else 'response_cache.misses')
+        return entry[1] if entry else None
+
+    def set(self, key: str, response: str) -> None:
+        """Store a response, evicting the least recently used entries beyond the size bound."""
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl_seconds, response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._unsaved += 1
+            save_now = self.persist_path and self._unsaved >= self.persist_every
+        if save_now:
+            self.save()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return size and hit-rate statistics."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'entries': len(self._entries),
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': self._hits / lookups if lookups else 0.0
+            }
+
+    def flush(self) -> None:
+        """Save if any entries were added since the last save."""
+        if self._unsaved:
+            self.save()
+
+    def save(self) -> None:
+        """Merge unexpired entries into the file on disk (temp file + atomic rename).
+
+        Replicas share the file, so under an exclusive lock on
+        ``<path>.lock`` the entries already on disk are read back and merged
+        with this cache's, keeping the later expiry of each key and the
+        ``max_entries`` most recently stored. Each replica adds to the
+        others' answers instead of replacing them.
+        """
+        if not self.persist_path:
+            return
+        with self._lock:
+            now = time.time()
+            entries = {k: (exp, resp) for k, (exp, resp) in self._entries.items() if exp >= now}
+            self._unsaved = 0
+        tmp_path = None
+        try:
+            with _WriterLock(self.persist_path + '.lock'):
+                for key, expires_at, response in self._read():
+                    if expires_at >= now and expires_at > entries.get(key, (0, None))[0]:
+                        entries[key] = (expires_at, response)
+                # Expiry is set time plus TTL, so it orders entries by recency
+                merged = sorted(entries.items(), key=lambda item: item[1][0])[-self.max_entries:]
+                fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.persist_path)),
+                                                prefix=os.path.basename(self.persist_path) + '.', suffix='.tmp')
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump([[k, exp, resp] for k, (exp, resp) in merged], f, ensure_ascii=False)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.persist_path)
+        except OSError as e:
+            print(f"Response cache save error: {e}")
+        finally:
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _read(self) -> List[List[Any]]:
+        """Entries stored on disk as [key, expires_at, response], or [] if there are none."""
+        try:
+            with open(self.persist_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return []
+
+    def _load(self) -> None:
+        """Warm the cache from disk, skipping expired entries."""
+        now = time.time()
+        for key, expires_at, response in self._read()[-self.max_entries:]:
+            if expires_at >= now:
+                self._entries[key] = (expires_at, response)
+
+
+# Global instance
+response_cache = ResponseCache(
+    max_entries=int(os.getenv('RESPONSE_CACHE_SIZE', '1000')),
+    ttl_seconds=float(os.getenv('RESPONSE_CACHE_TTL', '86400')),
+    persist_path=os.getenv('RESPONSE_CACHE_PATH', DEFAULT_CACHE_PATH) or None
+)
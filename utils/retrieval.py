@@ -0,0 +1,128 @@
+"""
+BM25 retrieval over the troubleshooting knowledge base
+An in-memory inverted index with NumPy term weights, used to answer offline and to pick context for the AI
+"""
+
+import re
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+_WORD = re.compile(r'\w+')
+
+# Words too common in helpdesk questions to say anything about the topic
+STOPWORDS = frozenset("""
+a about after all am an and any are as at be been but by can could did do does doing for from
+get getting got has have having how i if in into is it its just keep keeps me my of on or
+our please so some still that the their them then there this to too up was we what when where
+which while why will with would you your help issue problem trouble hi hello hey thanks
+""".split())
+
+
+def _stem(word: str) -> str:
+    """Very light suffix stripping, so "printing"/"printer" and "installation"/"install" meet."""
+    for suffix in ('ation', 'ion', 'ing', 'ers', 'er', 'ed', 'es', 's'):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3 and not word.endswith('ss'):
+            return word[:-len(suffix)]
+    return word
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase, split into words, drop stopwords and stem."""
+    return [_stem(word) for word in _WORD.findall(text.casefold()) if word not in STOPWORDS]
+
+
+class Document(NamedTuple):
+    """A retrievable article."""
+    doc_id: str
+    title: str
+    text: str
+
+
+class BM25Index:
+    """
+    Okapi BM25 over a fixed set of documents.
+
+    Built once: every (term, document) weight is computed up front and
+    stored as a NumPy posting list per term, so a query is a handful of
+    vectorised adds into a score array followed by a partial sort.
+    """
+
+    def __init__(self, documents: Iterable[Document], k1: float = 1.5, b: float = 0.75):
+        self.documents: List[Document] = list(documents)
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._build()
+
+    def _build(self) -> None:
+        term_counts = [Counter(tokenize(f"{doc.title} {doc.title} {doc.text}")) for doc in self.documents]
+        lengths = np.array([sum(counts.values()) for counts in term_counts], dtype=np.float64)
+        n_docs = len(self.documents)
+        avg_length = lengths.mean() if n_docs and lengths.sum() else 1.0
+
+        postings: Dict[str, Tuple[List[int], List[int]]] = {}
+        for doc_index, counts in enumerate(term_counts):
+            for term, tf in counts.items():
+                docs, tfs = postings.setdefault(term, ([], []))
+                docs.append(doc_index)
+                tfs.append(tf)
+
+        norm = self.k1 * (1 - self.b + self.b * lengths / avg_length)
+        for term, (docs, tfs) in postings.items():
+            doc_ids = np.array(docs, dtype=np.int32)
+            tf = np.array(tfs, dtype=np.float64)
+            idf = np.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            weights = idf * tf * (self.k1 + 1) / (tf + norm[doc_ids])
+            self._postings[term] = (doc_ids, weights)
+
+    def search(self, query: str, k: int = 3) -> List[Tuple[Document, float]]:
+        """Return up to k (document, score) pairs, best first; documents scoring 0 are left out."""
+        terms = set(tokenize(query))
+        hits = [self._postings[term] for term in terms if term in self._postings]
+        if not hits:
+            return []
+
+        scores = np.zeros(len(self.documents))
+        for doc_ids, weights in hits:
+            scores[doc_ids] += weights
+
+        k = min(k, len(self.documents))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.documents[i], float(scores[i])) for i in top if scores[i] > 0]
+
+
+class KnowledgeRetriever:
+    """
+    BM25 index over the knowledge base entries plus any extra documents.
+
+    The index is rebuilt lazily whenever the knowledge base reloads its file.
+    """
+
+    def __init__(self, knowledge_base, extra_documents: Iterable[Document] = ()):
+        self.knowledge_base = knowledge_base
+        self.extra_documents = list(extra_documents)
+        self._lock = threading.Lock()
+        self._version = None
+        self._index: Optional[BM25Index] = None
+
+    def _current_index(self) -> BM25Index:
+        version = self.knowledge_base.version
+        if self._index is not None and version == self._version:
+            return self._index
+        with self._lock:
+            if self._index is None or version != self._version:
+                documents = [
+                    Document(f"kb:{keyword}", keyword, ' '.join(steps))
+                    for keyword, steps in self.knowledge_base.steps().items()
+                ]
+                self._index = BM25Index(documents + self.extra_documents)
+                self._version = version
+        return self._index
+
+    def search(self, query: str, k: int = 3) -> List[Tuple[Document, float]]:
+        """Top-k (document, score) pairs for the query, best first."""
+        return self._current_index().search(query, k)
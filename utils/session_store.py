@@ -0,0 +1,332 @@
+"""
+Persistent chat sessions for the IT Helpdesk
+Checkpoints each user's conversation, language and feedback state with batched writes, so a restart or a move to another replica resumes it at login
+"""
+
+import atexit
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from .chat_transcript import ChatTranscript
+from .language_tracker import LanguageTracker
+from .metrics import metrics
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '../data')
+SESSION_DB_PATH = os.path.join(DATA_DIR, 'sessions.db')
+SESSION_DIR = os.path.join(DATA_DIR, 'sessions')
+
+# 'sqlite' (default) or 'file' (one JSON document per user)
+SESSION_STORE_BACKEND = os.getenv('SESSION_STORE_BACKEND', 'sqlite').lower()
+
+# Seconds checkpoints are held and coalesced before one batched write; 0 writes each at once
+SESSION_FLUSH_SECONDS = float(os.getenv('SESSION_FLUSH_SECONDS', '2'))
+
+
+class Checkpoint:
+    """
+    Changes to one user's saved session.
+
+    ``messages`` maps transcript positions to message records to (re)write;
+    anything saved at or beyond ``length`` is dropped. A checkpoint with
+    ``state`` None deletes the session.
+    """
+
+    __slots__ = ('user_id', 'length', 'messages', 'state')
+
+    def __init__(self, user_id: str, length: int, messages: Optional[Dict[int, Dict[str, Any]]] = None,
+                 state: Optional[Dict[str, Any]] = None):
+        self.user_id = user_id
+        self.length = length
+        self.messages = messages or {}
+        self.state = state
+
+    def merge(self, newer: 'Checkpoint') -> 'Checkpoint':
+        """This checkpoint followed by a newer one for the same user, as one."""
+        messages = {position: message for position, message in self.messages.items() if position < newer.length}
+        messages.update(newer.messages)
+        return Checkpoint(self.user_id, newer.length, messages, newer.state)
+
+
+class SqliteSessionStore:
+    """Saved sessions in SQLite (WAL mode), one row per message.
+
+    A checkpoint only touches the rows it carries, so saving a turn costs
+    the same however long the conversation is. Like the SQLite ticket
+    store, keep the database on a local (or single-node) volume.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS sessions (
+            user_id TEXT PRIMARY KEY,
+            state TEXT NOT NULL,
+            length INTEGER NOT NULL,
+            updated_at REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS session_messages (
+            user_id TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            payload TEXT NOT NULL,
+            PRIMARY KEY (user_id, position)
+        ) WITHOUT ROWID;
+    """
+
+    def __init__(self, path: str = SESSION_DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._connection().executescript(self.SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return this thread's connection (sqlite3 connections are per-thread)."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def write(self, checkpoints: List[Checkpoint]) -> None:
+        """Apply a batch of checkpoints in one transaction."""
+        conn = self._connection()
+        with conn:
+            conn.execute('BEGIN')
+            for checkpoint in checkpoints:
+                conn.execute('DELETE FROM session_messages WHERE user_id = ? AND position >= ?',
+                             (checkpoint.user_id, checkpoint.length))
+                if checkpoint.state is None:
+                    conn.execute('DELETE FROM sessions WHERE user_id = ?', (checkpoint.user_id,))
+                    continue
+                conn.executemany(
+                    'INSERT OR REPLACE INTO session_messages (user_id, position, payload) VALUES (?, ?, ?)',
+                    [(checkpoint.user_id, position, json.dumps(message, ensure_ascii=False))
+                     for position, message in checkpoint.messages.items()]
+                )
+                conn.execute(
+                    'INSERT OR REPLACE INTO sessions (user_id, state, length, updated_at) VALUES (?, ?, ?, ?)',
+                    (checkpoint.user_id, json.dumps(checkpoint.state, ensure_ascii=False), checkpoint.length, time.time())
+                )
+
+    def load(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Return {'state': ..., 'messages': [...]} for a user, or None."""
+        conn = self._connection()
+        row = conn.execute('SELECT state, length FROM sessions WHERE user_id = ?', (user_id,)).fetchone()
+        if row is None:
+            return None
+        rows = conn.execute(
+            'SELECT payload FROM session_messages WHERE user_id = ? AND position < ? ORDER BY position',
+            (user_id, row[1])
+        )
+        return {'state': json.loads(row[0]), 'messages': [json.loads(payload) for (payload,) in rows]}
+
+
+class FileSessionStore:
+    """Saved sessions as one JSON document per user in data/sessions/.
+
+    A stand-in for a key-value service: each write replaces the user's
+    whole document (temp file plus atomic rename), so it suits short
+    conversations and volumes where SQLite locking can't be trusted.
+    """
+
+    def __init__(self, directory: str = SESSION_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, user_id: str) -> str:
+        return os.path.join(self.directory, hashlib.sha256(user_id.encode('utf-8')).hexdigest() + '.json')
+
+    def write(self, checkpoints: List[Checkpoint]) -> None:
+        """Apply a batch of checkpoints, one document per user."""
+        for checkpoint in checkpoints:
+            path = self._path(checkpoint.user_id)
+            if checkpoint.state is None:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                continue
+
+            messages = (self.load(checkpoint.user_id) or {'messages': []})['messages'][:checkpoint.length]
+            for position in sorted(checkpoint.messages):
+                if position < len(messages):
+                    messages[position] = checkpoint.messages[position]
+                elif position == len(messages):
+                    messages.append(checkpoint.messages[position])
+
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            try:
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump({'state': checkpoint.state, 'messages': messages}, f, ensure_ascii=False)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+
+    def load(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Return {'state': ..., 'messages': [...]} for a user, or None."""
+        try:
+            with open(self._path(user_id), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+
+class SessionStore:
+    """
+    Write-behind checkpoints in front of a session backend.
+
+    save() only queues a checkpoint; queued checkpoints for the same user
+    are merged, and a background thread writes everything pending as one
+    batch every ``flush_interval`` seconds (SESSION_FLUSH_SECONDS) and once
+    more at interpreter exit. With an interval of 0 each save is written at
+    once. A pod that is killed outright loses at most the last interval.
+    """
+
+    def __init__(self, backend=None, flush_interval: float = None):
+        self._backend = backend
+        self.flush_interval = SESSION_FLUSH_SECONDS if flush_interval is None else flush_interval
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending: Dict[str, Checkpoint] = {}
+        self._flusher: Optional[threading.Thread] = None
+
+    def _get_backend(self):
+        with self._lock:
+            if self._backend is None:
+                self._backend = FileSessionStore() if SESSION_STORE_BACKEND == 'file' else SqliteSessionStore()
+            return self._backend
+
+    def save(self, checkpoint: Checkpoint) -> None:
+        """Queue a checkpoint for the next batched write."""
+        with self._lock:
+            previous = self._pending.get(checkpoint.user_id)
+            self._pending[checkpoint.user_id] = previous.merge(checkpoint) if previous else checkpoint
+            pending = len(self._pending)
+            if self.flush_interval and self._flusher is None:
+                self._flusher = threading.Thread(target=self._run_flusher, name='session-flusher', daemon=True)
+                self._flusher.start()
+                atexit.register(self.flush)
+        metrics.increment('session_store.checkpoints')
+        metrics.set_gauge('session_store.pending', pending)
+        if not self.flush_interval:
+            self.flush()
+
+    def delete(self, user_id: str) -> None:
+        """Queue removal of a user's saved session."""
+        self.save(Checkpoint(user_id, 0))
+
+    def flush(self) -> int:
+        """Write all pending checkpoints now; returns how many sessions were written."""
+        backend = self._get_backend()
+        with self._flush_lock:  # batches land in the order they were taken
+            with self._lock:
+                batch, self._pending = list(self._pending.values()), {}
+            if not batch:
+                return 0
+            start = time.perf_counter()
+            try:
+                backend.write(batch)
+            except Exception:
+                # Keep the batch (newer checkpoints on top) for the next flush
+                with self._lock:
+                    for checkpoint in batch:
+                        newer = self._pending.get(checkpoint.user_id)
+                        self._pending[checkpoint.user_id] = checkpoint.merge(newer) if newer else checkpoint
+                metrics.increment('session_store.failed_flushes')
+                raise
+            metrics.observe('session_store.flush_seconds', time.perf_counter() - start)
+            metrics.increment('session_store.flushes')
+            metrics.increment('session_store.sessions_written', len(batch))
+            metrics.set_gauge('session_store.pending', len(self._pending))
+            return len(batch)
+
+    def _run_flusher(self) -> None:
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception:
+                pass  # counted in failed_flushes; retried on the next tick
+
+    def load(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Return a user's saved session, including checkpoints not yet written."""
+        with self._lock:
+            pending = user_id in self._pending
+        if pending:
+            self.flush()
+        return self._get_backend().load(user_id)
+
+
+# Global instance
+session_store = SessionStore()
+
+
+class SessionSync:
+    """
+    Keeps one Streamlit session's saved copy up to date.
+
+    checkpoint() sends only what may have changed since the last one: the
+    in-memory window of the transcript plus any messages spilled to disk
+    since (their feedback moved into the record), so a checkpoint stays
+    small however long the conversation gets. Two tabs of the same user
+    share one saved session; the later checkpoint wins.
+    """
+
+    def __init__(self, user_id: str, store: SessionStore = None):
+        self.user_id = user_id
+        self.store = store or session_store
+        self._transcript_id: Optional[str] = None
+        self._saved_offset = 0
+
+    def checkpoint(self, transcript: ChatTranscript, feedback_given: Dict[str, str],
+                   language: str, tracker: LanguageTracker) -> None:
+        """Queue the session's current transcript, language and feedback state."""
+        if transcript.session_id != self._transcript_id:
+            # A new transcript (e.g. after a ticket cleared the chat) is saved from the start
+            self._transcript_id, self._saved_offset = transcript.session_id, 0
+
+        messages = {position: message.to_dict() for position, message
+                    in enumerate(transcript.load_spilled(self._saved_offset), self._saved_offset)}
+        messages.update((position, message.to_dict()) for position, message in transcript.recent_items())
+        self._saved_offset = transcript.offset
+
+        state = {'language': language, 'tracker': tracker.to_dict(), 'feedback_given': dict(feedback_given)}
+        self.store.save(Checkpoint(self.user_id, len(transcript), messages, state))
+
+    def restore(self) -> Optional[Dict[str, Any]]:
+        """Session state values for the user's saved conversation, or None if there is none."""
+        saved = self.store.load(self.user_id)
+        if not saved or not saved['messages']:
+            return None
+
+        state = saved['state']
+        feedback_given = dict(state.get('feedback_given') or {})
+        transcript = ChatTranscript()
+        for message in saved['messages']:
+            transcript.append(message)
+        transcript.compact(feedback_given)
+        # Messages that were spilled when saved but are back in the window keep their vote in
+        # feedback_given, where the page looks for it
+        for position, message in transcript.recent_items():
+            if message.feedback is not None:
+                feedback_given.setdefault(f"feedback_{position}", message.feedback)
+                message.feedback = None
+        self._transcript_id, self._saved_offset = transcript.session_id, transcript.offset
+        metrics.increment('session_store.restored')
+        return {
+            'chat_history': transcript,
+            'feedback_given': feedback_given,
+            'user_language': state.get('language', 'en'),
+            'language_tracker': LanguageTracker.from_dict(state.get('tracker') or {})
+        }
+
+    def clear(self) -> None:
+        """Forget the saved conversation (the chat was closed, e.g. by creating a ticket)."""
+        self._transcript_id, self._saved_offset = None, 0
+        self.store.delete(self.user_id)
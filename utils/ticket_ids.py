@@ -0,0 +1,98 @@
+"""
+Collision-free, time-ordered ticket IDs.
+
+An ID packs a 48-bit millisecond timestamp, a 24-bit node component and a
+16-bit per-process sequence into 88 bits, rendered as 18 Crockford base32
+characters after the ``TKT`` prefix. IDs sort lexicographically in creation
+order and stay unique across threads, processes and replicas.
+"""
+
+import os
+import threading
+import time
+
+TIMESTAMP_BITS = 48
+NODE_BITS = 24
+SEQUENCE_BITS = 16
+
+NODE_MAX = (1 << NODE_BITS) - 1
+SEQUENCE_MAX = (1 << SEQUENCE_BITS) - 1
+
+# Crockford base32 is in ASCII order, so fixed-width encodings sort like the integers
+_CROCKFORD = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+# Two characters (10 bits) per lookup; 88 bits are left-aligned into 90
+_PAIRS = tuple(a + b for a in _CROCKFORD for b in _CROCKFORD)
+
+
+def _random_node() -> int:
+    """Pick a random node component for this process."""
+    return int.from_bytes(os.urandom(3), 'big') & NODE_MAX
+
+
+class TicketIdGenerator:
+    """Snowflake-style ID generator with a per-process sequence."""
+
+    def __init__(self, prefix: str = 'TKT', node: int = None):
+        self.prefix = prefix
+        self.node = _random_node() if node is None else node & NODE_MAX
+        self._lock = threading.Lock()
+        self._last_ms = -1
+        self._sequence = 0
+        # (value >> 18, prefix + first 14 characters): fixed within a millisecond
+        self._head = (-1, '')
+
+    def reseed(self) -> None:
+        """Draw a fresh node component and reset the sequence (used after fork)."""
+        self._lock = threading.Lock()
+        self.node = _random_node()
+        self._last_ms = -1
+        self._sequence = 0
+        self._head = (-1, '')
+
+    def next_value(self) -> int:
+        """Return the next ID as an integer."""
+        with self._lock:
+            now_ms = time.time_ns() // 1_000_000
+            if now_ms > self._last_ms:
+                self._last_ms = now_ms
+                self._sequence = 0
+            else:
+                # Same millisecond, or the clock stepped backwards: stay monotonic
+                self._sequence += 1
+                if self._sequence > SEQUENCE_MAX:
+                    self._last_ms += 1
+                    self._sequence = 0
+            return (self._last_ms << (NODE_BITS + SEQUENCE_BITS)) | (self.node << SEQUENCE_BITS) | self._sequence
+
+    def next_id(self) -> str:
+        """Return the next ticket ID string."""
+        value = self.next_value()
+        # Only the last two characters carry the sequence; reuse the rest until the millisecond changes
+        key, head = self._head
+        if value >> 18 != key:
+            head = self.prefix + encode_id(value)[:14]
+            self._head = (value >> 18, head)
+        v = value << 2
+        return head + _PAIRS[(v >> 10) & 1023] + _PAIRS[v & 1023]
+
+
+def encode_id(value: int) -> str:
+    """Encode an ID integer as fixed-width, sortable Crockford base32."""
+    v = value << 2
+    p = _PAIRS
+    return (p[v >> 80] + p[(v >> 70) & 1023] + p[(v >> 60) & 1023] + p[(v >> 50) & 1023]
+            + p[(v >> 40) & 1023] + p[(v >> 30) & 1023] + p[(v >> 20) & 1023]
+            + p[(v >> 10) & 1023] + p[v & 1023])
+
+
+# Global instance
+ticket_id_generator = TicketIdGenerator()
+
+# A forked child must not share the parent's node and sequence
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=ticket_id_generator.reseed)
+
+
+def new_ticket_id() -> str:
+    """Generate a new unique ticket ID."""
+    return ticket_id_generator.next_id()
@@ -1,24 +1,423 @@
 import json
 import os
+import sqlite3
+import threading
 import time
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Union
 
-def create_ticket(username, user_id, email, summary):
-    ticket_id = f"TKT{int(time.time())}"
+from .ticket_ids import new_ticket_id
+
+# fcntl is POSIX-only; without it writers are only serialized within one process
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '../data')
+LEGACY_TICKETS_PATH = os.path.join(DATA_DIR, 'tickets.json')
+TICKET_LOG_PATH = os.path.join(DATA_DIR, 'tickets.jsonl')
+TICKET_DB_PATH = os.path.join(DATA_DIR, 'tickets.db')
+
+# 'jsonl' (default) or 'sqlite'
+TICKET_STORE_BACKEND = os.getenv('TICKET_STORE_BACKEND', 'jsonl').lower()
+
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Check the log for torn records after this many appends
+DEFAULT_COMPACT_EVERY = int(os.getenv('TICKET_LOG_COMPACT_EVERY', '1000'))
+
+
+class _WriterLock:
+    """Serialize writers across threads (in-process lock) and processes (flock)."""
+
+    _thread_locks: Dict[str, threading.Lock] = {}
+    _registry_lock = threading.Lock()
+
+    def __init__(self, path: str):
+        self.path = os.path.abspath(path)
+        with self._registry_lock:
+            self._thread_lock = self._thread_locks.setdefault(self.path, threading.Lock())
+        self._fd = None
+
+    def __enter__(self):
+        self._thread_lock.acquire()
+        if FCNTL_AVAILABLE:
+            try:
+                self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+            except Exception:
+                self._release()
+                raise
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._release()
+
+    def _release(self):
+        if self._fd is not None:
+            try:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            finally:
+                os.close(self._fd)
+                self._fd = None
+        self._thread_lock.release()
+
+
+def _build_ticket(username, user_id, email, summary, attachments=None) -> Dict[str, Any]:
+    """Build a new ticket record with a fresh ID."""
     ticket = {
-        "ticket_id": ticket_id,
+        "ticket_id": new_ticket_id(),
         "username": username,
         "user_id": user_id,
         "email": email,
         "summary": summary,
-        "timestamp": time.strftime('%Y-%m-%d %H:%M:%S')
+        "timestamp": time.strftime(TIMESTAMP_FORMAT)
     }
-    path = os.path.join(os.path.dirname(__file__), '../data/tickets.json')
-    if os.path.exists(path):
-        with open(path, 'r') as f:
+    if attachments:
+        # Metadata from utils.attachments; the files themselves are stored by content hash
+        ticket["attachments"] = list(attachments)
+    return ticket
+
+
+def _format_timestamp(value: Union[str, datetime]) -> str:
+    """Normalize a datetime or timestamp string for comparison with stored tickets."""
+    if isinstance(value, datetime):
+        return value.strftime(TIMESTAMP_FORMAT)
+    return value
+
+
+class TicketStore:
+    """Append-only ticket log stored as JSON Lines.
+
+    Each ticket is one line appended to the log and fsync'd, so the cost of
+    creating a ticket does not depend on how many tickets already exist.
+    Compaction rewrites the log without torn records left by a crash; it
+    does not drop anything else, as tickets are never rewritten.
+
+    Writers hold an exclusive lock on ``<path>.lock`` so appends from
+    several Streamlit threads or replicas sharing the data volume never
+    interleave, and rewrites go through a temp file plus atomic rename.
+    """
+
+    def __init__(self, path: str = TICKET_LOG_PATH, compact_every: int = DEFAULT_COMPACT_EVERY):
+        self.path = path
+        self.compact_every = compact_every
+        self._lock = _WriterLock(path + '.lock')
+        self._appends_since_compaction = 0
+
+    def create(self, username, user_id, email, summary, attachments=None) -> str:
+        """Build a new ticket, append it to the log and return its ID."""
+        ticket = _build_ticket(username, user_id, email, summary, attachments)
+        self.append(ticket)
+        return ticket['ticket_id']
+
+    def append(self, ticket: Dict[str, Any]) -> None:
+        """Append a single ticket record to the log."""
+        line = (json.dumps(ticket, ensure_ascii=False) + '\n').encode('utf-8')
+        with self._lock:
+            with open(self.path, 'a+b') as f:
+                # Never glue a new record onto a torn line left by a crash
+                if f.seek(0, os.SEEK_END) > 0:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b'\n':
+                        line = b'\n' + line
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+
+            # Counted and compacted under the lock so concurrent appends neither lose
+            # counts nor start overlapping compactions
+            self._appends_since_compaction += 1
+            if self.compact_every and self._appends_since_compaction >= self.compact_every:
+                self._compact_locked()
+
+    def _read_lines(self) -> Iterator[str]:
+        """Yield every non-empty line of the log."""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield line
+
+    def _read_records(self) -> Iterator[Dict[str, Any]]:
+        """Yield every decodable record in log order, skipping torn lines."""
+        for line in self._read_lines():
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                # A crash mid-append can leave a partial line behind
+                continue
+
+    def all_tickets(self) -> List[Dict[str, Any]]:
+        """Return every ticket, oldest first."""
+        return list(self._read_records())
+
+    # The log has no index, so the queries below are linear scans; use the
+    # SQLite backend when these need to be fast.
+
+    def get_ticket(self, ticket_id: str) -> Optional[Dict[str, Any]]:
+        """Return the ticket with the given ID, or None."""
+        for ticket in self._read_records():
+            if ticket.get('ticket_id') == ticket_id:
+                return ticket
+        return None
+
+    def list_user_tickets(self, user_id: str = None, username: str = None,
+                          limit: int = 20, offset: int = 0) -> List[Dict[str, Any]]:
+        """Return a page of a user's tickets, newest first."""
+        matches = [
+            t for t in self._read_records()
+            if (user_id is None or t.get('user_id') == user_id)
+            and (username is None or t.get('username') == username)
+        ]
+        matches.sort(key=lambda t: t.get('timestamp', ''), reverse=True)
+        return matches[offset:offset + limit]
+
+    def list_tickets_between(self, start: Union[str, datetime], end: Union[str, datetime],
+                             limit: int = None) -> List[Dict[str, Any]]:
+        """Return tickets with start <= timestamp <= end, oldest first."""
+        start, end = _format_timestamp(start), _format_timestamp(end)
+        matches = [t for t in self._read_records() if start <= t.get('timestamp', '') <= end]
+        matches.sort(key=lambda t: t.get('timestamp', ''))
+        return matches[:limit] if limit is not None else matches
+
+    def compact(self) -> bool:
+        """Rewrite the log without torn records.
+
+        Only repairs lines torn by a crash mid-append. Tickets are never
+        updated in place, so there are no superseded records to drop.
+
+        Returns True if the log was rewritten.
+        """
+        with self._lock:
+            return self._compact_locked()
+
+    def _compact_locked(self) -> bool:
+        """compact() for a caller already holding the writer lock."""
+        self._appends_since_compaction = 0
+        tickets = []
+        torn = 0
+        for line in self._read_lines():
+            try:
+                tickets.append(json.loads(line))
+            except json.JSONDecodeError:
+                torn += 1
+        if not torn:
+            return False
+
+        _write_atomic(self.path, tickets)
+        return True
+
+
+def _write_atomic(path: str, tickets: List[Dict[str, Any]]) -> None:
+    """Write tickets as JSON Lines to a temp file and atomically rename it over ``path``."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for ticket in tickets:
+                f.write(json.dumps(ticket, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def migrate_legacy_tickets(legacy_path: str = LEGACY_TICKETS_PATH, log_path: str = TICKET_LOG_PATH) -> int:
+    """One-shot migration of the legacy ``tickets.json`` array into the ticket log.
+
+    Does nothing if the log already exists. Returns the number of migrated tickets.
+    """
+    if os.path.exists(log_path) or not os.path.exists(legacy_path):
+        return 0
+
+    with _WriterLock(log_path + '.lock'):
+        # Another replica may have migrated while we waited for the lock
+        if os.path.exists(log_path):
+            return 0
+        with open(legacy_path, 'r', encoding='utf-8') as f:
+            tickets = json.load(f)
+        _write_atomic(log_path, tickets)
+    return len(tickets)
+
+
+class SqliteTicketStore:
+    """Ticket store backed by SQLite in WAL mode.
+
+    Tickets are indexed by ID, user and timestamp so lookups stay fast at
+    hundreds of thousands of tickets. The full ticket is kept as JSON in
+    ``payload``; the other columns exist for indexing. WAL needs a local
+    (or single-node) volume: do not share the database file over NFS/SMB.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS tickets (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            ticket_id TEXT NOT NULL UNIQUE,
+            username TEXT,
+            user_id TEXT,
+            timestamp TEXT NOT NULL,
+            payload TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_tickets_user_id ON tickets (user_id, timestamp);
+        CREATE INDEX IF NOT EXISTS idx_tickets_username ON tickets (username, timestamp);
+        CREATE INDEX IF NOT EXISTS idx_tickets_timestamp ON tickets (timestamp);
+    """
+
+    def __init__(self, path: str = TICKET_DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._connection().executescript(self.SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return this thread's connection (sqlite3 connections are per-thread)."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _row(ticket: Dict[str, Any]) -> tuple:
+        return (
+            ticket['ticket_id'],
+            ticket.get('username'),
+            ticket.get('user_id'),
+            ticket.get('timestamp', ''),
+            json.dumps(ticket, ensure_ascii=False)
+        )
+
+    def create(self, username, user_id, email, summary, attachments=None) -> str:
+        """Build a new ticket, insert it and return its ID."""
+        ticket = _build_ticket(username, user_id, email, summary, attachments)
+        self.append(ticket)
+        return ticket['ticket_id']
+
+    def append(self, ticket: Dict[str, Any]) -> None:
+        """Insert a single ticket."""
+        self._connection().execute(
+            'INSERT INTO tickets (ticket_id, username, user_id, timestamp, payload) VALUES (?, ?, ?, ?, ?)',
+            self._row(ticket)
+        )
+
+    def import_tickets(self, tickets: List[Dict[str, Any]]) -> int:
+        """Bulk-insert tickets in one transaction, skipping IDs already stored."""
+        conn = self._connection()
+        before = conn.total_changes
+        with conn:
+            conn.execute('BEGIN')
+            conn.executemany(
+                'INSERT OR IGNORE INTO tickets (ticket_id, username, user_id, timestamp, payload) VALUES (?, ?, ?, ?, ?)',
+                [self._row(t) for t in tickets if t.get('ticket_id')]
+            )
+        return conn.total_changes - before
+
+    def count(self) -> int:
+        """Return the number of stored tickets."""
+        return self._connection().execute('SELECT COUNT(*) FROM tickets').fetchone()[0]
+
+    def all_tickets(self) -> List[Dict[str, Any]]:
+        """Return every ticket, oldest first."""
+        rows = self._connection().execute('SELECT payload FROM tickets ORDER BY seq')
+        return [json.loads(payload) for (payload,) in rows]
+
+    def get_ticket(self, ticket_id: str) -> Optional[Dict[str, Any]]:
+        """Return the ticket with the given ID, or None."""
+        row = self._connection().execute(
+            'SELECT payload FROM tickets WHERE ticket_id = ?', (ticket_id,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def list_user_tickets(self, user_id: str = None, username: str = None,
+                          limit: int = 20, offset: int = 0) -> List[Dict[str, Any]]:
+        """Return a page of a user's tickets, newest first."""
+        clauses, params = [], []
+        if user_id is not None:
+            clauses.append('user_id = ?')
+            params.append(user_id)
+        if username is not None:
+            clauses.append('username = ?')
+            params.append(username)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        rows = self._connection().execute(
+            f'SELECT payload FROM tickets {where} ORDER BY timestamp DESC, seq DESC LIMIT ? OFFSET ?',
+            (*params, limit, offset)
+        )
+        return [json.loads(payload) for (payload,) in rows]
+
+    def list_tickets_between(self, start: Union[str, datetime], end: Union[str, datetime],
+                             limit: int = None) -> List[Dict[str, Any]]:
+        """Return tickets with start <= timestamp <= end, oldest first."""
+        rows = self._connection().execute(
+            'SELECT payload FROM tickets WHERE timestamp BETWEEN ? AND ? ORDER BY timestamp, seq LIMIT ?',
+            (_format_timestamp(start), _format_timestamp(end), -1 if limit is None else limit)
+        )
+        return [json.loads(payload) for (payload,) in rows]
+
+
+def migrate_to_sqlite(db_store: SqliteTicketStore, log_path: str = TICKET_LOG_PATH,
+                      legacy_path: str = LEGACY_TICKETS_PATH) -> int:
+    """Import existing tickets (JSONL log, else legacy array) into an empty SQLite store."""
+    if db_store.count():
+        return 0
+    if os.path.exists(log_path):
+        tickets = TicketStore(log_path, compact_every=0).all_tickets()
+    elif os.path.exists(legacy_path):
+        with open(legacy_path, 'r', encoding='utf-8') as f:
             tickets = json.load(f)
     else:
-        tickets = []
-    tickets.append(ticket)
-    with open(path, 'w') as f:
-        json.dump(tickets, f, indent=2)
-    return ticket_id
+        return 0
+    return db_store.import_tickets(tickets)
+
+
+# Global instance
+ticket_store = None
+
+def get_ticket_store():
+    """Get or create the configured ticket store, migrating existing tickets on first use."""
+    global ticket_store
+    if ticket_store is None:
+        if TICKET_STORE_BACKEND == 'sqlite':
+            store = SqliteTicketStore()
+            migrate_to_sqlite(store)
+        else:
+            migrate_legacy_tickets()
+            store = TicketStore()
+        ticket_store = store
+    return ticket_store
+
+
+def create_ticket(username, user_id, email, summary, attachments=None):
+    return get_ticket_store().create(username, user_id, email, summary, attachments)
+
+
+def get_ticket(ticket_id: str) -> Optional[Dict[str, Any]]:
+    """Look up a ticket by ID."""
+    return get_ticket_store().get_ticket(ticket_id)
+
+
+def list_user_tickets(user_id: str = None, username: str = None, limit: int = 20, offset: int = 0) -> List[Dict[str, Any]]:
+    """List a user's tickets, newest first, one page at a time."""
+    return get_ticket_store().list_user_tickets(user_id=user_id, username=username, limit=limit, offset=offset)
+
+
+def list_tickets_between(start: Union[str, datetime], end: Union[str, datetime], limit: int = None) -> List[Dict[str, Any]]:
+    """List tickets created in a time range, oldest first."""
+    return get_ticket_store().list_tickets_between(start, end, limit=limit)
+
+
+if __name__ == '__main__':
+    if TICKET_STORE_BACKEND == 'sqlite':
+        migrated = migrate_to_sqlite(SqliteTicketStore())
+        target = TICKET_DB_PATH
+    else:
+        migrated = migrate_legacy_tickets()
+        target = TICKET_LOG_PATH
+    print(f"Migrated {migrated} ticket(s) to {os.path.normpath(target)}")
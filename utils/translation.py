@@ -0,0 +1,114 @@
+"""
+Localization catalogs and phrase translation
+Per-language data files loaded lazily and shared process-wide, plus single-pass phrase translation for rule-based responses
+"""
+
+import json
+import os
+import re
+import threading
+from typing import Any, Dict, Optional
+
+LOCALES_DIR = os.path.join(os.path.dirname(__file__), '../data/locales')
+
+FALLBACK_LANGUAGE = 'en'
+
+
+class LocaleCatalog:
+    """
+    Localized strings, one data file per language (data/locales/<lang>.json).
+
+    Each file may hold ``messages`` (UI strings), ``phrases`` (English
+    phrase -> translation), ``templates`` (canned answers by intent) and
+    ``general_help``. A language's file is read the first time it is
+    asked for and then kept, so only languages actually served take
+    memory. Lookups fall back to English, then to the default given.
+    """
+
+    def __init__(self, locales_dir: str = LOCALES_DIR):
+        self.locales_dir = locales_dir
+        self._lock = threading.Lock()
+        self._catalogs: Dict[str, Dict[str, Any]] = {}
+
+    def get(self, language: str) -> Dict[str, Any]:
+        """The whole catalog for a language; empty if it has no file."""
+        catalog = self._catalogs.get(language)
+        if catalog is None:
+            with self._lock:
+                catalog = self._catalogs.get(language)
+                if catalog is None:
+                    catalog = self._catalogs[language] = self._load(language)
+        return catalog
+
+    def _load(self, language: str) -> Dict[str, Any]:
+        path = os.path.join(self.locales_dir, f"{language}.json")
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def text(self, language: str, section: str, key: Optional[str] = None, default: Any = None) -> Any:
+        """A localized entry (``section`` or ``section[key]``), falling back to English."""
+        for lang in (language, FALLBACK_LANGUAGE):
+            entry = self.get(lang).get(section)
+            if key is not None and entry is not None:
+                entry = entry.get(key)
+            if entry is not None:
+                return entry
+        return default
+
+    @property
+    def loaded_languages(self):
+        """Languages whose catalogs have been read so far."""
+        return sorted(self._catalogs)
+
+
+# Global instance
+locales = LocaleCatalog()
+
+
+def load_phrases(language: str) -> Dict[str, str]:
+    """Phrase table of a language; empty if it has none."""
+    return locales.get(language).get('phrases', {})
+
+
+class PhraseTranslator:
+    """
+    Replaces English phrases with their translations in a single pass.
+
+    All phrases are compiled into one alternation, longest first, so
+    "Go to" wins over "Go" and nothing is rewritten twice. A phrase only
+    matches as whole words: "Hi" is left alone inside "High" or "this".
+    """
+
+    def __init__(self, phrases: Dict[str, str]):
+        self.phrases = dict(phrases)
+        self._pattern: Optional[re.Pattern] = None
+        if self.phrases:
+            alternation = '|'.join(re.escape(p) for p in sorted(self.phrases, key=len, reverse=True))
+            self._pattern = re.compile(rf'(?<!\w)({alternation})(?!\w)')
+
+    def translate(self, text: str) -> str:
+        """Return text with every known phrase translated."""
+        if self._pattern is None:
+            return text
+        # split() alternates plain text and matched phrases: swap the phrases, join once
+        parts = self._pattern.split(text)
+        parts[1::2] = map(self.phrases.__getitem__, parts[1::2])
+        return ''.join(parts)
+
+
+_translators: Dict[str, PhraseTranslator] = {}
+_translators_lock = threading.Lock()
+
+
+def get_translator(language: str) -> PhraseTranslator:
+    """Compiled translator for a language, built on first use and shared process-wide."""
+    translator = _translators.get(language)
+    if translator is None:
+        with _translators_lock:
+            translator = _translators.get(language)
+            if translator is None:
+                translator = _translators[language] = PhraseTranslator(load_phrases(language))
+    return translator